@@ -0,0 +1,61 @@
+"""
+Incremental parsing of the structured answer streamed by the generate node.
+
+``generate`` asks the model for an ``AnswerWithCitations`` object. The model
+emits it as JSON, either as text deltas (JSON mode) or as tool-call argument
+deltas (function calling). ``AnswerStreamParser`` accumulates those
+fragments and returns the newly decoded part of the ``answer`` field after
+each one, so the answer can be forwarded to ``Message.stream_token`` while
+the model is still writing it. The citations come from the parsed answer
+that the node returns once the stream has ended.
+"""
+
+import json
+
+from langchain_core.messages import AIMessageChunk
+from langchain_core.utils.json import parse_partial_json
+
+
+def chunk_fragments(chunk: AIMessageChunk) -> str:
+    """The JSON text carried by a chunk: content and tool-call argument deltas."""
+    if isinstance(chunk.content, str):
+        text = chunk.content
+    else:
+        text = "".join(
+            part if isinstance(part, str) else part.get("text", "")
+            for part in chunk.content
+            if isinstance(part, str) or part.get("type") == "text"
+        )
+    for tool_call_chunk in chunk.tool_call_chunks:
+        text += tool_call_chunk.get("args") or ""
+    return text
+
+
+class AnswerStreamParser:
+    def __init__(self, field: str = "answer"):
+        self.field = field
+        self.buffer = ""
+        self.emitted = ""
+        self.chunks = 0
+
+    def feed(self, fragment: str) -> str:
+        """Add a fragment of JSON and return the new text of the answer field."""
+        if not fragment:
+            return ""
+        self.buffer += fragment
+        self.chunks += 1
+        try:
+            parsed = parse_partial_json(self.buffer)
+        except json.JSONDecodeError:
+            return ""
+        value = parsed.get(self.field) if isinstance(parsed, dict) else None
+        # a fragment ending inside an escape sequence parses without the
+        # field: wait for the next one
+        if not isinstance(value, str) or not value.startswith(self.emitted):
+            return ""
+        delta = value[len(self.emitted) :]
+        self.emitted = value
+        return delta
+
+    def feed_chunk(self, chunk: AIMessageChunk) -> str:
+        return self.feed(chunk_fragments(chunk))
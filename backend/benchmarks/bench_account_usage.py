@@ -0,0 +1,177 @@
+"""
+Latency of the usage part of GET /user/account for a user with many turns.
+
+One user's history is seeded in SQLite: ``--turns`` billed turns spread over
+threads of ``--turns-per-thread`` turns, each a user message and an
+assistant message carrying the turn's token counts in its metadata. The
+usage of the account page is then computed:
+
+- legacy: the previous implementation, get_all_user_threads (every thread
+          with every step, feedback and element) then a json.loads of the
+          metadata of each step to rebuild the per-thread and per-turn totals
+- ledger: list_thread_usage, list_daily_usage and get_usage_totals, indexed
+          queries over usage_ledger and usage_daily, for every thread and
+          for a page of 20 threads (the time to build the ledger from the
+          existing steps is printed as well)
+
+Usage (from the backend directory):
+    python benchmarks/bench_account_usage.py --turns 5000 --turns-per-thread 10
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_list_threads import SCHEMA, USER_ID, WORDS
+
+from chainlit.data.sql_alchemy import SQLAlchemyDataLayer
+
+
+def seed(db_file: str, turns: int, turns_per_thread: int):
+    rng = random.Random(0)
+    conn = sqlite3.connect(db_file)
+    threads, steps = [], []
+    for turn in range(turns):
+        i = turn // turns_per_thread
+        thread_id = str(uuid.UUID(int=i))
+        if turn % turns_per_thread == 0:
+            threads.append((thread_id, f"2024-01-01T00:00:{i:07d}Z", f"thread {i}"))
+        created_at = f"2024-{1 + turn % 12:02d}-{1 + turn % 28:02d}T{turn:07d}Z"
+        question = " ".join(rng.choices(WORDS, k=20))
+        answer = " ".join(rng.choices(WORDS, k=200))
+        tokens = {
+            "input_tokens": rng.randint(2000, 8000),
+            "output_tokens": rng.randint(100, 800),
+        }
+        tokens["total_tokens"] = tokens["input_tokens"] + tokens["output_tokens"]
+        metadata = json.dumps({**tokens, "streaming": {"chunks": 40, "total": 3.2}})
+        steps.append(
+            (str(uuid.uuid4()), "user_message", thread_id, question, "{}", created_at)
+        )
+        steps.append(
+            (
+                str(uuid.uuid4()),
+                "assistant_message",
+                thread_id,
+                answer,
+                metadata,
+                created_at + "1",
+            )
+        )
+    conn.executemany(
+        """INSERT INTO threads ("id", "createdAt", "name", "userId", "userIdentifier")
+        VALUES (?, ?, ?, 'user-1', 'user')""",
+        threads,
+    )
+    conn.executemany(
+        """INSERT INTO steps ("id", "name", "type", "threadId", "output",
+        "metadata", "createdAt")
+        VALUES (?, 'step', ?, ?, ?, ?, ?)""",
+        steps,
+    )
+    conn.commit()
+    conn.close()
+
+
+async def legacy_usage(data_layer: SQLAlchemyDataLayer):
+    threads = await data_layer.get_all_user_threads(user_id=USER_ID)
+    thread_usage = []
+    for thread in threads or []:
+        metadata = json.loads(thread.get("metadata") or "{}")
+        turns = []
+        for step in thread.get("steps") or []:
+            if step.get("type") == "assistant_message":
+                step_metadata = json.loads(step.get("metadata") or "{}")
+                if step_metadata.get("total_tokens"):
+                    turns.append(
+                        {
+                            "id": step.get("id"),
+                            "createdAt": step.get("createdAt"),
+                            "input_tokens": step_metadata.get("input_tokens", 0),
+                            "output_tokens": step_metadata.get("output_tokens", 0),
+                            "total_tokens": step_metadata.get("total_tokens", 0),
+                        }
+                    )
+        thread_usage.append(
+            {
+                "id": thread.get("id"),
+                "total_tokens": metadata.get("total_tokens", 0),
+                "turns": turns,
+            }
+        )
+    return thread_usage
+
+
+async def ledger_usage(data_layer: SQLAlchemyDataLayer):
+    return (
+        await data_layer.list_thread_usage(USER_ID, "user"),
+        await data_layer.list_daily_usage("user"),
+        await data_layer.get_usage_totals("user"),
+    )
+
+
+async def ledger_page(data_layer: SQLAlchemyDataLayer):
+    return (
+        await data_layer.list_thread_usage(USER_ID, "user", limit=20),
+        await data_layer.list_daily_usage("user"),
+        await data_layer.get_usage_totals("user"),
+    )
+
+
+async def timed(fn, data_layer: SQLAlchemyDataLayer, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn(data_layer)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+async def main(turns: int, turns_per_thread: int, repeat: int):
+    db_file = str(Path(tempfile.mkdtemp()) / "account.sqlite")
+    conn = sqlite3.connect(db_file)
+    conn.executescript(SCHEMA)
+    conn.execute("INSERT INTO users VALUES ('user-1', 'user', '{}', '2024-01-01')")
+    conn.commit()
+    conn.close()
+    seed(db_file, turns, turns_per_thread)
+    data_layer = SQLAlchemyDataLayer(
+        f"sqlite+aiosqlite:///{db_file}", user_thread_limit=10**9
+    )
+
+    start = time.perf_counter()
+    await data_layer._has_usage_ledger()
+    print(f"ledger built from the existing steps in {time.perf_counter() - start:.2f}s")
+
+    legacy_turns = sum(len(t["turns"]) for t in await legacy_usage(data_layer))
+    ledger_threads, _, totals = await ledger_usage(data_layer)
+    assert legacy_turns == sum(len(t["turns"]) for t in ledger_threads) == turns
+    assert totals["turns"] == turns
+
+    print(f"{turns} turns in {-(-turns // turns_per_thread)} threads")
+    print(f"legacy  {await timed(legacy_usage, data_layer, repeat) * 1000:8.1f} ms")
+    print(f"ledger  {await timed(ledger_usage, data_layer, repeat) * 1000:8.1f} ms")
+    print(
+        f"ledger, 20 threads per page "
+        f"{await timed(ledger_page, data_layer, repeat) * 1000:8.1f} ms"
+    )
+    await data_layer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--turns", type=int, default=5000)
+    parser.add_argument("--turns-per-thread", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.turns, args.turns_per_thread, args.repeat))
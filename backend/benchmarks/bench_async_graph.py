@@ -0,0 +1,168 @@
+"""
+Load benchmark for the LangGraph pipeline in chainlit_b.py.
+
+Builds the same graph topology (query_or_respond -> tools -> generate) with
+stubbed LLM, Qdrant and Cohere latencies and runs N conversations at once,
+the way N websocket sessions would hit one worker:
+
+- sync:  blocking nodes driven by ``graph.stream`` inside an ``async def``
+         runner with ``SqliteSaver`` (the previous implementation)
+- async: non-blocking nodes driven by ``graph.astream`` with ``AsyncSqliteSaver``
+
+A heartbeat task measures the worst event loop stall, i.e. how long every
+other websocket would freeze while turns are in flight.
+
+Usage (from the backend directory):
+    python benchmarks/bench_async_graph.py --turns 16
+"""
+
+import argparse
+import asyncio
+import sqlite3
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import aiosqlite
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.graph import END, MessagesState, StateGraph
+from langgraph.prebuilt import ToolNode
+
+LLM_LATENCY = 0.4  # tool-call generation and final answer generation
+SEARCH_LATENCY = 0.25  # multi-query rewrite + qdrant searches
+RERANK_LATENCY = 0.1  # cohere rerank
+
+
+def _tool_call_message() -> AIMessage:
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {"name": "retrieve", "args": {"query": "ΦΠΑ"}, "id": str(uuid.uuid4())}
+        ],
+    )
+
+
+def build_sync_graph_builder() -> StateGraph:
+    @tool(response_format="content_and_artifact")
+    def retrieve(query: str):
+        """Retrieve information related to a query."""
+        time.sleep(SEARCH_LATENCY + RERANK_LATENCY)
+        return "context", []
+
+    def query_or_respond(state: MessagesState):
+        time.sleep(LLM_LATENCY)
+        return {"messages": [_tool_call_message()]}
+
+    def generate(state: MessagesState):
+        time.sleep(LLM_LATENCY)
+        return {"messages": [AIMessage(content="απάντηση")]}
+
+    return _build(query_or_respond, ToolNode([retrieve]), generate)
+
+
+def build_async_graph_builder() -> StateGraph:
+    @tool(response_format="content_and_artifact")
+    async def retrieve(query: str):
+        """Retrieve information related to a query."""
+        await asyncio.sleep(SEARCH_LATENCY)
+        await asyncio.sleep(RERANK_LATENCY)
+        return "context", []
+
+    async def query_or_respond(state: MessagesState):
+        await asyncio.sleep(LLM_LATENCY)
+        return {"messages": [_tool_call_message()]}
+
+    async def generate(state: MessagesState):
+        await asyncio.sleep(LLM_LATENCY)
+        return {"messages": [AIMessage(content="απάντηση")]}
+
+    return _build(query_or_respond, ToolNode([retrieve]), generate)
+
+
+def _build(query_or_respond, tools, generate) -> StateGraph:
+    graph_builder = StateGraph(MessagesState)
+    graph_builder.add_node("query_or_respond", query_or_respond)
+    graph_builder.add_node("tools", tools)
+    graph_builder.add_node("generate", generate)
+    graph_builder.set_entry_point("query_or_respond")
+    graph_builder.add_edge("query_or_respond", "tools")
+    graph_builder.add_edge("tools", "generate")
+    graph_builder.add_edge("generate", END)
+    return graph_builder
+
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Return the worst delay observed between two ticks of the event loop."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run_sync_turn(graph, thread_id: str):
+    config = {"configurable": {"thread_id": thread_id}}
+    for _msg, _metadata in graph.stream(
+        {"messages": [HumanMessage(content="Πότε λήγει η δήλωση ΦΠΑ;")]},
+        stream_mode="messages",
+        config=config,
+    ):
+        pass
+
+
+async def run_async_turn(graph, thread_id: str):
+    config = {"configurable": {"thread_id": thread_id}}
+    async for _msg, _metadata in graph.astream(
+        {"messages": [HumanMessage(content="Πότε λήγει η δήλωση ΦΠΑ;")]},
+        stream_mode="messages",
+        config=config,
+    ):
+        pass
+
+
+async def measure(run_turn, graph, turns: int) -> tuple[float, float]:
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(run_turn(graph, str(uuid.uuid4())) for _ in range(turns)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await monitor
+
+
+async def main(turns: int):
+    single_turn = 2 * LLM_LATENCY + SEARCH_LATENCY + RERANK_LATENCY
+    print(f"stubbed single turn latency: {single_turn:.2f}s, concurrent turns: {turns}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp) / "sync.sqlite", check_same_thread=False)
+        sync_graph = build_sync_graph_builder().compile(checkpointer=SqliteSaver(conn))
+        elapsed, stall = await measure(run_sync_turn, sync_graph, turns)
+        conn.close()
+        print(
+            f"sync  graph.stream : wall {elapsed:6.2f}s  "
+            f"({elapsed / single_turn:5.1f} turns serialized)  max loop stall {stall:6.2f}s"
+        )
+
+        async with aiosqlite.connect(Path(tmp) / "async.sqlite") as aconn:
+            async_graph = build_async_graph_builder().compile(
+                checkpointer=AsyncSqliteSaver(aconn)
+            )
+            elapsed, stall = await measure(run_async_turn, async_graph, turns)
+        print(
+            f"async graph.astream: wall {elapsed:6.2f}s  "
+            f"({elapsed / single_turn:5.1f} turns serialized)  max loop stall {stall:6.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--turns", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.turns))
@@ -0,0 +1,149 @@
+"""
+Benchmark for the multi-query fan-out against Qdrant in the retrieve tool.
+
+Seeds a hybrid (dense + sparse) collection in ``QdrantClient(":memory:")``
+with fake embeddings and retrieves the same rewritten queries three ways:
+
+- sequential: ``MultiQueryRetriever.invoke``, one ``query_points`` per query
+- parallel:   ``MultiQueryRetriever.ainvoke``, one ``query_points`` per query
+              in executor threads (asyncio.gather)
+- batched:    ``batch_hybrid_search`` in a worker thread, as
+              ``RetrievalPipeline`` does before the rerank: one
+              ``query_batch_points`` request for all queries, deduped by
+              point id
+
+The in-memory client has no network in between, so ``--rtt`` adds a simulated
+round trip per request to approximate a remote Qdrant.
+
+Usage (from the backend directory):
+    python benchmarks/bench_batched_retrieval.py --queries 5 --rtt 0.03
+"""
+
+import argparse
+import asyncio
+import functools
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from langchain.retrievers.multi_query import MultiQueryRetriever
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.runnables import RunnableLambda
+from langchain_qdrant import (
+    QdrantVectorStore,
+    RetrievalMode,
+    SparseEmbeddings,
+    SparseVector,
+)
+from qdrant_client import QdrantClient, models
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from retrieval_b import DEFAULT_K, batch_hybrid_search, dedupe_by_point_id
+
+COLLECTION = "bench_docs"
+
+
+class FakeSparseEmbeddings(SparseEmbeddings):
+    def _embed(self, text: str) -> SparseVector:
+        indices = sorted({hash(token) % 30000 for token in text.split()})
+        return SparseVector(indices=indices, values=[1.0] * len(indices))
+
+    def embed_documents(self, texts: List[str]) -> List[SparseVector]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> SparseVector:
+        return self._embed(text)
+
+
+def with_rtt(fn, rtt: float, counter: dict):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        counter["requests"] += 1
+        time.sleep(rtt)
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def build_store(docs: int, dim: int) -> QdrantVectorStore:
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        COLLECTION,
+        vectors_config={
+            "dense": models.VectorParams(size=dim, distance=models.Distance.DOT)
+        },
+        sparse_vectors_config={"sparse": models.SparseVectorParams()},
+    )
+    store = QdrantVectorStore(
+        client=client,
+        collection_name=COLLECTION,
+        embedding=DeterministicFakeEmbedding(size=dim),
+        sparse_embedding=FakeSparseEmbeddings(),
+        retrieval_mode=RetrievalMode.HYBRID,
+        distance=models.Distance.DOT,
+        vector_name="dense",
+        sparse_vector_name="sparse",
+    )
+    store.add_texts(
+        [f"άρθρο {i} ΦΠΑ ΚΑΔ {i % 97} δήλωση {i % 13}" for i in range(docs)],
+        metadatas=[{"n": i} for i in range(docs)],
+    )
+    return store
+
+
+async def main(queries: int, k: int, docs: int, rtt: float, rounds: int):
+    store = build_store(docs, dim=256)
+    counter = {"requests": 0}
+    client = store.client
+    client.query_points = with_rtt(client.query_points, rtt, counter)
+    client.query_batch_points = with_rtt(client.query_batch_points, rtt, counter)
+
+    rewritten = [f"ΦΠΑ ΚΑΔ {i} δήλωση {i}" for i in range(queries)]
+    llm_chain = RunnableLambda(lambda _: list(rewritten))
+    base = store.as_retriever(search_kwargs={"k": k})
+    plain = MultiQueryRetriever(retriever=base, llm_chain=llm_chain)
+
+    async def sequential():
+        return plain.invoke("ΦΠΑ")
+
+    async def parallel():
+        return await plain.ainvoke("ΦΠΑ")
+
+    async def batch():
+        queries = await llm_chain.ainvoke({"question": "ΦΠΑ"})
+        return await asyncio.to_thread(
+            lambda: dedupe_by_point_id(batch_hybrid_search(store, queries, k=k))
+        )
+
+    print(
+        f"{docs} points, {queries} rewritten queries, k={k}, "
+        f"simulated rtt {rtt * 1000:.0f}ms, {rounds} rounds"
+    )
+    for name, run in (
+        ("sequential", sequential),
+        ("parallel", parallel),
+        ("batched", batch),
+    ):
+        counter["requests"] = 0
+        start = time.perf_counter()
+        for _ in range(rounds):
+            result = await run()
+        elapsed = (time.perf_counter() - start) / rounds
+        print(
+            f"{name:<10}: {elapsed * 1000:8.1f}ms/turn  "
+            f"{counter['requests'] / rounds:4.1f} qdrant requests/turn  "
+            f"{len(result)} unique docs to rerank"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("-k", type=int, default=DEFAULT_K)
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--rtt", type=float, default=0.03)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.queries, args.k, args.docs, args.rtt, args.rounds))
@@ -0,0 +1,117 @@
+"""
+Throughput benchmark for the shared, micro-batching embedding server.
+
+The model is stubbed with a CPU-like cost: a fixed per-call overhead (tokenizer
+setup, kernel launch, Python dispatch) plus a small per-text cost, and only one
+encode runs at a time, like a single model instance saturating the cores.
+1, 4 and 16 concurrent callers each encode ``--queries`` single queries:
+
+- direct: every caller calls the model itself, one text per call
+- server: callers go through ``RemoteEmbeddings`` to an ``EmbeddingServer``
+          in another process, which micro-batches concurrent encodes
+
+Usage (from the backend directory):
+    python benchmarks/bench_embedding_server.py --queries 50
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from embedding_server_b import EmbeddingServer, RemoteEmbeddings
+
+CALL_OVERHEAD = 0.008  # seconds per model call
+PER_TEXT = 0.0005  # seconds per text in the batch
+DIM = 768
+
+
+class StubModel(Embeddings):
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            time.sleep(CALL_OVERHEAD + PER_TEXT * len(texts))
+        return [[float(len(text))] * DIM for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        # one encode() call for the batch, like HuggingFaceEmbeddings
+        return self._encode(texts)
+
+
+def run_server(socket_path: str, batch_window: float):
+    server = EmbeddingServer(StubModel(), socket_path, batch_window=batch_window)
+    asyncio.run(server.serve_forever())
+
+
+def measure(embed_query, callers: int, queries: int) -> tuple:
+    latencies: List[float] = []
+
+    def caller(n: int):
+        for i in range(queries):
+            start = time.perf_counter()
+            embed_query(f"query {n}-{i}")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        list(pool.map(caller, range(callers)))
+    elapsed = time.perf_counter() - start
+    return callers * queries / elapsed, statistics.median(latencies)
+
+
+def main(queries: int, batch_window: float):
+    socket_path = os.path.join(tempfile.mkdtemp(), "embeddings.sock")
+    server = multiprocessing.Process(
+        target=run_server, args=(socket_path, batch_window), daemon=True
+    )
+    server.start()
+    while not os.path.exists(socket_path):
+        time.sleep(0.05)
+
+    direct = StubModel()
+    remote = RemoteEmbeddings(socket_path)
+    print(
+        f"stub model: {CALL_OVERHEAD * 1000:.1f}ms/call + {PER_TEXT * 1000:.1f}ms/text, "
+        f"batch window {batch_window * 1000:.0f}ms, {queries} queries per caller"
+    )
+    try:
+        for callers in (1, 4, 16):
+            for name, embed_query in (
+                ("direct", direct.embed_query),
+                ("server", remote.embed_query),
+            ):
+                throughput, p50 = measure(embed_query, callers, queries)
+                print(
+                    f"{callers:2d} callers  {name}: {throughput:7.1f} queries/s  "
+                    f"p50 latency {p50 * 1000:6.1f}ms"
+                )
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--batch-window", type=float, default=0.003)
+    args = parser.parse_args()
+    main(args.queries, args.batch_window)
@@ -0,0 +1,94 @@
+"""
+Micro-benchmark of the glossary lookup done for every generated answer.
+
+A synthetic keyword map (``--keywords`` keywords, each pointing to one or two
+of ``--terms`` glossary terms) is matched against realistic-length queries:
+
+- scan: the previous implementation, a substring check per keyword followed
+        by a scan of the whole glossary
+- automaton: ``GlossaryMatcher``, one Aho-Corasick pass over the query and a
+        term -> entry index
+
+Usage (from the backend directory):
+    python benchmarks/bench_glossary.py --keywords 10000 --terms 2000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from glossary_b import GlossaryMatcher
+
+ALPHABET = "αβγδεζηθικλμνξοπρστυφχψω"
+
+
+def word(rng: random.Random, low: int = 4, high: int = 10) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(low, high)))
+
+
+def scan(query: str, keyword_mappings: Dict[str, List[str]], glossary: List[dict]):
+    query_lower = query.lower()
+    matched_terms = set()
+    for keyword, terms in keyword_mappings.items():
+        if keyword in query_lower:
+            matched_terms.update(terms)
+    relevant_terms = []
+    for item in glossary:
+        if item["term"] in matched_terms:
+            relevant_terms.append(f"**{item['term']}**: {item['definition']}")
+    return relevant_terms
+
+
+def main(keywords: int, terms: int, queries: int, seed: int):
+    rng = random.Random(seed)
+    glossary = [
+        {"term": f"Όρος {i}", "definition": " ".join(word(rng) for _ in range(30))}
+        for i in range(terms)
+    ]
+    keyword_mappings: Dict[str, List[str]] = {}
+    while len(keyword_mappings) < keywords:
+        keyword = " ".join(word(rng) for _ in range(rng.randint(1, 2)))
+        keyword_mappings[keyword] = [
+            glossary[rng.randrange(terms)]["term"] for _ in range(rng.randint(1, 2))
+        ]
+    # questions of ~25 words, a few of them glossary keywords
+    keyword_list = list(keyword_mappings)
+    questions = [
+        " ".join(
+            [word(rng) for _ in range(22)] + rng.sample(keyword_list, rng.randint(0, 3))
+        )
+        for _ in range(queries)
+    ]
+
+    start = time.perf_counter()
+    matcher = GlossaryMatcher(keyword_mappings, glossary)
+    build = time.perf_counter() - start
+    print(
+        f"{keywords} keywords, {terms} terms, {queries} queries "
+        f"(automaton built in {build * 1000:.0f}ms)"
+    )
+
+    for name, lookup in (
+        ("scan", lambda q: scan(q, keyword_mappings, glossary)),
+        ("automaton", matcher.glossary_context),
+    ):
+        start = time.perf_counter()
+        for question in questions:
+            lookup(question)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>9}: {elapsed / queries * 1e6:9.1f}us per query")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--keywords", type=int, default=10000)
+    parser.add_argument("--terms", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    main(args.keywords, args.terms, args.queries, args.seed)
@@ -0,0 +1,75 @@
+"""
+Cost of serving index.html from the catch-all route.
+
+Every SPA navigation goes through serve(). The page is requested
+``--requests`` times through the ASGI app, timing:
+
+- render:      render_html_template, what every request used to do (read
+               theme.json and index.html, inject the tags, rewrite the paths)
+- cached:      get_cached_html_template, a stat() of the source files and a
+               dict lookup
+- GET 200:     a full request, the cached page in the body
+- GET 304:     a revalidation with the page's ETag in If-None-Match
+
+Usage (from the backend directory):
+    python benchmarks/bench_index_html.py --requests 2000
+"""
+
+import argparse
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient
+
+from chainlit.server import (
+    app,
+    clear_html_templates,
+    get_cached_html_template,
+    render_html_template,
+)
+
+
+def timed(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(requests: int):
+    # TestClient logs every request
+    logging.disable(logging.INFO)
+    clear_html_templates()
+    client = TestClient(app)
+    _, etag = get_cached_html_template("")
+    size = len(client.get("/").content)
+
+    def get_200():
+        assert client.get("/thread/1").status_code == 200
+
+    def get_304():
+        response = client.get("/thread/1", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+    print(f"index.html: {size} bytes, {requests} requests")
+    for name, fn in (
+        ("render", lambda: render_html_template("")),
+        ("cached", lambda: get_cached_html_template("")),
+        ("GET 200", get_200),
+        ("GET 304", get_304),
+    ):
+        print(f"{name:8} {timed(fn, requests) * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.requests)
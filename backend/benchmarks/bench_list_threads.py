@@ -0,0 +1,215 @@
+"""
+Sidebar page latency of SQLAlchemyDataLayer.list_threads as history grows.
+
+One user's history is seeded in SQLite, ``--steps-per-thread`` steps per
+thread, and grown up to ``--threads`` threads (10k threads / 500k steps by
+default). At each size the first page, a page deep in the history and a
+search for a common and for a rare keyword are timed:
+
+- legacy: the previous implementation, which loaded up to
+          ``user_thread_limit`` threads with all their steps, feedbacks and
+          elements and filtered/paginated them in Python
+- scan: filters and keyset on the indexed threads.(updatedAt, id) in SQL,
+        thread headers only;
+        a search scans the step outputs of the threads in activity order
+- fts: the same, with searches going through the steps_fts full-text
+       index, ranked by bm25 (the time to build the index from the
+       existing steps is printed as well)
+
+Usage (from the backend directory):
+    python benchmarks/bench_list_threads.py --threads 10000 --steps-per-thread 50
+"""
+
+import argparse
+import asyncio
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chainlit.data.sql_alchemy import SQLAlchemyDataLayer
+from chainlit.types import PageInfo, PaginatedResponse, Pagination, ThreadFilter
+
+SCHEMA = """
+CREATE TABLE users ("id" TEXT PRIMARY KEY, "identifier" TEXT NOT NULL UNIQUE,
+    "metadata" JSONB NOT NULL, "createdAt" TEXT);
+CREATE TABLE threads ("id" TEXT PRIMARY KEY, "createdAt" TEXT, "name" TEXT,
+    "userId" TEXT, "userIdentifier" TEXT, "deletedAt" TEXT, "tags" TEXT[],
+    "metadata" JSONB, "updatedAt" TEXT NOT NULL DEFAULT '');
+CREATE TABLE steps ("id" TEXT PRIMARY KEY, "name" TEXT NOT NULL,
+    "type" TEXT NOT NULL, "threadId" TEXT NOT NULL, "parentId" TEXT,
+    "disableFeedback" BOOLEAN NOT NULL DEFAULT 0, "streaming" BOOLEAN NOT NULL DEFAULT 0,
+    "waitForAnswer" BOOLEAN, "isError" BOOLEAN, "metadata" JSONB, "tags" TEXT[],
+    "input" TEXT, "output" TEXT, "createdAt" TEXT, "start" TEXT, "end" TEXT,
+    "generation" JSONB, "showInput" TEXT, "language" TEXT, "indent" INT);
+CREATE TABLE elements ("id" TEXT PRIMARY KEY, "threadId" TEXT, "type" TEXT,
+    "url" TEXT, "chainlitKey" TEXT, "name" TEXT NOT NULL, "display" TEXT,
+    "objectKey" TEXT, "size" TEXT, "page" INT, "language" TEXT, "forId" TEXT,
+    "mime" TEXT, "props" JSONB);
+CREATE TABLE feedbacks ("id" TEXT PRIMARY KEY, "forId" TEXT NOT NULL,
+    "threadId" TEXT NOT NULL, "value" INT NOT NULL, "comment" TEXT);
+CREATE INDEX threads_userId ON threads("userId");
+CREATE INDEX threads_userId_updatedAt ON threads("userId", "updatedAt", "id");
+CREATE INDEX steps_threadId_createdAt ON steps("threadId", "createdAt");
+CREATE INDEX feedbacks_forId ON feedbacks("forId");
+CREATE INDEX elements_threadId ON elements("threadId");
+"""
+
+WORDS = "φόρος δήλωση εισόδημα επιχείρηση μπλοκάκι ακίνητο μέρισμα προθεσμία".split()
+USER_ID = "user-1"
+
+
+def seed(db_file: str, start: int, stop: int, steps_per_thread: int):
+    rng = random.Random(start)
+    conn = sqlite3.connect(db_file)
+    threads, steps = [], []
+    for i in range(start, stop):
+        thread_id = str(uuid.UUID(int=i))
+        # spread activity over time; thread i was last active at minute i
+        threads.append(
+            (
+                thread_id,
+                f"2024-01-01T00:00:{i:07d}Z",
+                f"thread {i}",
+                f"2024-01-01T{i:07d}.{steps_per_thread - 1:03d}Z",
+            )
+        )
+        for j in range(steps_per_thread):
+            output = " ".join(rng.choices(WORDS, k=30))
+            if j == 0 and i % 20 == 0:
+                output += " ΚΑΔ"  # common keyword
+            if j == 0 and i % 997 == 0:
+                output += " ΕΝΦΙΑ"  # rare keyword
+            steps.append(
+                (str(uuid.uuid4()), thread_id, output, f"2024-01-01T{i:07d}.{j:03d}Z")
+            )
+    conn.executemany(
+        """INSERT INTO threads ("id", "createdAt", "name", "userId",
+            "userIdentifier", "updatedAt")
+        VALUES (?, ?, ?, 'user-1', 'user', ?)""",
+        threads,
+    )
+    conn.executemany(
+        """INSERT INTO steps ("id", "name", "type", "threadId", "output", "createdAt")
+        VALUES (?, 'step', 'assistant_message', ?, ?, ?)""",
+        steps,
+    )
+    conn.commit()
+    conn.close()
+
+
+async def legacy_list_threads(
+    data_layer: SQLAlchemyDataLayer, pagination: Pagination, filters: ThreadFilter
+) -> PaginatedResponse:
+    all_user_threads = await data_layer.get_all_user_threads(user_id=filters.userId)
+    threads = all_user_threads or []
+    if filters.search:
+        keyword = filters.search.lower()
+        threads = [
+            t
+            for t in threads
+            if any(keyword in (s.get("output") or "").lower() for s in t["steps"])
+        ]
+    start = 0
+    if pagination.cursor:
+        for i, thread in enumerate(threads):
+            if thread["id"] == pagination.cursor:
+                start = i + 1
+                break
+    page = threads[start : start + pagination.first]
+    return PaginatedResponse(
+        pageInfo=PageInfo(
+            hasNextPage=len(threads) > start + pagination.first,
+            startCursor=page[0]["id"] if page else None,
+            endCursor=page[-1]["id"] if page else None,
+        ),
+        data=page,
+    )
+
+
+async def timed(fn, repeat: int) -> float:
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+async def main(threads: int, steps_per_thread: int, repeat: int):
+    db_file = str(Path(tempfile.mkdtemp()) / "threads.sqlite")
+    conn = sqlite3.connect(db_file)
+    conn.executescript(SCHEMA)
+    conn.execute("""INSERT INTO users VALUES ('user-1', 'user', '{}', '2024-01-01')""")
+    conn.commit()
+    conn.close()
+    data_layer = SQLAlchemyDataLayer(f"sqlite+aiosqlite:///{db_file}")
+
+    filters = ThreadFilter(userId=USER_ID)
+    common = ThreadFilter(userId=USER_ID, search="καδ")
+    rare = ThreadFilter(userId=USER_ID, search="ενφια")
+    sizes = sorted({threads // 10, threads // 4, threads // 2, threads})
+    seeded = 0
+    print("threads    steps  impl   first page   page 20  common search  rare search")
+    for size in sizes:
+        seed(db_file, seeded, size, steps_per_thread)
+        seeded = size
+        # rebuild the full-text index from the seeded steps
+        conn = sqlite3.connect(db_file)
+        conn.execute("DROP TABLE IF EXISTS steps_fts")
+        conn.close()
+        data_layer._search_index = None
+        start = time.perf_counter()
+        await data_layer._has_search_index()
+        build = time.perf_counter() - start
+
+        # cursor of page 20 (20 items per page, like the sidebar)
+        cursor: Optional[str] = None
+        for _ in range(19):
+            page = await data_layer.list_threads(
+                Pagination(first=20, cursor=cursor), filters
+            )
+            cursor = page.pageInfo.endCursor
+
+        for name, list_threads in (
+            ("legacy", lambda p, f: legacy_list_threads(data_layer, p, f)),
+            ("scan", data_layer.list_threads),
+            ("fts", data_layer.list_threads),
+        ):
+            data_layer._search_index = name == "fts"
+            first = await timed(
+                lambda: list_threads(Pagination(first=20), filters), repeat
+            )
+            deep = await timed(
+                lambda: list_threads(Pagination(first=20, cursor=cursor), filters),
+                repeat,
+            )
+            found = await timed(
+                lambda: list_threads(Pagination(first=20), common), repeat
+            )
+            missing = await timed(
+                lambda: list_threads(Pagination(first=20), rare), repeat
+            )
+            print(
+                f"{size:7d} {size * steps_per_thread:8d}  {name:6s} "
+                f"{first * 1000:9.1f}ms {deep * 1000:7.1f}ms "
+                f"{found * 1000:11.1f}ms {missing * 1000:10.1f}ms"
+            )
+        print(f"{'':16s} steps_fts built in {build * 1000:.0f}ms")
+    await data_layer.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--threads", type=int, default=10000)
+    parser.add_argument("--steps-per-thread", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.threads, args.steps_per_thread, args.repeat))
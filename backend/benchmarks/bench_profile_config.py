@@ -0,0 +1,105 @@
+"""
+Cost of resolving the config of a chat profile.
+
+Every websocket session with a chat profile, and every /project/settings
+request for one, merges the profile's overrides into the config. The
+config is grown with ``--links`` entries in ``ui.header_links`` to show
+how the cost follows its size, and each variant runs ``--repeat`` times:
+
+- merge:     merge_overrides, the model_dump / deep merge / model_validate
+             round-trip every call used to do
+- memoized:  with_overrides, one overrides_key and a dict lookup
+- session:   a WebsocketSession created and resolve_config awaited, as on
+             a websocket connect
+
+Usage (from the backend directory):
+    python benchmarks/bench_profile_config.py --links 0 500 --repeat 500
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chainlit.config import (
+    ChainlitConfigOverrides,
+    FeaturesSettings,
+    HeaderLink,
+    McpFeature,
+    UISettings,
+    config,
+)
+from chainlit.session import WebsocketSession
+from chainlit.types import ChatProfile
+
+
+def profiles():
+    return [
+        ChatProfile(
+            name="custom",
+            markdown_description="Custom profile",
+            config_overrides=ChainlitConfigOverrides(
+                ui=UISettings(name="Custom App", default_theme="light"),
+                features=FeaturesSettings(mcp=McpFeature(enabled=True)),
+            ),
+        )
+    ]
+
+
+async def set_chat_profiles(user, language):
+    return profiles()
+
+
+async def timed(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        if asyncio.iscoroutine(result):
+            await result
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+async def main(links: list[int], repeat: int):
+    config.code.set_chat_profiles = set_chat_profiles
+    overrides = profiles()[0].config_overrides
+
+    async def session():
+        ws = WebsocketSession(
+            id="bench",
+            socket_id="bench",
+            emit=Mock(),
+            emit_call=Mock(),
+            user_env={},
+            client_type="webapp",
+            chat_profile="custom",
+        )
+        await ws.resolve_config()
+
+    for size in links:
+        config.ui.header_links = [
+            HeaderLink(name=f"link {i}", icon_url="/icon.svg", url=f"/{i}")
+            for i in range(size)
+        ]
+        config.clear_overrides()
+        print(f"{size} header links")
+        for name, fn in (
+            ("merge", lambda: config.merge_overrides(overrides)),
+            ("memoized", lambda: config.with_overrides(overrides)),
+            ("session", session),
+        ):
+            print(f"  {name:9} {await timed(fn, repeat) * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--links", type=int, nargs="+", default=[0, 500])
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.links, args.repeat))
@@ -0,0 +1,168 @@
+"""
+Concurrent writes to the SQLite data layer, with SQLite's defaults and tuned.
+
+``--workers`` conversations run at the same time, as with several users
+chatting. Each one makes ``--turns`` turns: the user message and the
+answer (create_step/update_step), a get_thread and the usage of the turn
+(record_turn_usage), while as many readers page through the threads
+(list_threads). The same load runs twice against a fresh database:
+
+- default: rollback journal, synchronous=FULL, writers competing for the
+           database file
+- tuned: the data layer's SQLITE_PRAGMAS (WAL, synchronous=NORMAL, mmap,
+         busy_timeout...) and its single-writer lock
+
+and reports the commits per second and the writes that failed with
+"database is locked".
+
+Usage (from the backend directory):
+    python benchmarks/bench_sqlite_tuning.py --processes 2 --workers 10 --turns 10
+"""
+
+import argparse
+import asyncio
+import logging
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from sqlalchemy import event
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_list_threads import SCHEMA
+from bench_write_behind import step
+
+from chainlit.context import init_http_context
+from chainlit.data.sql_alchemy import SQLAlchemyDataLayer
+from chainlit.logger import logger
+from chainlit.types import Pagination, ThreadFilter
+
+
+class LockedErrors(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord):
+        if "database is locked" in record.getMessage():
+            self.count += 1
+
+
+async def conversation(data_layer: SQLAlchemyDataLayer, turns: int):
+    thread_id = str(uuid.uuid4())
+    await data_layer.update_thread(thread_id, user_id="user-1")
+    tokens = {"input_tokens": 1000, "output_tokens": 100}
+    for turn in range(turns):
+        await data_layer.create_step(
+            step(str(uuid.uuid4()), thread_id, "user_message", f"ερώτηση {turn}")
+        )
+        answer_id = str(uuid.uuid4())
+        await data_layer.create_step(
+            step(answer_id, thread_id, "assistant_message", "")
+        )
+        await data_layer.update_step(
+            step(answer_id, thread_id, "assistant_message", f"απάντηση {turn}")
+        )
+        await data_layer.get_thread(thread_id)
+        await data_layer.record_turn_usage(thread_id, "user", tokens, 0.001)
+
+
+async def reader(data_layer: SQLAlchemyDataLayer, done: asyncio.Event):
+    while not done.is_set():
+        await data_layer.list_threads(
+            Pagination(first=20), ThreadFilter(userId="user-1")
+        )
+        await asyncio.sleep(0.05)
+
+
+def data_layer_for(db_file: str, tuned: bool) -> SQLAlchemyDataLayer:
+    if tuned:
+        return SQLAlchemyDataLayer(f"sqlite+aiosqlite:///{db_file}")
+    return SQLAlchemyDataLayer(
+        f"sqlite+aiosqlite:///{db_file}",
+        sqlite_pragmas={},
+        sqlite_single_writer=False,
+    )
+
+
+async def load(db_file: str, tuned: bool, workers: int, turns: int):
+    init_http_context()
+    # the failed writes are counted, not printed
+    logger.setLevel(logging.CRITICAL)
+    for handler in logger.handlers:
+        handler.setLevel(logging.CRITICAL)
+    locked = LockedErrors()
+    logger.addHandler(locked)
+    # the readers have their own pool, as another worker would, so that
+    # only the commits of the writers are counted
+    data_layer = data_layer_for(db_file, tuned)
+    read_layer = data_layer_for(db_file, tuned)
+    commits: list = []
+    event.listen(data_layer.engine.sync_engine, "commit", commits.append)
+
+    done = asyncio.Event()
+    readers = [asyncio.create_task(reader(read_layer, done)) for _ in range(workers)]
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(data_layer, turns) for _ in range(workers)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await asyncio.gather(*readers)
+    await data_layer.close()
+    await read_layer.close()
+    return len(commits), locked.count, elapsed
+
+
+def run_process(db_file: str, tuned: bool, workers: int, turns: int):
+    return asyncio.run(load(db_file, tuned, workers, turns))
+
+
+def run(tuned: bool, processes: int, workers: int, turns: int):
+    db_file = str(Path(tempfile.mkdtemp()) / "tuning.sqlite")
+    conn = sqlite3.connect(db_file)
+    conn.executescript(SCHEMA)
+    conn.execute("ALTER TABLE users ADD COLUMN balance REAL DEFAULT 1000")
+    conn.execute(
+        "INSERT INTO users (id, identifier, metadata, createdAt) "
+        "VALUES ('user-1', 'user', '{}', '2024-01-01')"
+    )
+    conn.commit()
+    conn.close()
+    with ProcessPoolExecutor(processes) as pool:
+        results = list(
+            pool.map(
+                run_process,
+                [db_file] * processes,
+                [tuned] * processes,
+                [workers] * processes,
+                [turns] * processes,
+            )
+        )
+    commits = sum(r[0] for r in results)
+    locked = sum(r[1] for r in results)
+    elapsed = max(r[2] for r in results)
+    return commits / elapsed, locked, elapsed
+
+
+def main(processes: int, workers: int, turns: int):
+    print(
+        f"{processes} processes x {workers} conversations of {turns} turns, "
+        f"{workers} readers each"
+    )
+    print("mode       commits/s   locked errors   seconds")
+    for name, tuned in (("default", False), ("tuned", True)):
+        commits_per_second, locked, elapsed = run(tuned, processes, workers, turns)
+        print(f"{name:10s} {commits_per_second:9.0f} {locked:15d} {elapsed:9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=10)
+    args = parser.parse_args()
+    main(args.processes, args.workers, args.turns)
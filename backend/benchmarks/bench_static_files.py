@@ -0,0 +1,91 @@
+"""
+Cost of serving a Vite bundle from /assets.
+
+A ``--size`` KiB JavaScript bundle is requested ``--requests`` times with
+``Accept-Encoding: gzip`` through the GZip middleware, timing:
+
+- legacy:        a plain FileResponse, gzipped by the middleware on every
+                 request
+- precompressed: static_files.response, the gzip variant written once by
+                 precompress
+- 304:           a revalidation with the bundle's ETag in If-None-Match
+
+Usage (from the backend directory):
+    python benchmarks/bench_static_files.py --size 500 --requests 200
+"""
+
+import argparse
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_list_threads import WORDS
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse
+from fastapi.testclient import TestClient
+
+from chainlit.static_files import StaticFiles
+
+
+def timed(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(size: int, requests: int):
+    # TestClient logs every request
+    logging.disable(logging.INFO)
+    directory = Path(tempfile.mkdtemp())
+    bundle = directory / "index-B2xNYz1c.js"
+    lines = []
+    while sum(len(line) for line in lines) < size * 1024:
+        lines.append(
+            f"export const {WORDS[len(lines) % len(WORDS)]}{len(lines)} = 1;\n"
+        )
+    bundle.write_text("".join(lines))
+
+    files = StaticFiles(cache_dir=str(directory))
+    start = time.perf_counter()
+    files.precompress([directory])
+    print(f"precompressed in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    app = FastAPI()
+    app.add_middleware(GZipMiddleware)
+
+    @app.get("/legacy")
+    async def legacy():
+        return FileResponse(bundle)
+
+    @app.get("/precompressed")
+    async def precompressed(request: Request):
+        return files.response(request, bundle, immutable=True)
+
+    client = TestClient(app, headers={"Accept-Encoding": "gzip"})
+    etag = client.get("/precompressed").headers["etag"]
+    assert client.get("/legacy").content == client.get("/precompressed").content
+
+    print(f"{bundle.stat().st_size // 1024} KiB bundle, {requests} requests")
+    for name, fn in (
+        ("legacy", lambda: client.get("/legacy")),
+        ("precompressed", lambda: client.get("/precompressed")),
+        ("304", lambda: client.get("/precompressed", headers={"If-None-Match": etag})),
+    ):
+        print(f"{name:14} {timed(fn, requests) * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    main(args.size, args.requests)
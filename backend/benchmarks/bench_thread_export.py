@@ -0,0 +1,93 @@
+"""
+Peak memory of exporting a user's history, all at once and streamed.
+
+One user's history is seeded in SQLite, ``--steps-per-thread`` steps per
+thread, and grown up to ``--threads`` threads. At each size the history is
+serialized to JSON twice, under tracemalloc:
+
+- all at once: get_all_user_threads then one json.dumps of the list, as
+               GET /user/account builds its response
+- streamed: iter_user_threads, one json.dumps per thread written out as it
+            comes, as GET /user/account/threads/export does
+
+Usage (from the backend directory):
+    python benchmarks/bench_thread_export.py --threads 4000 --steps-per-thread 20
+"""
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_list_threads import SCHEMA, USER_ID, seed
+
+from chainlit.data.sql_alchemy import SQLAlchemyDataLayer
+
+
+async def all_at_once(data_layer: SQLAlchemyDataLayer) -> int:
+    threads = await data_layer.get_all_user_threads(user_id=USER_ID)
+    return len(json.dumps(threads, default=str))
+
+
+async def streamed(data_layer: SQLAlchemyDataLayer) -> int:
+    size = 0
+    async for thread in data_layer.iter_user_threads(USER_ID):
+        size += len(json.dumps(thread, default=str)) + 1
+    return size
+
+
+async def measure(fn, data_layer: SQLAlchemyDataLayer):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = await fn(data_layer)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, peak, elapsed
+
+
+async def main(threads: int, steps_per_thread: int):
+    db_file = str(Path(tempfile.mkdtemp()) / "export.sqlite")
+    conn = sqlite3.connect(db_file)
+    conn.executescript(SCHEMA)
+    conn.execute("INSERT INTO users VALUES ('user-1', 'user', '{}', '2024-01-01')")
+    conn.commit()
+    conn.close()
+    data_layer = SQLAlchemyDataLayer(
+        f"sqlite+aiosqlite:///{db_file}", user_thread_limit=10**9
+    )
+
+    print(f"{steps_per_thread} steps per thread")
+    print("threads   export MB   all at once: peak MB  s   streamed: peak MB  s")
+    seeded = 0
+    size = max(threads // 8, 1)
+    while seeded < threads:
+        target = min(size, threads)
+        seed(db_file, seeded, target, steps_per_thread)
+        seeded = target
+        # warm the pool and the page cache
+        await streamed(data_layer)
+        export_size, peak_all, time_all = await measure(all_at_once, data_layer)
+        _, peak_streamed, time_streamed = await measure(streamed, data_layer)
+        print(
+            f"{seeded:7d} {export_size / 1e6:11.1f} "
+            f"{peak_all / 1e6:19.1f} {time_all:5.2f} "
+            f"{peak_streamed / 1e6:17.1f} {time_streamed:5.2f}"
+        )
+        size *= 2
+    await data_layer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--threads", type=int, default=4000)
+    parser.add_argument("--steps-per-thread", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.threads, args.steps_per_thread))
@@ -0,0 +1,103 @@
+"""
+Commits and latency per turn of SQLAlchemyDataLayer with and without write-behind.
+
+A turn replays the writes chainlit_b.main makes: the user message, the
+assistant message, ``--updates`` updates of it while the answer is produced,
+the final update_step, then get_thread and update_thread with the turn's
+token usage. The same turns are run against SQLite:
+
+- direct: every create_step/update_step is an update_thread and a step
+          upsert, each in a transaction of its own
+- write-behind: the step upserts are buffered and written by get_thread
+                (which flushes its thread) in one transaction
+
+Usage (from the backend directory):
+    python benchmarks/bench_write_behind.py --turns 200 --updates 10
+"""
+
+import argparse
+import asyncio
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import event
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_list_threads import SCHEMA
+
+from chainlit.context import init_http_context
+from chainlit.data.sql_alchemy import SQLAlchemyDataLayer
+
+
+def step(step_id: str, thread_id: str, step_type: str, output: str) -> dict:
+    return {
+        "id": step_id,
+        "name": "assistant" if step_type == "assistant_message" else "user",
+        "type": step_type,
+        "threadId": thread_id,
+        "disableFeedback": False,
+        "streaming": False,
+        "output": output,
+        "createdAt": "2025-01-01T00:00:00Z",
+    }
+
+
+async def run_turns(data_layer: SQLAlchemyDataLayer, turns: int, updates: int):
+    thread_id = str(uuid.uuid4())
+    await data_layer.update_thread(thread_id, user_id="user-1")
+    for turn in range(turns):
+        await data_layer.create_step(
+            step(str(uuid.uuid4()), thread_id, "user_message", f"ερώτηση {turn}")
+        )
+        answer_id = str(uuid.uuid4())
+        answer = ""
+        await data_layer.create_step(
+            step(answer_id, thread_id, "assistant_message", answer)
+        )
+        for i in range(updates):
+            answer += f" λέξη{i}"
+            await data_layer.update_step(
+                step(answer_id, thread_id, "assistant_message", answer)
+            )
+        await data_layer.update_step(
+            step(answer_id, thread_id, "assistant_message", answer)
+        )
+        await data_layer.get_thread(thread_id)
+        await data_layer.update_thread(thread_id, metadata={"turn": turn})
+
+
+async def main(turns: int, updates: int):
+    init_http_context()
+    print(f"{turns} turns, {updates} updates per answer")
+    print("mode           commits/turn   ms/turn")
+    for name, write_behind in (("direct", False), ("write-behind", True)):
+        db_file = str(Path(tempfile.mkdtemp()) / "turns.sqlite")
+        conn = sqlite3.connect(db_file)
+        conn.executescript(SCHEMA)
+        conn.execute("INSERT INTO users VALUES ('user-1', 'user', '{}', '2024-01-01')")
+        conn.commit()
+        conn.close()
+        data_layer = SQLAlchemyDataLayer(
+            f"sqlite+aiosqlite:///{db_file}", write_behind=write_behind
+        )
+        commits = []
+        event.listen(data_layer.engine.sync_engine, "commit", commits.append)
+
+        start = time.perf_counter()
+        await run_turns(data_layer, turns, updates)
+        elapsed = time.perf_counter() - start
+        await data_layer.close()
+        print(f"{name:14s} {len(commits) / turns:12.1f} {elapsed / turns * 1000:9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.turns, args.updates))
@@ -2,6 +2,7 @@ import json
 import os
 import site
 import sys
+from collections import OrderedDict
 from importlib import util
 from pathlib import Path
 from typing import (
@@ -17,7 +18,7 @@ from typing import (
 )
 
 import tomli
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from pydantic_settings import BaseSettings
 from starlette.datastructures import Headers
 
@@ -64,6 +65,19 @@ public_dir = os.path.join(APP_ROOT, "public")
 config_file = os.path.join(config_dir, "config.toml")
 config_translation_dir = os.path.join(config_dir, "translations")
 
+# Merged configs kept by ChainlitConfig.with_overrides
+MAX_OVERRIDDEN_CONFIGS = 128
+
+# translation file -> parsed translation, see ChainlitConfig.load_translation.
+# Keyed by the file the language resolved to, so it holds one entry per
+# file whatever languages the clients ask for.
+_translations: Dict[Optional[Path], Dict] = {}
+
+
+def clear_translations():
+    _translations.clear()
+
+
 # Default config file created if none exists
 DEFAULT_CONFIG_STR = f"""[project]
 # List of environment variables to be provided by each user to use the app.
@@ -443,8 +457,26 @@ class ChainlitConfig(BaseSettings):
     project: ProjectSettings
     code: CodeSettings
 
+    # overrides_key -> merged config, see with_overrides
+    _overridden: "OrderedDict[str, ChainlitConfig]" = PrivateAttr(
+        default_factory=OrderedDict
+    )
+
     def load_translation(self, language: str):
-        translation = {}
+        """Translation of ``language``. Each translation file is read once per
+        process; the file watcher clears the cache through
+        ``clear_translations``."""
+        path = self.translation_path(language)
+        translation = _translations.get(path)
+        if translation is None:
+            translation = _translations[path] = (
+                json.loads(path.read_text(encoding="utf-8")) if path else {}
+            )
+        return translation
+
+    def translation_path(self, language: str) -> Optional[Path]:
+        """Translation file of ``language``, else of its root language, else
+        the default one."""
         default_language = "en-US"
         # fallback to root language (ex: `de` when `de-DE` is not found)
         parent_language = language.split("-")[0]
@@ -461,9 +493,7 @@ class ChainlitConfig(BaseSettings):
             is_path_inside(translation_lib_file_path, translation_dir)
             and translation_lib_file_path.is_file()
         ):
-            translation = json.loads(
-                translation_lib_file_path.read_text(encoding="utf-8")
-            )
+            return translation_lib_file_path
         elif (
             is_path_inside(translation_lib_parent_language_file_path, translation_dir)
             and translation_lib_parent_language_file_path.is_file()
@@ -471,9 +501,7 @@ class ChainlitConfig(BaseSettings):
             logger.warning(
                 f"Translation file for {language} not found. Using parent translation {parent_language}."
             )
-            translation = json.loads(
-                translation_lib_parent_language_file_path.read_text(encoding="utf-8")
-            )
+            return translation_lib_parent_language_file_path
         elif (
             is_path_inside(default_translation_lib_file_path, translation_dir)
             and default_translation_lib_file_path.is_file()
@@ -481,14 +509,34 @@ class ChainlitConfig(BaseSettings):
             logger.warning(
                 f"Translation file for {language} not found. Using default translation {default_language}."
             )
-            translation = json.loads(
-                default_translation_lib_file_path.read_text(encoding="utf-8")
-            )
+            return default_translation_lib_file_path
 
-        return translation
+        return None
 
     def with_overrides(
         self, overrides: "ChainlitConfigOverrides | None"
+    ) -> "ChainlitConfig":
+        """Config merged with the overrides of a chat profile.
+
+        The merged config is built once per distinct overrides and shared:
+        callers must not change it. ``clear_overrides`` drops them, e.g.
+        when the config is reloaded.
+        """
+        key = overrides_key(overrides)
+        merged = self._overridden.get(key)
+        if merged is None:
+            merged = self._overridden[key] = self.merge_overrides(overrides)
+            while len(self._overridden) > MAX_OVERRIDDEN_CONFIGS:
+                self._overridden.popitem(last=False)
+        else:
+            self._overridden.move_to_end(key)
+        return merged
+
+    def clear_overrides(self):
+        self._overridden.clear()
+
+    def merge_overrides(
+        self, overrides: "ChainlitConfigOverrides | None"
     ) -> "ChainlitConfig":
         base = self.model_dump()
         patch = overrides.model_dump(exclude_unset=True) if overrides else {}
@@ -505,6 +553,13 @@ class ChainlitConfig(BaseSettings):
         return type(self).model_validate(merged)
 
 
+def overrides_key(overrides: "ChainlitConfigOverrides | None") -> str:
+    """Structural key of config overrides: equal overrides give equal keys,
+    whichever objects hold them."""
+    patch = overrides.model_dump(exclude_unset=True) if overrides else {}
+    return json.dumps(patch, sort_keys=True, default=repr)
+
+
 def init_config(log: bool = False):
     """Initialize the configuration file if it doesn't exist."""
     if not os.path.exists(config_file):
@@ -630,6 +685,7 @@ def reload_config():
         config.run.module_name = original_module_name
     config.project = new_cfg.project
     config.code = new_cfg.code
+    config.clear_overrides()
 
 
 def load_config():
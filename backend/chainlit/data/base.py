@@ -9,6 +9,8 @@ from chainlit.types import (
     ThreadFilter,
 )
 
+from .thread_authors import ThreadAuthorCache
+from .user_cache import UserCache
 from .utils import queue_until_user_message
 
 if TYPE_CHECKING:
@@ -20,6 +22,22 @@ if TYPE_CHECKING:
 class BaseDataLayer(ABC):
     """Base class for data persistence."""
 
+    @property
+    def user_cache(self) -> UserCache:
+        """Users cached by ``get_user`` (see ``chainlit.data.utils.cached_user``)."""
+        cache = self.__dict__.get("_user_cache")
+        if cache is None:
+            cache = self.__dict__["_user_cache"] = UserCache()
+        return cache
+
+    @property
+    def thread_authors(self) -> ThreadAuthorCache:
+        """Authors of the threads written or read, see ``get_thread_author``."""
+        cache = self.__dict__.get("_thread_authors")
+        if cache is None:
+            cache = self.__dict__["_thread_authors"] = ThreadAuthorCache()
+        return cache
+
     @abstractmethod
     async def get_user(self, identifier: str) -> Optional["PersistedUser"]:
         pass
@@ -102,6 +120,11 @@ class BaseDataLayer(ABC):
     ):
         pass
 
+    async def flush(self, thread_id: Optional[str] = None) -> None:
+        """Write the writes of ``thread_id`` (or of every thread) a data layer
+        has buffered. Called at the end of each turn and session."""
+        pass
+
     @abstractmethod
     async def build_debug_url(self) -> str:
         pass
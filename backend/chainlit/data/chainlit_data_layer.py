@@ -8,7 +8,7 @@ import asyncpg  # type: ignore
 
 from chainlit.data.base import BaseDataLayer
 from chainlit.data.storage_clients.base import BaseStorageClient
-from chainlit.data.utils import queue_until_user_message
+from chainlit.data.utils import cached_user, queue_until_user_message
 from chainlit.element import ElementDict
 from chainlit.logger import logger
 from chainlit.step import StepDict
@@ -82,6 +82,7 @@ class ChainlitDataLayer(BaseDataLayer):
             await self.cleanup()
             raise
 
+    @cached_user()
     async def get_user(self, identifier: str) -> Optional[PersistedUser]:
         query = """
         SELECT * FROM "User"
@@ -116,6 +117,7 @@ class ChainlitDataLayer(BaseDataLayer):
             "updated_at": now,
         }
         result = await self.execute_query(query, params)
+        self.user_cache.invalidate(user.identifier)
         row = result[0]
 
         return PersistedUser(
@@ -409,6 +411,10 @@ class ChainlitDataLayer(BaseDataLayer):
         )
 
     async def get_thread_author(self, thread_id: str) -> str:
+        # the author of a thread never changes: query it once
+        author = self.thread_authors.get(thread_id)
+        if author is not None:
+            return author
         query = """
         SELECT u.identifier
         FROM "Thread" t
@@ -418,9 +424,11 @@ class ChainlitDataLayer(BaseDataLayer):
         results = await self.execute_query(query, {"thread_id": thread_id})
         if not results:
             raise ValueError(f"Thread {thread_id} not found")
+        self.thread_authors.set(thread_id, results[0]["identifier"])
         return results[0]["identifier"]
 
     async def delete_thread(self, thread_id: str):
+        self.thread_authors.discard(thread_id)
         elements_query = """
         SELECT * FROM "Element"
         WHERE "threadId" = $1
@@ -614,22 +622,36 @@ class ChainlitDataLayer(BaseDataLayer):
         values = list(data.values())
 
         update_sets = [f'"{k}" = EXCLUDED."{k}"' for k in data.keys() if k != "id"]
+        # the identifier of the author, for get_thread_author
+        returning = (
+            """RETURNING (
+                SELECT identifier FROM "User" WHERE id = "Thread"."userId"
+            ) AS identifier"""
+            if user_id
+            else ""
+        )
 
         if update_sets:
             query = f"""
                 INSERT INTO "Thread" ({", ".join(columns)})
                 VALUES ({", ".join(placeholders)})
                 ON CONFLICT (id) DO UPDATE
-                SET {", ".join(update_sets)};
+                SET {", ".join(update_sets)}
+                {returning};
             """
         else:
             query = f"""
                 INSERT INTO "Thread" ({", ".join(columns)})
                 VALUES ({", ".join(placeholders)})
                 ON CONFLICT (id) DO NOTHING
+                {returning}
             """
 
-        await self.execute_query(query, {str(i + 1): v for i, v in enumerate(values)})
+        results = await self.execute_query(
+            query, {str(i + 1): v for i, v in enumerate(values)}
+        )
+        if results:
+            self.thread_authors.set(thread_id, results[0]["identifier"])
 
     def _extract_feedback_dict_from_step_row(self, row: Dict) -> Optional[FeedbackDict]:
         if row["feedback_id"] is not None:
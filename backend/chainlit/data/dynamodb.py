@@ -16,7 +16,7 @@ from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
 from chainlit.context import context
 from chainlit.data.base import BaseDataLayer
 from chainlit.data.storage_clients.base import BaseStorageClient
-from chainlit.data.utils import queue_until_user_message
+from chainlit.data.utils import cached_user, queue_until_user_message
 from chainlit.element import ElementDict
 from chainlit.logger import logger
 from chainlit.step import StepDict
@@ -122,6 +122,7 @@ class DynamoDBDataLayer(BaseDataLayer):
     def context(self):
         return context
 
+    @cached_user()
     async def get_user(self, identifier: str) -> Optional["PersistedUser"]:
         _logger.info("DynamoDB: get_user identifier=%s", identifier)
 
@@ -164,6 +165,7 @@ class DynamoDBDataLayer(BaseDataLayer):
             TableName=self.table_name,
             Item=self._serialize_item(item),
         )
+        self.user_cache.invalidate(user.identifier)
 
         return PersistedUser(
             id=user.identifier,
@@ -391,6 +393,9 @@ class DynamoDBDataLayer(BaseDataLayer):
 
     async def get_thread_author(self, thread_id: str) -> str:
         _logger.info("DynamoDB: get_thread_author thread=%s", thread_id)
+        author = self.thread_authors.get(thread_id)
+        if author is not None:
+            return author
 
         response = self.client.get_item(
             TableName=self.table_name,
@@ -405,10 +410,12 @@ class DynamoDBDataLayer(BaseDataLayer):
             raise ValueError(f"Author not found for thread_id {thread_id}")
 
         item = self._deserialize_item(response["Item"])
+        self.thread_authors.set(thread_id, item["userId"])
         return item["userId"]
 
     async def delete_thread(self, thread_id: str):
         _logger.info("DynamoDB: delete_thread thread=%s", thread_id)
+        self.thread_authors.discard(thread_id)
 
         thread = await self.get_thread(thread_id)
         if not thread:
@@ -611,6 +618,8 @@ class DynamoDBDataLayer(BaseDataLayer):
             },
             updates=item,
         )
+        if user_id:
+            self.thread_authors.set(thread_id, user_id)
 
     async def build_debug_url(self) -> str:
         return ""
@@ -17,7 +17,7 @@ from literalai.observability.filter import threads_filters as LiteralThreadsFilt
 from literalai.observability.step import StepDict as LiteralStepDict
 
 from chainlit.data.base import BaseDataLayer
-from chainlit.data.utils import queue_until_user_message
+from chainlit.data.utils import cached_user, queue_until_user_message
 from chainlit.element import Audio, Element, ElementDict, File, Image, Pdf, Text, Video
 from chainlit.logger import logger
 from chainlit.step import (
@@ -232,6 +232,7 @@ class LiteralDataLayer(BaseDataLayer):
             logger.error(f"Error building debug url: {e}")
             return ""
 
+    @cached_user()
     async def get_user(self, identifier: str) -> Optional[PersistedUser]:
         user = await self.client.api.get_user(identifier=identifier)
         if not user:
@@ -251,6 +252,7 @@ class LiteralDataLayer(BaseDataLayer):
             )
         elif _user.id:
             await self.client.api.update_user(id=_user.id, metadata=user.metadata)
+        self.user_cache.invalidate(user.identifier)
         return PersistedUser(
             id=_user.id or "",
             identifier=_user.identifier or "",
@@ -400,6 +402,10 @@ class LiteralDataLayer(BaseDataLayer):
         await self.client.api.delete_step(id=step_id)
 
     async def get_thread_author(self, thread_id: str) -> str:
+        # the whole thread is fetched to read its author: only once
+        author = self.thread_authors.get(thread_id)
+        if author is not None:
+            return author
         thread = await self.get_thread(thread_id)
         if not thread:
             return ""
@@ -407,9 +413,11 @@ class LiteralDataLayer(BaseDataLayer):
         if not user_identifier:
             return ""
 
+        self.thread_authors.set(thread_id, user_identifier)
         return user_identifier
 
     async def delete_thread(self, thread_id: str):
+        self.thread_authors.discard(thread_id)
         await self.client.api.delete_thread(id=thread_id)
 
     async def list_threads(
@@ -515,6 +523,9 @@ class LiteralDataLayer(BaseDataLayer):
             metadata=metadata,
             tags=tags,
         )
+        if user_id:
+            # participant_id is a user id, the cache holds identifiers
+            self.thread_authors.discard(thread_id)
 
     async def close(self):
         self.client.flush_and_stop()
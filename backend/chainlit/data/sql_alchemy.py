@@ -1,13 +1,28 @@
+import asyncio
+import contextlib
 import json
+import re
 import ssl
+import time
+import unicodedata
 import uuid
 from dataclasses import asdict
 from datetime import datetime
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Union,
+    cast,
+)
 
 import aiofiles
 import aiohttp
-from sqlalchemy import text
+from sqlalchemy import bindparam, event, text
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
@@ -15,7 +30,8 @@ from sqlalchemy.orm import sessionmaker
 from chainlit.contact import ContactFormRequest
 from chainlit.data.base import BaseDataLayer
 from chainlit.data.storage_clients.base import BaseStorageClient
-from chainlit.data.utils import queue_until_user_message
+from chainlit.data.utils import cached_user, queue_until_user_message
+from chainlit.data.write_behind import WriteBatch, WriteBehind
 from chainlit.element import ElementDict
 from chainlit.logger import logger
 from chainlit.order import UserPaymentInfo, UserPaymentInfoDict, UserPaymentInfoShell
@@ -36,6 +52,149 @@ if TYPE_CHECKING:
     from chainlit.step import StepDict
 
 
+# thread ids bound per query when hydrating threads, well under SQLite's
+# limit on host parameters
+THREAD_BATCH_SIZE = 500
+
+# rows fetched at a time by stream_sql
+STREAM_BATCH_SIZE = 1000
+
+# threads hydrated at a time by iter_user_threads
+EXPORT_BATCH_SIZE = 50
+
+# One row per billed turn, appended by record_turn_usage, and the per-user,
+# per-day totals it keeps up to date in the same transaction.
+USAGE_LEDGER_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS usage_ledger (
+        "id" TEXT PRIMARY KEY,
+        "userIdentifier" TEXT NOT NULL,
+        "threadId" TEXT,
+        "stepId" TEXT,
+        "createdAt" TEXT NOT NULL,
+        "inputTokens" INTEGER NOT NULL DEFAULT 0,
+        "outputTokens" INTEGER NOT NULL DEFAULT 0,
+        "totalTokens" INTEGER NOT NULL DEFAULT 0,
+        "charge" REAL
+    )""",
+    """CREATE INDEX IF NOT EXISTS usage_ledger_user_thread
+        ON usage_ledger ("userIdentifier", "threadId", "createdAt")""",
+    # a turn is billed once, whether the backfill or record_turn_usage adds it
+    """CREATE UNIQUE INDEX IF NOT EXISTS usage_ledger_step
+        ON usage_ledger ("stepId")""",
+    """CREATE TABLE IF NOT EXISTS usage_daily (
+        "userIdentifier" TEXT NOT NULL,
+        "day" TEXT NOT NULL,
+        "turns" INTEGER NOT NULL DEFAULT 0,
+        "inputTokens" INTEGER NOT NULL DEFAULT 0,
+        "outputTokens" INTEGER NOT NULL DEFAULT 0,
+        "totalTokens" INTEGER NOT NULL DEFAULT 0,
+        "charge" REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY ("userIdentifier", "day")
+    )""",
+]
+# seconds before a failed creation of the usage ledger is tried again
+USAGE_LEDGER_RETRY_INTERVAL = 60.0
+
+LEDGER_INSERT = """
+    INSERT INTO usage_ledger ("id", "userIdentifier", "threadId", "stepId",
+        "createdAt", "inputTokens", "outputTokens", "totalTokens", "charge")
+    VALUES (:id, :identifier, :thread_id, :step_id, :createdAt, :inputTokens,
+        :outputTokens, :totalTokens, :charge)
+    ON CONFLICT ("stepId") DO NOTHING
+"""
+
+DAILY_UPSERT = """
+    INSERT INTO usage_daily ("userIdentifier", "day", "turns", "inputTokens",
+        "outputTokens", "totalTokens", "charge")
+    VALUES (:identifier, :day, 1, :inputTokens, :outputTokens, :totalTokens,
+        :charge)
+    ON CONFLICT ("userIdentifier", "day") DO UPDATE SET
+        "turns" = usage_daily."turns" + 1,
+        "inputTokens" = usage_daily."inputTokens" + EXCLUDED."inputTokens",
+        "outputTokens" = usage_daily."outputTokens" + EXCLUDED."outputTokens",
+        "totalTokens" = usage_daily."totalTokens" + EXCLUDED."totalTokens",
+        "charge" = usage_daily."charge" + EXCLUDED."charge"
+"""
+
+# threads."updatedAt" is the createdAt of the last step of the thread, '' while
+# it has none; the column is added on first use, see _has_thread_activity
+THREAD_ACTIVITY_UPDATE = """
+    UPDATE threads SET "updatedAt" = :createdAt
+    WHERE "id" = :threadId AND "updatedAt" < :createdAt
+"""
+
+THREAD_ACTIVITY_REFRESH = """
+    UPDATE threads SET "updatedAt" = COALESCE(
+        (SELECT MAX(s."createdAt") FROM steps s WHERE s."threadId" = threads."id"),
+        ''
+    )
+"""
+
+THREAD_HEADER_COLUMNS = """
+    t."id" AS thread_id,
+    t."createdAt" AS thread_createdat,
+    t."name" AS thread_name,
+    t."userId" AS user_id,
+    t."userIdentifier" AS user_identifier,
+    t."tags" AS thread_tags,
+    t."metadata" AS thread_metadata
+"""
+
+
+def _unicode_contains(value: Optional[str], keyword: str) -> bool:
+    return isinstance(value, str) and keyword in value.lower()
+
+
+def _search_fold(value: Optional[str]) -> Optional[str]:
+    """Casefold and strip accents: "Φόρος" -> "φορος".
+
+    The unicode61 tokenizer of FTS5 only removes Latin diacritics, so the
+    step outputs are folded before they are indexed, and so are the queries.
+    """
+    if not isinstance(value, str):
+        return value
+    return "".join(
+        c
+        for c in unicodedata.normalize("NFD", value.casefold())
+        if not unicodedata.combining(c)
+    )
+
+
+def _search_match_query(search: str) -> str:
+    """FTS5 query matching steps that contain every word of ``search`` as a
+    word prefix, e.g. "φόρος εισ" -> '"φορος"* "εισ"*'."""
+    return " ".join(
+        f'"{word}"*' for word in re.findall(r"\w+", _search_fold(search) or "")
+    )
+
+
+# Applied to every SQLite connection of the pool: readers do not block the
+# writer nor each other (WAL), commits do not wait for an fsync of the
+# database (NORMAL is durable in WAL mode, a power loss may only lose the last
+# commits), a writer waits for the lock instead of failing with "database is
+# locked", and reads go through a 256 MiB mmap and a 64 MiB page cache.
+SQLITE_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "MEMORY",
+}
+# seconds between two WAL checkpoints / PRAGMA optimize
+SQLITE_MAINTENANCE_INTERVAL = 300.0
+
+_READ_QUERY = re.compile(r"\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    dbapi_connection.create_function(
+        "unicode_contains", 2, _unicode_contains, deterministic=True
+    )
+    dbapi_connection.create_function("search_fold", 1, _search_fold, deterministic=True)
+    dbapi_connection.create_function("uuid4", 0, lambda: str(uuid.uuid4()))
+
+
 class SQLAlchemyDataLayer(BaseDataLayer):
     def __init__(
         self,
@@ -45,6 +204,11 @@ class SQLAlchemyDataLayer(BaseDataLayer):
         storage_provider: Optional[BaseStorageClient] = None,
         user_thread_limit: Optional[int] = 1000,
         show_logger: Optional[bool] = False,
+        write_behind: bool = False,
+        write_behind_interval: float = 0.5,
+        sqlite_pragmas: Optional[Dict[str, Any]] = None,
+        sqlite_single_writer: bool = True,
+        sqlite_maintenance_interval: Optional[float] = SQLITE_MAINTENANCE_INTERVAL,
     ):
         self._conninfo = conninfo
         self.user_thread_limit = user_thread_limit
@@ -63,6 +227,50 @@ class SQLAlchemyDataLayer(BaseDataLayer):
         self.async_session = sessionmaker(
             bind=self.engine, expire_on_commit=False, class_=AsyncSession
         )  # type: ignore
+        # SQLite's LOWER() only folds ASCII: searches in Greek need Python's
+        self._is_sqlite = self.engine.dialect.name == "sqlite"
+        if self._is_sqlite:
+            event.listen(self.engine.sync_engine, "connect", _register_sqlite_functions)
+        # SQLite tuning: PRAGMAs set on each pooled connection, one write
+        # transaction at a time (the readers share the rest of the pool) and
+        # a periodic checkpoint of the WAL
+        self.sqlite_pragmas: Dict[str, Any] = (
+            (SQLITE_PRAGMAS if sqlite_pragmas is None else sqlite_pragmas)
+            if self._is_sqlite
+            else {}
+        )
+        if self.sqlite_pragmas:
+            event.listen(self.engine.sync_engine, "connect", self._apply_sqlite_pragmas)
+        self._write_lock: Optional[asyncio.Lock] = (
+            asyncio.Lock() if self._is_sqlite and sqlite_single_writer else None
+        )
+        self.sqlite_maintenance_interval = (
+            sqlite_maintenance_interval if self._is_sqlite else None
+        )
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._next_maintenance = time.monotonic() + (
+            self.sqlite_maintenance_interval or 0
+        )
+        # full-text index of the step outputs (SQLite only), created on
+        # first use; None until then, False if FTS5 is not available
+        self._search_index: Optional[bool] = None
+        self._search_index_lock = asyncio.Lock()
+        # threads."updatedAt" and its index, added on first use; False if
+        # the table cannot be altered (the activity is then read from steps)
+        self._thread_activity: Optional[bool] = None
+        self._thread_activity_lock = asyncio.Lock()
+        # usage_ledger/usage_daily, created on first use like steps_fts; a
+        # failed creation is tried again after USAGE_LEDGER_RETRY_INTERVAL
+        self._usage_ledger: Optional[bool] = None
+        self._usage_ledger_retry = 0.0
+        self._usage_ledger_lock = asyncio.Lock()
+        # steps and elements (and the thread they touch) written in
+        # batches, see chainlit.data.write_behind
+        self.write_behind: Optional[WriteBehind] = (
+            WriteBehind(self._write_batch, interval=write_behind_interval)
+            if write_behind
+            else None
+        )
         if storage_provider:
             self.storage_provider: Optional[BaseStorageClient] = storage_provider
             if self.show_logger:
@@ -76,12 +284,51 @@ class SQLAlchemyDataLayer(BaseDataLayer):
     async def build_debug_url(self) -> str:
         return ""
 
+    ###### SQLite ######
+    def _apply_sqlite_pragmas(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in self.sqlite_pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+
+    def _writing(self, query: Optional[str] = None):
+        """Context of a write transaction (or of ``query`` if it is not a
+        read): on SQLite the writers of this process take turns, so they
+        queue on a lock instead of on the database file."""
+        if not self._is_sqlite or (query is not None and _READ_QUERY.match(query)):
+            return contextlib.nullcontext()
+        # the WAL only grows with writes: the first write after each
+        # interval runs the maintenance in the background
+        if (
+            self.sqlite_maintenance_interval
+            and time.monotonic() >= self._next_maintenance
+        ):
+            self._next_maintenance = time.monotonic() + self.sqlite_maintenance_interval
+            self._maintenance_task = asyncio.create_task(self.maintain())
+        return self._write_lock or contextlib.nullcontext()
+
+    async def maintain(self) -> None:
+        """Checkpoint the WAL into the database and let SQLite refresh the
+        statistics of the tables that need it."""
+        if not self._is_sqlite:
+            return
+        async with self._writing():
+            async with self.engine.connect() as connection:
+                try:
+                    await connection.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)")
+                    await connection.exec_driver_sql("PRAGMA optimize")
+                    await connection.commit()
+                except SQLAlchemyError as e:
+                    logger.warning(f"SQLite maintenance failed: {e}")
+
     ###### SQL Helpers ######
     async def execute_sql(
         self, query: str, parameters: dict
     ) -> Union[List[Dict[str, Any]], int, None]:
         parameterized_query = text(query)
-        async with self.async_session() as session:
+        async with self._writing(query), self.async_session() as session:
             try:
                 await session.begin()
                 result = await session.execute(parameterized_query, parameters)
@@ -104,6 +351,122 @@ class SQLAlchemyDataLayer(BaseDataLayer):
                 logger.warning(f"An unexpected error occurred: {e}")
                 return None
 
+    async def stream_sql(
+        self, query: str, parameters: dict, expanding: Sequence[str] = ()
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the rows of ``query`` as they are fetched (``stream_results``).
+
+        ``expanding`` names the list parameters of ``IN :name`` clauses: they
+        are bound one placeholder per value instead of being rendered into
+        the SQL text.
+        """
+        statement = text(query).bindparams(
+            *(bindparam(name, expanding=True) for name in expanding)
+        )
+        async with self.async_session() as session:
+            try:
+                result = await session.stream(statement, parameters)
+                async for rows in result.mappings().partitions(STREAM_BATCH_SIZE):
+                    for row in rows:
+                        yield self.clean_result(dict(row))
+            except SQLAlchemyError as e:
+                logger.warning(f"An error occurred: {e}")
+
+    async def flush(self, thread_id: Optional[str] = None) -> None:
+        if self.write_behind is not None:
+            await self.write_behind.flush(thread_id)
+
+    async def flush_user(
+        self, user_id: Optional[str], thread_id: Optional[str] = None
+    ) -> None:
+        """Write the pending rows of the threads of ``user_id`` (and of
+        ``thread_id``) before they are read; those of other users stay
+        buffered.
+
+        The userId of a thread is only set by update_thread, which writes
+        it right away: a thread that is only in the buffer has no user yet,
+        so no listing of threads by user can show it.
+        """
+        if self.write_behind is None or not self.write_behind.thread_ids:
+            return
+        thread_ids = {thread_id} if thread_id else set()
+        if user_id:
+            if self._is_sqlite:
+                in_thread_ids, expanding = "IN :thread_ids", ["thread_ids"]
+            else:
+                in_thread_ids, expanding = "= ANY(:thread_ids)", []
+            query = f"""
+                SELECT "id" FROM threads
+                WHERE "userId" = :user_id AND "id" {in_thread_ids}
+            """
+            pending = self.write_behind.thread_ids
+            for start in range(0, len(pending), THREAD_BATCH_SIZE):
+                async for row in self.stream_sql(
+                    query,
+                    {
+                        "user_id": user_id,
+                        "thread_ids": pending[start : start + THREAD_BATCH_SIZE],
+                    },
+                    expanding=expanding,
+                ):
+                    thread_ids.add(row["id"])
+        await self.write_behind.flush_threads(thread_ids)
+
+    async def _write_batch(self, batch: WriteBatch):
+        """Upsert the rows of a write-behind flush in one transaction, one
+        executemany per table and set of columns."""
+        index_outputs = [
+            {"id": row["id"]} for row in batch.get("steps", []) if "output" in row
+        ]
+        if index_outputs and not await self._has_search_index():
+            index_outputs = []
+        activity = [
+            {"threadId": row["threadId"], "createdAt": row["createdAt"]}
+            for row in batch.get("steps", [])
+            if row.get("createdAt")
+        ]
+        if activity and not await self._has_thread_activity():
+            activity = []
+        async with self._writing(), self.async_session() as session:
+            async with session.begin():
+                for table in ("threads", "steps", "elements"):
+                    by_columns: Dict[tuple, List[Dict[str, Any]]] = {}
+                    for row in batch.get(table, []):
+                        by_columns.setdefault(tuple(row), []).append(row)
+                    for columns, rows in by_columns.items():
+                        await session.execute(
+                            text(self._upsert_query(table, columns)), rows
+                        )
+                if activity:
+                    await session.execute(text(THREAD_ACTIVITY_UPDATE), activity)
+                if index_outputs:
+                    await session.execute(
+                        text(
+                            """DELETE FROM steps_fts
+                            WHERE rowid = (SELECT rowid FROM steps WHERE "id" = :id)"""
+                        ),
+                        index_outputs,
+                    )
+                    await session.execute(
+                        text(
+                            """INSERT INTO steps_fts (rowid, "output", "threadId")
+                            SELECT rowid, search_fold("output"), "threadId" FROM steps
+                            WHERE "id" = :id AND "output" IS NOT NULL AND "output" != ''"""
+                        ),
+                        index_outputs,
+                    )
+
+    def _upsert_query(self, table: str, columns: Sequence[str]) -> str:
+        updates = ", ".join(
+            f'"{column}" = EXCLUDED."{column}"' for column in columns if column != "id"
+        )
+        return f"""
+            INSERT INTO {table} ({", ".join(f'"{column}"' for column in columns)})
+            VALUES ({", ".join(f":{column}" for column in columns)})
+            ON CONFLICT ("id") DO UPDATE
+            SET {updates};
+        """
+
     async def get_current_timestamp(self) -> str:
         return datetime.now().isoformat() + "Z"
 
@@ -118,6 +481,7 @@ class SQLAlchemyDataLayer(BaseDataLayer):
         return obj
 
     ###### User ######
+    @cached_user()
     async def get_user(self, identifier: str) -> Optional[PersistedUser]:
         if self.show_logger:
             logger.info(f"SQLAlchemy: get_user, identifier={identifier}")
@@ -192,6 +556,7 @@ class SQLAlchemyDataLayer(BaseDataLayer):
             await self.execute_sql(
                 query=query, parameters=user_dict
             )  # We want to update the metadata
+        self.user_cache.invalidate(user.identifier)
         return await self.get_user(user.identifier)
 
     ###### Payments ######
@@ -204,10 +569,327 @@ class SQLAlchemyDataLayer(BaseDataLayer):
         query = "UPDATE users SET balance = balance - :balance WHERE identifier = :identifier"
         parameters = {"identifier": identifier, "balance": balance_to_deduct}
         rowcount = await self.execute_sql(query=query, parameters=parameters)
+        self.user_cache.invalidate(identifier)
         assert rowcount  # if this is None, then there was an error updating the balance
         # if the user did not exist, rowcount would be 0 which would raise an assertion error
         return await self.get_user(identifier)
 
+    async def record_turn_usage(
+        self,
+        thread_id: str,
+        user_identifier: str,
+        tokens: Dict[str, int],
+        charge: float,
+        step_id: Optional[str] = None,
+    ) -> Optional[float]:
+        """Add the token counts of a turn to the thread's metadata, deduct
+        its charge from the user's balance and append it to the usage
+        ledger, in one transaction.
+
+        Both are done in the database (json_set/jsonb_set, UPDATE ...
+        RETURNING), so concurrent turns of the same user or thread don't
+        lose each other's updates. Returns the new balance, or None when
+        the thread or the user is missing, in which case nothing is written.
+        """
+        if self.show_logger:
+            logger.info(
+                f"SQLAlchemy: record_turn_usage, thread_id={thread_id}, identifier={user_identifier}"
+            )
+        # the thread may still be in the write-behind buffer
+        await self.flush(thread_id)
+        has_ledger = await self._has_usage_ledger()
+        now = await self.get_current_timestamp()
+
+        parameters: Dict[str, Any] = {
+            "thread_id": thread_id,
+            "identifier": user_identifier,
+            "charge": charge,
+        }
+        ledger_parameters = {
+            "id": str(uuid.uuid4()),
+            "identifier": user_identifier,
+            "thread_id": thread_id,
+            "step_id": step_id,
+            "createdAt": now,
+            "day": now[:10],
+            "inputTokens": int(tokens.get("input_tokens", 0)),
+            "outputTokens": int(tokens.get("output_tokens", 0)),
+            "totalTokens": int(tokens.get("total_tokens", 0)),
+            "charge": charge,
+        }
+        if self._is_sqlite:
+            metadata = """COALESCE(NULLIF("metadata", ''), '{}')"""
+            for i, (key, value) in enumerate(tokens.items()):
+                metadata = f"""json_set({metadata}, :path_{i},
+                    COALESCE(json_extract("metadata", :path_{i}), 0) + :value_{i})"""
+                parameters[f"path_{i}"] = f'$."{key}"'
+                parameters[f"value_{i}"] = value
+        else:
+            metadata = """COALESCE("metadata"::jsonb, '{}'::jsonb)"""
+            for i, (key, value) in enumerate(tokens.items()):
+                metadata = f"""jsonb_set({metadata}, ARRAY[CAST(:key_{i} AS text)],
+                    to_jsonb(COALESCE(("metadata"::jsonb ->> :key_{i})::numeric, 0) + :value_{i}))"""
+                parameters[f"key_{i}"] = key
+                parameters[f"value_{i}"] = value
+        threads_query = f"""UPDATE threads SET "metadata" = {metadata}
+            WHERE "id" = :thread_id"""
+        users_query = """UPDATE users SET balance = balance - :charge
+            WHERE identifier = :identifier
+            RETURNING balance"""
+
+        async with self._writing(), self.async_session() as session:
+            try:
+                await session.begin()
+                result = await session.execute(text(threads_query), parameters)
+                if not result.rowcount:
+                    await session.rollback()
+                    logger.warning(f"record_turn_usage: thread {thread_id} not found")
+                    return None
+                balance = (
+                    await session.execute(text(users_query), parameters)
+                ).scalar()
+                if balance is None:
+                    await session.rollback()
+                    logger.warning(
+                        f"record_turn_usage: user {user_identifier} not found"
+                    )
+                    return None
+                if has_ledger:
+                    # the backfill may already have the turn of step_id
+                    inserted = await session.execute(
+                        text(LEDGER_INSERT), ledger_parameters
+                    )
+                    if inserted.rowcount:
+                        await session.execute(text(DAILY_UPSERT), ledger_parameters)
+                await session.commit()
+                self.user_cache.invalidate(user_identifier)
+                return balance
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.warning(f"An error occurred: {e}")
+                return None
+
+    ###### Usage ######
+    async def _has_usage_ledger(self) -> bool:
+        """Whether the usage ledger can be used, creating it on first call."""
+        if self._usage_ledger is None and time.monotonic() >= self._usage_ledger_retry:
+            async with self._usage_ledger_lock:
+                if (
+                    self._usage_ledger is None
+                    and time.monotonic() >= self._usage_ledger_retry
+                ):
+                    if await self._create_usage_ledger():
+                        self._usage_ledger = True
+                    else:
+                        self._usage_ledger_retry = (
+                            time.monotonic() + USAGE_LEDGER_RETRY_INTERVAL
+                        )
+        return bool(self._usage_ledger)
+
+    async def _usage_ledger_exists(self) -> bool:
+        async with self.async_session() as session:
+            try:
+                result = await session.execute(
+                    text("SELECT 1 FROM usage_ledger WHERE 1 = 0")
+                )
+                result.close()
+                return True
+            except SQLAlchemyError:
+                return False
+
+    async def _create_usage_ledger(self) -> bool:
+        # The schema statements also add the indexes missing from a ledger
+        # created by an earlier version.
+        exists = await self._usage_ledger_exists()
+        # A new ledger is filled from the token counts that main() stored
+        # in the metadata of the assistant messages; their charge is unknown.
+        # Another worker may create it at the same time: every statement
+        # leaves what that worker wrote as it is, and the daily rollup is
+        # only made from the rows this transaction inserted.
+        if self._is_sqlite:
+            valid = 'json_valid(s."metadata")'
+            token = "COALESCE(json_extract(s.\"metadata\", '$.{}'), 0)"
+            new_id = "uuid4()"
+        else:
+            valid = 's."metadata" IS NOT NULL'
+            token = "COALESCE((s.\"metadata\"::jsonb ->> '{}')::numeric, 0)"
+            new_id = "gen_random_uuid()::text"
+        backfill_ledger = f"""
+            INSERT INTO usage_ledger ("id", "userIdentifier", "threadId",
+                "stepId", "createdAt", "inputTokens", "outputTokens",
+                "totalTokens")
+            SELECT {new_id}, t."userIdentifier", s."threadId", s."id",
+                s."createdAt", {token.format("input_tokens")},
+                {token.format("output_tokens")}, {token.format("total_tokens")}
+            FROM steps s
+            JOIN threads t ON t."id" = s."threadId"
+            WHERE s."type" = 'assistant_message'
+            AND t."userIdentifier" IS NOT NULL
+            AND s."createdAt" IS NOT NULL
+            AND {valid}
+            AND {token.format("total_tokens")} > 0
+            ON CONFLICT ("stepId") DO NOTHING
+        """
+        backfill_daily = """
+            INSERT INTO usage_daily ("userIdentifier", "day", "turns",
+                "inputTokens", "outputTokens", "totalTokens", "charge")
+            SELECT "userIdentifier", SUBSTR("createdAt", 1, 10), COUNT(*),
+                SUM("inputTokens"), SUM("outputTokens"), SUM("totalTokens"),
+                COALESCE(SUM("charge"), 0)
+            FROM usage_ledger
+            WHERE true
+            GROUP BY "userIdentifier", SUBSTR("createdAt", 1, 10)
+            ON CONFLICT ("userIdentifier", "day") DO NOTHING
+        """
+        async with self._writing(), self.async_session() as session:
+            try:
+                await session.begin()
+                for statement in USAGE_LEDGER_SCHEMA:
+                    await session.execute(text(statement))
+                if not exists:
+                    inserted = await session.execute(text(backfill_ledger))
+                    if inserted.rowcount:
+                        await session.execute(text(backfill_daily))
+                await session.commit()
+                if not exists:
+                    logger.info("SQLAlchemy: created the usage ledger")
+                return True
+            except SQLAlchemyError as e:
+                await session.rollback()
+                error = e
+        # e.g. a concurrent CREATE TABLE that lost on PostgreSQL's catalog;
+        # the other worker created the indexes in the same transaction
+        if not exists and await self._usage_ledger_exists():
+            return True
+        logger.warning(f"The usage ledger is not available: {error}")
+        return False
+
+    async def list_thread_usage(
+        self,
+        user_id: str,
+        user_identifier: str,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Token totals and billed turns of a user's threads, most recently
+        active first, ``limit`` threads (``user_thread_limit`` by default)
+        from ``offset``."""
+        if self.show_logger:
+            logger.info(f"SQLAlchemy: list_thread_usage, user_id={user_id}")
+        if not await self._has_usage_ledger():
+            return []
+        await self.flush_user(user_id)
+        if limit is None:
+            limit = self.user_thread_limit
+        if limit is None and self._is_sqlite:
+            limit = -1  # SQLite has no LIMIT NULL/ALL
+        threads_query = """
+            SELECT t."id", t."name", t."createdAt",
+                COALESCE(u."inputTokens", 0) AS input_tokens,
+                COALESCE(u."outputTokens", 0) AS output_tokens,
+                COALESCE(u."totalTokens", 0) AS total_tokens
+            FROM threads t
+            LEFT JOIN (
+                SELECT "threadId", MAX("createdAt") AS "lastAt",
+                    SUM("inputTokens") AS "inputTokens",
+                    SUM("outputTokens") AS "outputTokens",
+                    SUM("totalTokens") AS "totalTokens"
+                FROM usage_ledger
+                WHERE "userIdentifier" = :identifier
+                GROUP BY "threadId"
+            ) u ON u."threadId" = t."id"
+            WHERE t."userId" = :user_id AND t."deletedAt" IS NULL
+            ORDER BY COALESCE(u."lastAt", t."createdAt") DESC, t."id" DESC
+            LIMIT :limit OFFSET :offset
+        """
+        threads = await self.execute_sql(
+            threads_query,
+            {
+                "user_id": user_id,
+                "identifier": user_identifier,
+                "limit": limit,
+                "offset": offset,
+            },
+        )
+        if not isinstance(threads, list) or not threads:
+            return []
+        thread_usage = {thread["id"]: {**thread, "turns": []} for thread in threads}
+
+        if self._is_sqlite:
+            in_thread_ids, expanding = "IN :thread_ids", ["thread_ids"]
+        else:
+            in_thread_ids, expanding = "= ANY(:thread_ids)", []
+        turns_query = f"""
+            SELECT "threadId", "stepId", "createdAt", "inputTokens",
+                "outputTokens", "totalTokens"
+            FROM usage_ledger
+            WHERE "userIdentifier" = :identifier AND "threadId" {in_thread_ids}
+            ORDER BY "threadId", "createdAt"
+        """
+        thread_ids = list(thread_usage)
+        for start in range(0, len(thread_ids), THREAD_BATCH_SIZE):
+            async for turn in self.stream_sql(
+                turns_query,
+                {
+                    "identifier": user_identifier,
+                    "thread_ids": thread_ids[start : start + THREAD_BATCH_SIZE],
+                },
+                expanding=expanding,
+            ):
+                thread_usage[turn["threadId"]]["turns"].append(
+                    {
+                        "id": turn["stepId"],
+                        "createdAt": turn["createdAt"],
+                        "input_tokens": turn["inputTokens"],
+                        "output_tokens": turn["outputTokens"],
+                        "total_tokens": turn["totalTokens"],
+                    }
+                )
+        return list(thread_usage.values())
+
+    async def list_daily_usage(
+        self, user_identifier: str, limit: int = 31, offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """A user's usage per day, most recent first."""
+        if not await self._has_usage_ledger():
+            return []
+        query = """
+            SELECT "day", "turns", "inputTokens" AS input_tokens,
+                "outputTokens" AS output_tokens, "totalTokens" AS total_tokens,
+                "charge"
+            FROM usage_daily
+            WHERE "userIdentifier" = :identifier
+            ORDER BY "day" DESC
+            LIMIT :limit OFFSET :offset
+        """
+        days = await self.execute_sql(
+            query, {"identifier": user_identifier, "limit": limit, "offset": offset}
+        )
+        return days if isinstance(days, list) else []
+
+    async def get_usage_totals(self, user_identifier: str) -> Dict[str, Any]:
+        """A user's usage over all time, summed from the daily rollup."""
+        totals: Dict[str, Any] = {
+            "turns": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "total_tokens": 0,
+            "charge": 0.0,
+        }
+        if not await self._has_usage_ledger():
+            return totals
+        query = """
+            SELECT SUM("turns") AS turns, SUM("inputTokens") AS input_tokens,
+                SUM("outputTokens") AS output_tokens,
+                SUM("totalTokens") AS total_tokens, SUM("charge") AS charge
+            FROM usage_daily
+            WHERE "userIdentifier" = :identifier
+        """
+        result = await self.execute_sql(query, {"identifier": user_identifier})
+        if isinstance(result, list) and result:
+            totals.update({k: v for k, v in result[0].items() if v is not None})
+        return totals
+
     async def create_payment(self, payment_info: UserPaymentInfo):
         if self.show_logger:
             logger.info(f"SQLAlchemy: create_payment, payment_info={payment_info}")
@@ -311,25 +993,37 @@ class SQLAlchemyDataLayer(BaseDataLayer):
     async def get_thread_author(self, thread_id: str) -> str:
         if self.show_logger:
             logger.info(f"SQLAlchemy: get_thread_author, thread_id={thread_id}")
+        # the author of a thread never changes: query it on a cold miss only
+        author = self.thread_authors.get(thread_id)
+        if author is not None:
+            return author
+        await self.flush(thread_id)
         query = """SELECT "userIdentifier" FROM threads WHERE "id" = :id"""
         parameters = {"id": thread_id}
         result = await self.execute_sql(query=query, parameters=parameters)
         if isinstance(result, list) and result:
             author_identifier = result[0].get("userIdentifier")
             if author_identifier is not None:
+                self.thread_authors.set(thread_id, author_identifier)
                 return author_identifier
         raise ValueError(f"Author not found for thread_id {thread_id}")
 
     async def get_thread(self, thread_id: str) -> Optional[ThreadDict]:
         if self.show_logger:
             logger.info(f"SQLAlchemy: get_thread, thread_id={thread_id}")
-        user_threads: Optional[List[ThreadDict]] = await self.get_all_user_threads(
-            thread_id=thread_id
+        await self.flush(thread_id)
+        # by primary key: no aggregate over the steps of the user's threads
+        query = f"""
+            SELECT {THREAD_HEADER_COLUMNS}
+            FROM threads t
+            WHERE t."id" = :thread_id AND t."deletedAt" IS NULL
+        """
+        threads = await self.execute_sql(
+            query=query, parameters={"thread_id": thread_id}
         )
-        if user_threads:
-            return user_threads[0]
-        else:
+        if not isinstance(threads, list) or not threads:
             return None
+        return (await self._hydrate_threads(threads))[0]
 
     async def update_thread(
         self,
@@ -394,11 +1088,14 @@ class SQLAlchemyDataLayer(BaseDataLayer):
             ON CONFLICT ("id") DO UPDATE
             SET {updates};
         """
-        await self.execute_sql(query=query, parameters=parameters)
+        if await self.execute_sql(query=query, parameters=parameters) is not None:
+            self.thread_authors.set(thread_id, user_identifier)
 
     async def delete_thread(self, thread_id: str):
         if self.show_logger:
             logger.info(f"SQLAlchemy: delete_thread, thread_id={thread_id}")
+        await self.flush(thread_id)
+        self.thread_authors.discard(thread_id)
 
         elements_query = """SELECT * FROM elements WHERE "threadId" = :id"""
         elements = await self.execute_sql(elements_query, {"id": thread_id})
@@ -424,72 +1121,340 @@ class SQLAlchemyDataLayer(BaseDataLayer):
     async def list_threads(
         self, pagination: Pagination, filters: ThreadFilter
     ) -> PaginatedResponse:
+        """One page of thread headers (no steps or elements), newest activity first.
+
+        Search, feedback filter and keyset pagination on ("updatedAt", "id")
+        run in SQL, so a page costs the same however long the history is:
+        threads."updatedAt" is indexed with the user id, a page seeks to its
+        cursor without reading the steps. The cursor is the id of the last thread of the previous page.
+
+        On SQLite a search goes through the full-text index of the step
+        outputs: it matches word prefixes, ignoring case and accents, and
+        the threads come best match first.
+        """
         if self.show_logger:
             logger.info(
                 f"SQLAlchemy: list_threads, pagination={pagination}, filters={filters}"
             )
         if not filters.userId:
             raise ValueError("userId is required")
-        all_user_threads: List[ThreadDict] = (
-            await self.get_all_user_threads(user_id=filters.userId) or []
-        )
+        await self.flush_user(filters.userId)
 
-        search_keyword = filters.search.lower() if filters.search else None
-        feedback_value = int(filters.feedback) if filters.feedback else None
-
-        filtered_threads = []
-        for thread in all_user_threads:
-            keyword_match = True
-            feedback_match = True
-            if search_keyword or feedback_value is not None:
-                if search_keyword:
-                    keyword_match = any(
-                        search_keyword in step["output"].lower()
-                        for step in thread["steps"]
-                        if "output" in step
-                    )
-                if feedback_value is not None:
-                    feedback_match = False  # Assume no match until found
-                    for step in thread["steps"]:
-                        feedback = step.get("feedback")
-                        if feedback and feedback.get("value") == feedback_value:
-                            feedback_match = True
-                            break
-            if keyword_match and feedback_match:
-                filtered_threads.append(thread)
-
-        start = 0
+        parameters: Dict[str, Any] = {
+            "user_id": filters.userId,
+            "limit": pagination.first + 1,
+        }
+        match = _search_match_query(filters.search) if filters.search else ""
+        if match and await self._has_search_index():
+            parameters["match"] = match
+            rows = await self._search_threads(pagination, filters, parameters)
+            return self._threads_page(pagination, rows)
+
+        updated_at = await self._thread_updated_at()
+        keyset = ""
         if pagination.cursor:
-            for i, thread in enumerate(filtered_threads):
-                if (
-                    thread["id"] == pagination.cursor
-                ):  # Find the start index using pagination.cursor
-                    start = i + 1
-                    break
-        end = start + pagination.first
-        paginated_threads = filtered_threads[start:end] or []
+            # threads after the cursor in ("updatedAt" DESC, "id" DESC) order
+            cursor_updated_at = (
+                f"""(SELECT {updated_at} FROM threads t WHERE t."id" = :cursor)"""
+            )
+            keyset = f"""AND ("updatedAt", "id") < ({cursor_updated_at}, :cursor)"""
+            parameters["cursor"] = pagination.cursor
+
+        # the filters on the steps run on the ordered headers, until the
+        # page is full
+        filters_sql = ""
+        if filters.search:
+            if self._is_sqlite:
+                contains = 'unicode_contains(s."output", :search)'
+            else:
+                contains = 'strpos(LOWER(s."output"), :search) > 0'
+            filters_sql += f"""AND EXISTS (
+                SELECT 1 FROM steps s
+                WHERE s."threadId" = page."id" AND {contains}
+            )"""
+            parameters["search"] = filters.search.lower()
+        if filters.feedback is not None:
+            filters_sql += """AND EXISTS (
+                SELECT 1 FROM steps s
+                JOIN feedbacks f ON f."forId" = s."id"
+                WHERE s."threadId" = page."id" AND f."value" = :feedback
+            )"""
+            parameters["feedback"] = int(filters.feedback)
+
+        # SQLite reads the ordered headers as a co-routine and stops at the
+        # limit; "LIMIT -1" keeps it from pushing the filters down into the
+        # subquery. Elsewhere the order is restated on the outer query.
+        if self._is_sqlite:
+            fence, order_by = "LIMIT -1", ""
+        else:
+            fence, order_by = "", 'ORDER BY "updatedAt" DESC, "id" DESC'
+        query = f"""
+            SELECT * FROM (
+                SELECT * FROM (
+                    SELECT
+                        t."id",
+                        t."createdAt",
+                        t."name",
+                        t."userId",
+                        t."userIdentifier",
+                        t."tags",
+                        t."metadata",
+                        {updated_at} AS "updatedAt"
+                    FROM threads t
+                    WHERE t."userId" = :user_id AND t."deletedAt" IS NULL
+                ) headers
+                WHERE 1 = 1 {keyset}
+                ORDER BY "updatedAt" DESC, "id" DESC
+                {fence}
+            ) page
+            WHERE 1 = 1 {filters_sql}
+            {order_by}
+            LIMIT :limit
+        """
+        rows = await self.execute_sql(query=query, parameters=parameters)
+        return self._threads_page(pagination, rows)
 
-        has_next_page = len(filtered_threads) > end
-        start_cursor = paginated_threads[0]["id"] if paginated_threads else None
-        end_cursor = paginated_threads[-1]["id"] if paginated_threads else None
+    async def _search_threads(
+        self, pagination: Pagination, filters: ThreadFilter, parameters: Dict[str, Any]
+    ) -> Union[List[Dict[str, Any]], int, None]:
+        """Threads with a step matching ``:match``, ranked by their best step
+        (bm25), then by last activity."""
+        updated_at = await self._thread_updated_at()
+        keyset = ""
+        if pagination.cursor:
+            # threads after the cursor in ("rank", "updatedAt" DESC, "id" DESC)
+            cursor_rank = """(SELECT "rank" FROM matches WHERE "threadId" = :cursor)"""
+            cursor_updated_at = (
+                f"""(SELECT {updated_at} FROM threads t WHERE t."id" = :cursor)"""
+            )
+            keyset = f"""AND ("rank" > {cursor_rank}
+                OR ("rank" = {cursor_rank} AND ("updatedAt" < {cursor_updated_at}
+                    OR ("updatedAt" = {cursor_updated_at} AND "id" < :cursor))))"""
+            parameters["cursor"] = pagination.cursor
+        feedback = ""
+        if filters.feedback is not None:
+            feedback = """AND EXISTS (
+                SELECT 1 FROM steps s
+                JOIN feedbacks f ON f."forId" = s."id"
+                WHERE s."threadId" = ranked."id" AND f."value" = :feedback
+            )"""
+            parameters["feedback"] = int(filters.feedback)
+
+        # the matching steps of other users' threads are dropped before
+        # they are grouped
+        query = f"""
+            WITH matches AS (
+                SELECT steps_fts."threadId", MIN(steps_fts.rank) AS "rank"
+                FROM steps_fts
+                JOIN threads t ON t."id" = steps_fts."threadId"
+                WHERE steps_fts MATCH :match
+                AND t."userId" = :user_id AND t."deletedAt" IS NULL
+                GROUP BY steps_fts."threadId"
+            )
+            SELECT * FROM (
+                SELECT
+                    t."id",
+                    t."createdAt",
+                    t."name",
+                    t."userId",
+                    t."userIdentifier",
+                    t."tags",
+                    t."metadata",
+                    m."rank",
+                    {updated_at} AS "updatedAt"
+                FROM matches m
+                JOIN threads t ON t."id" = m."threadId"
+            ) ranked
+            WHERE 1 = 1 {keyset} {feedback}
+            ORDER BY "rank", "updatedAt" DESC, "id" DESC
+            LIMIT :limit
+        """
+        return await self.execute_sql(query=query, parameters=parameters)
+
+    def _threads_page(
+        self,
+        pagination: Pagination,
+        rows: Union[List[Dict[str, Any]], int, None],
+    ) -> PaginatedResponse:
+        rows = rows if isinstance(rows, list) else []
+        has_next_page = len(rows) > pagination.first
+        for row in rows:
+            self.thread_authors.set(row["id"], row["userIdentifier"])
+        threads = [
+            ThreadDict(
+                id=row["id"],
+                createdAt=row["createdAt"],
+                name=row["name"],
+                userId=row["userId"],
+                userIdentifier=row["userIdentifier"],
+                tags=row["tags"],
+                metadata=row["metadata"],
+                steps=[],
+                elements=[],
+            )
+            for row in rows[: pagination.first]
+        ]
 
         return PaginatedResponse(
             pageInfo=PageInfo(
                 hasNextPage=has_next_page,
-                startCursor=start_cursor,
-                endCursor=end_cursor,
+                startCursor=threads[0]["id"] if threads else None,
+                endCursor=threads[-1]["id"] if threads else None,
             ),
-            data=paginated_threads,
+            data=threads,
         )
 
+    async def _thread_updated_at(self) -> str:
+        """SQL expression of the last activity of thread ``t``."""
+        if await self._has_thread_activity():
+            return 't."updatedAt"'
+        # threads without steps sort last
+        return """COALESCE(
+            (SELECT MAX(s."createdAt") FROM steps s WHERE s."threadId" = t."id"),
+            ''
+        )"""
+
+    ###### Thread activity ######
+    async def _has_thread_activity(self) -> bool:
+        """Whether threads have an "updatedAt" column, adding it on first
+        call."""
+        if self._thread_activity is None:
+            async with self._thread_activity_lock:
+                if self._thread_activity is None:
+                    self._thread_activity = await self._create_thread_activity()
+        return self._thread_activity
+
+    async def _thread_activity_exists(self) -> bool:
+        async with self.async_session() as session:
+            try:
+                result = await session.execute(
+                    # qualified: SQLite reads an unknown "name" as a string
+                    text('SELECT t."updatedAt" FROM threads t WHERE 1 = 0')
+                )
+                result.close()
+                return True
+            except SQLAlchemyError:
+                return False
+
+    async def _create_thread_activity(self) -> bool:
+        # "updatedAt" is filled from the existing steps when it is added,
+        # then kept up to date by create_step/delete_step and the
+        # write-behind flushes. The index lets a page of list_threads seek
+        # to its cursor without reading the steps.
+        exists = await self._thread_activity_exists()
+        async with self._writing(), self.async_session() as session:
+            try:
+                await session.begin()
+                if not exists:
+                    await session.execute(
+                        text(
+                            """ALTER TABLE threads
+                            ADD COLUMN "updatedAt" TEXT NOT NULL DEFAULT ''"""
+                        )
+                    )
+                    await session.execute(text(THREAD_ACTIVITY_REFRESH))
+                await session.execute(
+                    text(
+                        """CREATE INDEX IF NOT EXISTS threads_userId_updatedAt
+                        ON threads ("userId", "updatedAt", "id")"""
+                    )
+                )
+                if not exists:
+                    logger.info('SQLAlchemy: added threads."updatedAt"')
+                await session.commit()
+                return True
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.warning(f"Thread activity column is not available: {e}")
+            # another worker may have added it in the meantime
+            return await self._thread_activity_exists()
+
+    ###### Search index ######
+    async def _has_search_index(self) -> bool:
+        """Whether the full-text index of the step outputs can be used,
+        creating it on first call."""
+        if self._search_index is None:
+            async with self._search_index_lock:
+                if self._search_index is None:
+                    self._search_index = await self._create_search_index()
+        return self._search_index
+
+    async def _create_search_index(self) -> bool:
+        # steps_fts rows share the rowid of their step and hold the folded
+        # output; it is filled from the existing steps when it is created,
+        # then kept up to date by create_step/update_step/delete_step.
+        if not self._is_sqlite:
+            return False
+        async with self._writing(), self.async_session() as session:
+            try:
+                await session.begin()
+                result = await session.execute(
+                    text(
+                        "SELECT 1 FROM sqlite_master "
+                        "WHERE type = 'table' AND name = 'steps_fts'"
+                    )
+                )
+                if result.first() is None:
+                    await session.execute(
+                        text(
+                            """CREATE VIRTUAL TABLE steps_fts USING fts5(
+                                "output",
+                                "threadId" UNINDEXED,
+                                tokenize = 'unicode61'
+                            )"""
+                        )
+                    )
+                    await session.execute(
+                        text(
+                            """INSERT INTO steps_fts (rowid, "output", "threadId")
+                            SELECT rowid, search_fold("output"), "threadId" FROM steps
+                            WHERE "output" IS NOT NULL AND "output" != ''"""
+                        )
+                    )
+                    logger.info("SQLAlchemy: created the steps_fts search index")
+                await session.commit()
+                return True
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.warning(f"Full-text search is not available: {e}")
+                return False
+
+    async def _index_step_output(self, step_id: str):
+        if not await self._has_search_index():
+            return
+        parameters = {"id": step_id}
+        async with self._writing(), self.async_session() as session:
+            try:
+                await session.begin()
+                await session.execute(
+                    text(
+                        """DELETE FROM steps_fts
+                        WHERE rowid = (SELECT rowid FROM steps WHERE "id" = :id)"""
+                    ),
+                    parameters,
+                )
+                await session.execute(
+                    text(
+                        """INSERT INTO steps_fts (rowid, "output", "threadId")
+                        SELECT rowid, search_fold("output"), "threadId" FROM steps
+                        WHERE "id" = :id AND "output" IS NOT NULL AND "output" != ''"""
+                    ),
+                    parameters,
+                )
+                await session.commit()
+            except SQLAlchemyError as e:
+                await session.rollback()
+                logger.warning(f"An error occurred: {e}")
+
     ###### Steps ######
     @queue_until_user_message()
     async def create_step(self, step_dict: "StepDict"):
-        await self.update_thread(step_dict["threadId"])
-
         if self.show_logger:
             logger.info(f"SQLAlchemy: create_step, step_id={step_dict.get('id')}")
 
+        if self.write_behind is None:
+            await self.update_thread(step_dict["threadId"])
+
         step_dict["showInput"] = (
             str(step_dict.get("showInput", "")).lower()
             if "showInput" in step_dict
@@ -502,6 +1467,16 @@ class SQLAlchemyDataLayer(BaseDataLayer):
         }
         parameters["metadata"] = json.dumps(step_dict.get("metadata", {}))
         parameters["generation"] = json.dumps(step_dict.get("generation", {}))
+        if self.write_behind is not None:
+            # same upserts as update_thread(thread_id) and the query below
+            thread_id = step_dict["threadId"]
+            self.write_behind.upsert(
+                thread_id,
+                "threads",
+                {"id": thread_id, "createdAt": await self.get_current_timestamp()},
+            )
+            self.write_behind.upsert(thread_id, "steps", parameters)
+            return
         columns = ", ".join(f'"{key}"' for key in parameters.keys())
         values = ", ".join(f":{key}" for key in parameters.keys())
         updates = ", ".join(
@@ -514,6 +1489,16 @@ class SQLAlchemyDataLayer(BaseDataLayer):
             SET {updates};
         """
         await self.execute_sql(query=query, parameters=parameters)
+        if "createdAt" in parameters and await self._has_thread_activity():
+            await self.execute_sql(
+                query=THREAD_ACTIVITY_UPDATE,
+                parameters={
+                    "threadId": step_dict["threadId"],
+                    "createdAt": parameters["createdAt"],
+                },
+            )
+        if "output" in parameters:
+            await self._index_step_output(step_dict["id"])
 
     @queue_until_user_message()
     async def update_step(self, step_dict: "StepDict"):
@@ -525,14 +1510,30 @@ class SQLAlchemyDataLayer(BaseDataLayer):
     async def delete_step(self, step_id: str):
         if self.show_logger:
             logger.info(f"SQLAlchemy: delete_step, step_id={step_id}")
+        await self.flush()
         # Delete feedbacks/elements/steps
         feedbacks_query = """DELETE FROM feedbacks WHERE "forId" = :id"""
         elements_query = """DELETE FROM elements WHERE "forId" = :id"""
         steps_query = """DELETE FROM steps WHERE "id" = :id"""
         parameters = {"id": step_id}
+        steps = await self.execute_sql(
+            query="""SELECT "threadId" FROM steps WHERE "id" = :id""",
+            parameters=parameters,
+        )
         await self.execute_sql(query=feedbacks_query, parameters=parameters)
         await self.execute_sql(query=elements_query, parameters=parameters)
+        if await self._has_search_index():
+            await self.execute_sql(
+                query="""DELETE FROM steps_fts
+                WHERE rowid = (SELECT rowid FROM steps WHERE "id" = :id)""",
+                parameters=parameters,
+            )
         await self.execute_sql(query=steps_query, parameters=parameters)
+        if isinstance(steps, list) and steps and await self._has_thread_activity():
+            await self.execute_sql(
+                query=THREAD_ACTIVITY_REFRESH + 'WHERE "id" = :thread_id',
+                parameters={"thread_id": steps[0]["threadId"]},
+            )
 
     ###### Feedback ######
     async def upsert_feedback(self, feedback: Feedback) -> str:
@@ -574,6 +1575,7 @@ class SQLAlchemyDataLayer(BaseDataLayer):
             logger.info(
                 f"SQLAlchemy: get_element, thread_id={thread_id}, element_id={element_id}"
             )
+        await self.flush(thread_id)
         query = """SELECT * FROM elements WHERE "threadId" = :thread_id AND "id" = :element_id"""
         parameters = {"thread_id": thread_id, "element_id": element_id}
         element: Union[List[Dict[str, Any]], int, None] = await self.execute_sql(
@@ -658,6 +1660,12 @@ class SQLAlchemyDataLayer(BaseDataLayer):
         element_dict_cleaned = {k: v for k, v in element_dict.items() if v is not None}
         if "props" in element_dict_cleaned:
             element_dict_cleaned["props"] = json.dumps(element_dict_cleaned["props"])
+        if self.write_behind is not None and element.thread_id:
+            # the file is already uploaded: only the row waits for the flush
+            self.write_behind.upsert(
+                element.thread_id, "elements", element_dict_cleaned
+            )
+            return
 
         columns = ", ".join(f'"{column}"' for column in element_dict_cleaned.keys())
         placeholders = ", ".join(f":{column}" for column in element_dict_cleaned.keys())
@@ -673,6 +1681,7 @@ class SQLAlchemyDataLayer(BaseDataLayer):
     async def delete_element(self, element_id: str, thread_id: Optional[str] = None):
         if self.show_logger:
             logger.info(f"SQLAlchemy: delete_element, element_id={element_id}")
+        await self.flush(thread_id)
 
         query = """SELECT * FROM elements WHERE "id" = :id"""
         elements = await self.execute_sql(query, {"id": element_id})
@@ -696,15 +1705,9 @@ class SQLAlchemyDataLayer(BaseDataLayer):
         """Fetch all user threads up to self.user_thread_limit, or one thread by id if thread_id is provided."""
         if self.show_logger:
             logger.info("SQLAlchemy: get_all_user_threads")
-        user_threads_query = """
-            SELECT
-                t."id" AS thread_id,
-                t."createdAt" AS thread_createdat,
-                t."name" AS thread_name,
-                t."userId" AS user_id,
-                t."userIdentifier" AS user_identifier,
-                t."tags" AS thread_tags,
-                t."metadata" AS thread_metadata,
+        await self.flush_user(user_id, thread_id)
+        user_threads_query = f"""
+            SELECT {THREAD_HEADER_COLUMNS},
                 MAX(s."createdAt") AS updatedAt
             FROM threads t
             LEFT JOIN steps s ON t."id" = s."threadId"
@@ -731,14 +1734,81 @@ class SQLAlchemyDataLayer(BaseDataLayer):
         )
         if not isinstance(user_threads, list):
             return None
-        if not user_threads:
-            return []
+        return await self._hydrate_threads(user_threads)
+
+    async def iter_user_threads(
+        self, user_id: str, batch_size: int = EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[ThreadDict]:
+        """Yield every thread of a user with its steps and elements, oldest
+        first.
+
+        The threads are read and hydrated ``batch_size`` at a time, with a
+        keyset on ("createdAt", "id"), so memory use does not grow with the
+        history. Every page is read in its own session, closed before its
+        threads are yielded: a slow client does not hold a connection (or
+        SQLite's read snapshot) for the whole download.
+        """
+        if self.show_logger:
+            logger.info(f"SQLAlchemy: iter_user_threads, user_id={user_id}")
+        await self.flush_user(user_id)
+        query = f"""
+            SELECT {THREAD_HEADER_COLUMNS},
+                COALESCE(t."createdAt", '') AS thread_cursor
+            FROM threads t
+            WHERE t."userId" = :user_id AND t."deletedAt" IS NULL
+            {{keyset}}
+            ORDER BY COALESCE(t."createdAt", ''), t."id"
+            LIMIT :limit
+        """
+        keyset = """AND (COALESCE(t."createdAt", '') > :cursor_created_at
+            OR (COALESCE(t."createdAt", '') = :cursor_created_at
+                AND t."id" > :cursor_id))"""
+        parameters: Dict[str, Any] = {"user_id": user_id, "limit": batch_size}
+        page = query.format(keyset="")
+        while True:
+            headers = await self.execute_sql(page, parameters)
+            if not isinstance(headers, list) or not headers:
+                return
+            last = headers[-1]
+            parameters["cursor_created_at"] = last["thread_cursor"]
+            parameters["cursor_id"] = last["thread_id"]
+            page = query.format(keyset=keyset)
+            for thread in await self._hydrate_threads(headers):
+                yield thread
+            if len(headers) < batch_size:
+                return
+
+    async def _hydrate_threads(
+        self, thread_headers: List[Dict[str, Any]]
+    ) -> List[ThreadDict]:
+        """Load the steps (with their feedback) and elements of the threads.
+
+        The thread ids are bound THREAD_BATCH_SIZE at a time and the rows are
+        streamed into the ThreadDicts.
+        """
+        thread_dicts = {}
+        for thread in thread_headers:
+            thread_id = thread["thread_id"]
+            if thread_id is not None:
+                self.thread_authors.set(thread_id, thread["user_identifier"])
+                thread_dicts[thread_id] = ThreadDict(
+                    id=thread_id,
+                    createdAt=thread["thread_createdat"],
+                    name=thread["thread_name"],
+                    userId=thread["user_id"],
+                    userIdentifier=thread["user_identifier"],
+                    tags=thread["thread_tags"],
+                    metadata=thread["thread_metadata"],
+                    steps=[],
+                    elements=[],
+                )
+        thread_ids = list(thread_dicts)
+        # Postgres takes the ids as one array parameter, so the prepared
+        # statement is the same whatever the number of threads
+        if self._is_sqlite:
+            in_thread_ids, expanding = "IN :thread_ids", ["thread_ids"]
         else:
-            thread_ids = (
-                "('"
-                + "','".join(map(str, [thread["thread_id"] for thread in user_threads]))
-                + "')"
-            )
+            in_thread_ids, expanding = "= ANY(:thread_ids)", []
 
         steps_feedbacks_query = f"""
             SELECT
@@ -764,13 +1834,9 @@ class SQLAlchemyDataLayer(BaseDataLayer):
                 f."comment" AS feedback_comment,
                 f."id" AS feedback_id
             FROM steps s LEFT JOIN feedbacks f ON s."id" = f."forId"
-            WHERE s."threadId" IN {thread_ids}
+            WHERE s."threadId" {in_thread_ids}
             ORDER BY s."createdAt" ASC
         """
-        steps_feedbacks = await self.execute_sql(
-            query=steps_feedbacks_query, parameters={}
-        )
-
         elements_query = f"""
             SELECT
                 e."id" AS element_id,
@@ -788,28 +1854,16 @@ class SQLAlchemyDataLayer(BaseDataLayer):
                 e."mime" AS element_mime,
                 e."props" AS props
             FROM elements e
-            WHERE e."threadId" IN {thread_ids}
+            WHERE e."threadId" {in_thread_ids}
         """
-        elements = await self.execute_sql(query=elements_query, parameters={})
-
-        thread_dicts = {}
-        for thread in user_threads:
-            thread_id = thread["thread_id"]
-            if thread_id is not None:
-                thread_dicts[thread_id] = ThreadDict(
-                    id=thread_id,
-                    createdAt=thread["thread_createdat"],
-                    name=thread["thread_name"],
-                    userId=thread["user_id"],
-                    userIdentifier=thread["user_identifier"],
-                    tags=thread["thread_tags"],
-                    metadata=thread["thread_metadata"],
-                    steps=[],
-                    elements=[],
-                )
-        # Process steps_feedbacks to populate the steps in the corresponding ThreadDict
-        if isinstance(steps_feedbacks, list):
-            for step_feedback in steps_feedbacks:
+        # elements are signed once their rows have been read, not while the
+        # connection is held
+        elements: List[Dict[str, Any]] = []
+        for start in range(0, len(thread_ids), THREAD_BATCH_SIZE):
+            parameters = {"thread_ids": thread_ids[start : start + THREAD_BATCH_SIZE]}
+            async for step_feedback in self.stream_sql(
+                steps_feedbacks_query, parameters, expanding
+            ):
                 thread_id = step_feedback["step_threadid"]
                 if thread_id is not None:
                     feedback = None
@@ -852,54 +1906,66 @@ class SQLAlchemyDataLayer(BaseDataLayer):
                     )
                     # Append the step to the steps list of the corresponding ThreadDict
                     thread_dicts[thread_id]["steps"].append(step_dict)
+            elements += [
+                element
+                async for element in self.stream_sql(
+                    elements_query, parameters, expanding
+                )
+            ]
+
+        # one signing batch for all the elements, falling back to the stored
+        # URL of the ones that could not be signed
+        read_urls: Dict[str, str] = {}
+        object_keys = [
+            element["element_objectkey"]
+            for element in elements
+            if isinstance(element.get("element_objectkey"), str)
+            and element["element_objectkey"].strip()
+        ]
+        if self.storage_provider is not None and object_keys:
+            try:
+                read_urls = await self.storage_provider.get_read_urls(object_keys)
+            except Exception as e:
+                logger.warning(
+                    f"Failed to get read URLs: {e}. Falling back to stored URLs."
+                )
 
-        if isinstance(elements, list):
-            for element in elements:
-                thread_id = element["element_threadid"]
-                if thread_id is not None:
-                    element_url: str | None = None
-                    object_key_val = element.get("element_objectkey")
-                    if (
-                        self.storage_provider is not None
-                        and isinstance(object_key_val, str)
-                        and object_key_val.strip()
-                    ):
-                        try:
-                            element_url = await self.storage_provider.get_read_url(
-                                object_key=object_key_val,
-                            )
-                        except Exception as e:
-                            logger.warning(
-                                f"Failed to get read URL for object_key '{object_key_val}': {e}. Falling back to stored URL."
-                            )
-                            element_url = element.get("element_url")
-                    else:
-                        element_url = element.get("element_url")
-                    element_dict = ElementDict(
-                        id=element["element_id"],
-                        threadId=thread_id,
-                        type=element["element_type"],
-                        chainlitKey=element.get("element_chainlitkey"),
-                        url=element_url,
-                        objectKey=element.get("element_objectkey"),
-                        name=element["element_name"],
-                        display=element["element_display"],
-                        size=element.get("element_size"),
-                        language=element.get("element_language"),
-                        autoPlay=element.get("element_autoPlay"),
-                        playerConfig=element.get("element_playerconfig"),
-                        page=element.get("element_page"),
-                        props=element.get("props", "{}"),
-                        forId=element.get("element_forid"),
-                        mime=element.get("element_mime"),
-                    )
-                    elements_list = thread_dicts[thread_id]["elements"]
-                    if elements_list is not None:
-                        elements_list.append(element_dict)
+        for element in elements:
+            thread_id = element["element_threadid"]
+            if thread_id is not None:
+                element_url: str | None = read_urls.get(
+                    element.get("element_objectkey") or "",
+                    element.get("element_url"),
+                )
+                element_dict = ElementDict(
+                    id=element["element_id"],
+                    threadId=thread_id,
+                    type=element["element_type"],
+                    chainlitKey=element.get("element_chainlitkey"),
+                    url=element_url,
+                    objectKey=element.get("element_objectkey"),
+                    name=element["element_name"],
+                    display=element["element_display"],
+                    size=element.get("element_size"),
+                    language=element.get("element_language"),
+                    autoPlay=element.get("element_autoPlay"),
+                    playerConfig=element.get("element_playerconfig"),
+                    page=element.get("element_page"),
+                    props=element.get("props", "{}"),
+                    forId=element.get("element_forid"),
+                    mime=element.get("element_mime"),
+                )
+                elements_list = thread_dicts[thread_id]["elements"]
+                if elements_list is not None:
+                    elements_list.append(element_dict)
 
         return list(thread_dicts.values())
 
     async def close(self) -> None:
+        if self.write_behind is not None:
+            await self.write_behind.close()
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
         if self.storage_provider:
             await self.storage_provider.close()
         await self.engine.dispose()
@@ -1,9 +1,10 @@
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Union
+from typing import Any, Dict, List, Union
 
 from azure.storage.blob import BlobSasPermissions, ContentSettings, generate_blob_sas
 from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
 
+from chainlit import make_async
 from chainlit.data.storage_clients.base import BaseStorageClient, storage_expiry_time
 from chainlit.logger import logger
 
@@ -27,7 +28,7 @@ class AzureBlobStorageClient(BaseStorageClient):
         )
         logger.info("AzureBlobStorageClient initialized")
 
-    async def get_read_url(self, object_key: str) -> str:
+    def sync_get_read_url(self, object_key: str) -> str:
         if not self.storage_key:
             raise Exception("Not using Azure Storage")
 
@@ -47,6 +48,22 @@ class AzureBlobStorageClient(BaseStorageClient):
 
         return f"https://{self.storage_account}.blob.core.windows.net/{self.container_name}/{object_key}?{sas_token}"
 
+    async def get_read_url(self, object_key: str) -> str:
+        return self.sync_get_read_url(object_key)
+
+    def sync_get_read_urls(self, object_keys: List[str]) -> Dict[str, str]:
+        urls: Dict[str, str] = {}
+        for object_key in object_keys:
+            try:
+                urls[object_key] = self.sync_get_read_url(object_key)
+            except Exception as e:
+                logger.warning(f"AzureBlobStorageClient, get_read_url error: {e}")
+        return urls
+
+    async def sign_read_urls(self, object_keys: List[str]) -> Dict[str, str]:
+        # SAS tokens are computed locally: one worker thread signs the batch
+        return await make_async(self.sync_get_read_urls)(object_keys)
+
     async def upload_file(
         self,
         object_key: str,
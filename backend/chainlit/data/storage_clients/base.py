@@ -1,10 +1,50 @@
+import asyncio
 import os
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Union
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from chainlit.logger import logger
 
 storage_expiry_time = int(os.getenv("STORAGE_EXPIRY_TIME", 3600))
 
 
+class SignedUrlCache:
+    """LRU cache of signed read URLs.
+
+    A URL is reused for half of ``storage_expiry_time`` by default, so the
+    URLs handed out stay valid for at least the other half.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_size: int = 10_000) -> None:
+        self.ttl = storage_expiry_time / 2 if ttl is None else ttl
+        self.max_size = max_size
+        self._urls: OrderedDict[str, Tuple[str, float]] = OrderedDict()
+
+    def get(self, object_key: str) -> Optional[str]:
+        entry = self._urls.get(object_key)
+        if entry is None:
+            return None
+        url, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._urls[object_key]
+            return None
+        self._urls.move_to_end(object_key)
+        return url
+
+    def set(self, object_key: str, url: str) -> None:
+        if self.ttl <= 0:
+            return
+        self._urls[object_key] = (url, time.monotonic() + self.ttl)
+        self._urls.move_to_end(object_key)
+        while len(self._urls) > self.max_size:
+            self._urls.popitem(last=False)
+
+    def clear(self) -> None:
+        self._urls.clear()
+
+
 class BaseStorageClient(ABC):
     """Base class for non-text data persistence like Azure Data Lake, S3, Google Storage, etc."""
 
@@ -27,6 +67,54 @@ class BaseStorageClient(ABC):
     async def get_read_url(self, object_key: str) -> str:
         pass
 
+    @property
+    def read_url_cache(self) -> SignedUrlCache:
+        cache = self.__dict__.get("_read_url_cache")
+        if cache is None:
+            cache = self.__dict__["_read_url_cache"] = SignedUrlCache()
+        return cache
+
+    async def get_read_urls(self, object_keys: List[str]) -> Dict[str, str]:
+        """Read URLs of several objects, signed in one batch.
+
+        URLs signed less than ``read_url_cache.ttl`` ago are reused. Keys
+        that could not be signed are left out of the result.
+        """
+        urls: Dict[str, str] = {}
+        missing: List[str] = []
+        for object_key in dict.fromkeys(object_keys):
+            url = self.read_url_cache.get(object_key)
+            if url is None:
+                missing.append(object_key)
+            else:
+                urls[object_key] = url
+        if missing:
+            signed = await self.sign_read_urls(missing)
+            for object_key, url in signed.items():
+                # get_read_url of some clients returns the key itself when
+                # signing fails: that is not a URL to hand out or cache
+                if url == object_key:
+                    continue
+                self.read_url_cache.set(object_key, url)
+                urls[object_key] = url
+        return urls
+
+    async def sign_read_urls(self, object_keys: List[str]) -> Dict[str, str]:
+        """Sign the read URLs of ``object_keys`` concurrently."""
+        results = await asyncio.gather(
+            *(self.get_read_url(object_key) for object_key in object_keys),
+            return_exceptions=True,
+        )
+        urls: Dict[str, str] = {}
+        for object_key, result in zip(object_keys, results):
+            if isinstance(result, BaseException):
+                logger.warning(
+                    f"Failed to get read URL for object_key '{object_key}': {result}"
+                )
+            else:
+                urls[object_key] = result
+        return urls
+
     @abstractmethod
     async def close(self) -> None:
         pass
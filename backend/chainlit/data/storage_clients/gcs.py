@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 from google.auth import default
 from google.cloud import storage  # type: ignore
@@ -48,6 +48,19 @@ class GCSStorageClient(BaseStorageClient):
     async def get_read_url(self, object_key: str) -> str:
         return await make_async(self.sync_get_read_url)(object_key)
 
+    def sync_get_read_urls(self, object_keys: List[str]) -> Dict[str, str]:
+        urls: Dict[str, str] = {}
+        for object_key in object_keys:
+            try:
+                urls[object_key] = self.sync_get_read_url(object_key)
+            except Exception as e:
+                logger.warning(f"GCSStorageClient, get_read_url error: {e}")
+        return urls
+
+    async def sign_read_urls(self, object_keys: List[str]) -> Dict[str, str]:
+        # V4 signatures are computed locally: one worker thread signs the batch
+        return await make_async(self.sync_get_read_urls)(object_keys)
+
     def sync_upload_file(
         self,
         object_key: str,
@@ -1,5 +1,5 @@
 import os
-from typing import Any, Dict, Union
+from typing import Any, Dict, List, Union
 
 import boto3  # type: ignore
 
@@ -21,14 +21,16 @@ class S3StorageClient(BaseStorageClient):
         except Exception as e:
             logger.warning(f"S3StorageClient initialization error: {e}")
 
+    def _presign(self, object_key: str) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": object_key},
+            ExpiresIn=storage_expiry_time,
+        )
+
     def sync_get_read_url(self, object_key: str) -> str:
         try:
-            url = self.client.generate_presigned_url(
-                "get_object",
-                Params={"Bucket": self.bucket, "Key": object_key},
-                ExpiresIn=storage_expiry_time,
-            )
-            return url
+            return self._presign(object_key)
         except Exception as e:
             logger.warning(f"S3StorageClient, get_read_url error: {e}")
             return object_key
@@ -36,6 +38,21 @@ class S3StorageClient(BaseStorageClient):
     async def get_read_url(self, object_key: str) -> str:
         return await make_async(self.sync_get_read_url)(object_key)
 
+    def sync_get_read_urls(self, object_keys: List[str]) -> Dict[str, str]:
+        # unlike get_read_url, a key that could not be signed is left out
+        # instead of being returned as its own URL, and so is not cached
+        urls: Dict[str, str] = {}
+        for object_key in object_keys:
+            try:
+                urls[object_key] = self._presign(object_key)
+            except Exception as e:
+                logger.warning(f"S3StorageClient, get_read_url error: {e}")
+        return urls
+
+    async def sign_read_urls(self, object_keys: List[str]) -> Dict[str, str]:
+        # presigning is computed locally: one worker thread signs the batch
+        return await make_async(self.sync_get_read_urls)(object_keys)
+
     def sync_upload_file(
         self,
         object_key: str,
@@ -0,0 +1,53 @@
+"""Per-process map of thread ids to their author.
+
+``chainlit.data.acl.is_thread_author`` calls ``get_thread_author`` before
+every thread, element, rename, share and delete endpoint. The author of a
+thread never changes once it is set, so the entries don't expire: data
+layers record the authors they write and read in
+``BaseDataLayer.thread_authors``, ``get_thread_author`` only queries the
+database on a miss, and ``delete_thread`` evicts the thread.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+
+
+class ThreadAuthorCache:
+    def __init__(self, max_size: int = 100_000) -> None:
+        self.max_size = max_size
+        self._authors: OrderedDict[str, str] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, thread_id: str) -> Optional[str]:
+        author = self._authors.get(thread_id)
+        if author is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._authors.move_to_end(thread_id)
+        return author
+
+    def set(self, thread_id: str, author: Optional[str]) -> None:
+        if not author:
+            return
+        self._authors[thread_id] = author
+        self._authors.move_to_end(thread_id)
+        while len(self._authors) > self.max_size:
+            self._authors.popitem(last=False)
+
+    def discard(self, thread_id: str) -> None:
+        self._authors.pop(thread_id, None)
+
+    def clear(self) -> None:
+        self._authors.clear()
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._authors),
+        }
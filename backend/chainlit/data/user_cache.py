@@ -0,0 +1,84 @@
+"""Per-process cache of the users returned by ``get_user``.
+
+A ``PersistedUser`` is looked up on every websocket connect, in
+``on_chat_start`` and in every authenticated REST call that needs it. Data
+layers decorate their ``get_user`` with ``chainlit.data.utils.cached_user``
+to serve these lookups from ``BaseDataLayer.user_cache`` for ``ttl``
+seconds, and invalidate the entry of a user whenever they change it
+(``create_user``, balance updates, payments, account deletion).
+
+The cache is per process: a change made by another worker is seen once the
+entry expires, hence the short default TTL (``USER_CACHE_TTL`` seconds).
+"""
+
+import copy
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Union
+
+from chainlit.user import PersistedUser
+
+user_cache_ttl = float(os.getenv("USER_CACHE_TTL", 10))
+
+
+class UserCache:
+    def __init__(self, ttl: Optional[float] = None, max_size: int = 10_000) -> None:
+        self.ttl = user_cache_ttl if ttl is None else ttl
+        self.max_size = max_size
+        self._users: OrderedDict[str, Tuple[PersistedUser, float]] = OrderedDict()
+        # bumped by every invalidation: a lookup that started before one
+        # may have read the old row and must not be cached
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, identifier: str) -> Optional[PersistedUser]:
+        entry = self._users.get(identifier)
+        if entry is not None and entry[1] <= time.monotonic():
+            del self._users[identifier]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._users.move_to_end(identifier)
+        # callers may change the user they get (display_name, balance...)
+        return copy.deepcopy(entry[0])
+
+    def set(
+        self,
+        identifier: str,
+        user: PersistedUser,
+        generation: Optional[int] = None,
+    ) -> None:
+        """Cache ``user``, unless an entry was invalidated since
+        ``generation`` was read."""
+        if self.ttl <= 0 or (generation is not None and generation != self.generation):
+            return
+        self._users[identifier] = (copy.deepcopy(user), time.monotonic() + self.ttl)
+        self._users.move_to_end(identifier)
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+
+    def invalidate(self, identifier: str) -> None:
+        self.generation += 1
+        self._users.pop(identifier, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._users.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio, 3),
+            "entries": len(self._users),
+        }
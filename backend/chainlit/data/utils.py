@@ -27,3 +27,24 @@ def queue_until_user_message():
         return wrapper
 
     return decorator
+
+
+def cached_user():
+    """Serve ``get_user`` from the data layer's ``user_cache``."""
+
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, identifier: str):
+            cache = self.user_cache
+            user = cache.get(identifier)
+            if user is not None:
+                return user
+            generation = cache.generation
+            user = await method(self, identifier)
+            if user is not None:
+                cache.set(identifier, user, generation)
+            return user
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,117 @@
+"""Write-behind buffer for the upserts of a data layer.
+
+While a message streams, every ``Message.send``/``update`` ends up in
+``create_step``, and each call is a transaction of its own. A data layer
+using ``WriteBehind`` records these upserts in memory instead, merged per
+thread and per row, and writes them in batches, one transaction per flush:
+
+- ``interval`` seconds after the first pending upsert, from a background task
+- right away once ``max_rows`` rows are pending
+- when ``flush`` is called: at the end of a turn, when the session ends,
+  and by ``close`` on shutdown
+- when ``flush_threads`` is called, before the data layer reads threads
+  back: only the threads being read are written
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from chainlit.logger import logger
+
+# table -> rows to upsert
+WriteBatch = Dict[str, List[Dict[str, Any]]]
+
+
+class WriteBehind:
+    def __init__(
+        self,
+        write: Callable[[WriteBatch], Awaitable[None]],
+        interval: float = 0.5,
+        max_rows: int = 1000,
+    ):
+        self.write = write
+        self.interval = interval
+        self.max_rows = max_rows
+        # upserts received and batches written, to compare them
+        self.upserts = 0
+        self.batches = 0
+        # thread id -> table -> row id -> columns
+        self._pending: Dict[str, Dict[str, Dict[Any, Dict[str, Any]]]] = {}
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        """Number of rows waiting to be written."""
+        return sum(
+            len(rows) for tables in self._pending.values() for rows in tables.values()
+        )
+
+    @property
+    def thread_ids(self) -> List[str]:
+        """Threads with rows waiting to be written."""
+        return list(self._pending)
+
+    def upsert(self, thread_id: str, table: str, row: Dict[str, Any]):
+        """Record an upsert; a later upsert of the same row id overrides the
+        columns it sets and keeps the others."""
+        rows = self._pending.setdefault(thread_id, {}).setdefault(table, {})
+        rows.setdefault(row["id"], {}).update(row)
+        self.upserts += 1
+        if self.pending >= self.max_rows:
+            task = asyncio.create_task(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.interval)
+        # close() cancels the timer: let a flush under way finish
+        await asyncio.shield(self.flush())
+
+    async def flush(self, thread_id: Optional[str] = None):
+        """Write the pending rows of ``thread_id``, or of every thread."""
+        await self.flush_threads(None if thread_id is None else [thread_id])
+
+    async def flush_threads(self, thread_ids: Optional[Iterable[str]]):
+        """Write the pending rows of ``thread_ids`` in one batch, or of every
+        thread if it is None."""
+        async with self._lock:
+            if thread_ids is None:
+                pending, self._pending = self._pending, {}
+            else:
+                pending = {
+                    thread_id: self._pending.pop(thread_id)
+                    for thread_id in thread_ids
+                    if thread_id in self._pending
+                }
+            if not pending:
+                return
+
+            batch: WriteBatch = {}
+            for tables in pending.values():
+                for table, rows in tables.items():
+                    batch.setdefault(table, []).extend(rows.values())
+            try:
+                await self.write(batch)
+                self.batches += 1
+            except Exception as e:
+                logger.error(f"Write-behind flush failed, will retry: {e}")
+                # put the rows back, under the upserts received since
+                for pending_thread_id, tables in pending.items():
+                    for table, rows in tables.items():
+                        current = self._pending.setdefault(
+                            pending_thread_id, {}
+                        ).setdefault(table, {})
+                        for row_id, row in rows.items():
+                            current[row_id] = {**row, **current.get(row_id, {})}
+                if self._timer is None or self._timer.done():
+                    self._timer = asyncio.create_task(self._flush_later())
+
+    async def close(self):
+        """Stop the timer and write everything still pending."""
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        await self.flush()
@@ -0,0 +1,52 @@
+"""Helpers for HTTP validators (``ETag``, ``If-None-Match``,
+``If-Modified-Since``)."""
+
+import hashlib
+from email.utils import parsedate_to_datetime
+from typing import Optional, Union
+
+
+def strong_etag(content: Union[str, bytes]) -> str:
+    """Strong ``ETag`` of a response body."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``etag``.
+
+    ``If-None-Match`` uses the weak comparison: ``W/"x"`` matches ``"x"``.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def is_not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: str,
+    last_modified: Optional[float] = None,
+) -> bool:
+    """Whether a conditional request can be answered with a 304.
+
+    ``If-Modified-Since`` is only looked at when there is no
+    ``If-None-Match``; ``last_modified`` is a timestamp.
+    """
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    # HTTP dates have a resolution of one second
+    return int(last_modified) <= since.timestamp()
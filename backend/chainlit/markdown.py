@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
 from chainlit.logger import logger
 
@@ -34,8 +34,34 @@ def init_markdown(root: str):
             logger.info(f"Created default chainlit markdown file at {chainlit_md_file}")
 
 
+# markdown file -> its content, see get_markdown_str. Keyed by the file the
+# language resolved to, so it holds one entry per file whatever languages the
+# clients ask for.
+_markdown: Dict[Path, Optional[str]] = {}
+
+
+def clear_markdown():
+    _markdown.clear()
+
+
 def get_markdown_str(root: str, language: str) -> Optional[str]:
-    """Get the chainlit.md file as a string."""
+    """Get the chainlit.md file as a string.
+
+    Each file is read once per process; the file watcher clears the cache
+    through ``clear_markdown``.
+    """
+    chainlit_md_path = get_markdown_path(root, language)
+    if chainlit_md_path not in _markdown:
+        _markdown[chainlit_md_path] = (
+            chainlit_md_path.read_text(encoding="utf-8")
+            if chainlit_md_path.is_file()
+            else None
+        )
+    return _markdown[chainlit_md_path]
+
+
+def get_markdown_path(root: str, language: str) -> Path:
+    """The chainlit.md file of ``language``, else the default one."""
     root_path = Path(root)
     translated_chainlit_md_path = root_path / f"chainlit_{language}.md"
     default_chainlit_md_path = root_path / "chainlit.md"
@@ -44,14 +70,8 @@ def get_markdown_str(root: str, language: str) -> Optional[str]:
         is_path_inside(translated_chainlit_md_path, root_path)
         and translated_chainlit_md_path.is_file()
     ):
-        chainlit_md_path = translated_chainlit_md_path
-    else:
-        chainlit_md_path = default_chainlit_md_path
-        logger.warning(
-            f"Translated markdown file for {language} not found. Defaulting to chainlit.md."
-        )
-
-    if chainlit_md_path.is_file():
-        return chainlit_md_path.read_text(encoding="utf-8")
-    else:
-        return None
+        return translated_chainlit_md_path
+    logger.warning(
+        f"Translated markdown file for {language} not found. Defaulting to chainlit.md."
+    )
+    return default_chainlit_md_path
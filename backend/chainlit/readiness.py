@@ -0,0 +1,33 @@
+"""Readiness of the resources an app loads in the background.
+
+An app marks a resource as warming before it starts loading it and as ready
+once it is loaded (or failed to load); the ``HEAD /`` status check reports
+"warming" while any resource is still pending.
+"""
+
+import threading
+from typing import List, Set
+
+_warming: Set[str] = set()
+_lock = threading.Lock()
+
+
+def mark_warming(name: str):
+    with _lock:
+        _warming.add(name)
+
+
+def mark_ready(name: str):
+    with _lock:
+        _warming.discard(name)
+
+
+def warming() -> List[str]:
+    """Names of the resources that are still loading."""
+    with _lock:
+        return sorted(_warming)
+
+
+def is_ready() -> bool:
+    with _lock:
+        return not _warming
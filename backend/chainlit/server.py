@@ -10,7 +10,7 @@ import urllib.parse
 import webbrowser
 from contextlib import AsyncExitStack, asynccontextmanager
 from pathlib import Path
-from typing import List, Optional, Union, cast
+from typing import Dict, List, Literal, Optional, Tuple, Union, cast
 
 import socketio
 from fastapi import (
@@ -26,7 +26,13 @@ from fastapi import (
     status,
 )
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import (
+    FileResponse,
+    HTMLResponse,
+    JSONResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
 from fastapi.security import OAuth2PasswordRequestForm
 from starlette.datastructures import URL
 from starlette.middleware.cors import CORSMiddleware
@@ -53,16 +59,20 @@ from chainlit.config import (
     FILES_DIRECTORY,
     PACKAGE_ROOT,
     ChainlitConfig,
+    clear_translations,
     config,
+    config_translation_dir,
     load_module,
+    overrides_key,
     public_dir,
     reload_config,
 )
 from chainlit.contact import ContactFormRequest, ContactFormResponse
 from chainlit.data import get_data_layer
 from chainlit.data.acl import is_thread_author
+from chainlit.http_cache import etag_matches, strong_etag
 from chainlit.logger import logger, payment_logger
-from chainlit.markdown import get_markdown_str
+from chainlit.markdown import clear_markdown, get_markdown_str
 from chainlit.oauth_providers import get_oauth_provider
 from chainlit.order import (
     AmountPaidType,
@@ -79,11 +89,14 @@ from chainlit.order import (
     get_viva_payment_transaction_status,
     get_viva_webhook_key,
 )
+from chainlit.readiness import warming
 from chainlit.redirect_schema import RedirectSchema, RedirectSchemaError
 from chainlit.secret import random_secret
+from chainlit.static_files import is_hashed, static_files
 from chainlit.types import (
     AskFileSpec,
     CallActionRequest,
+    ChatProfile,
     ConnectMCPRequest,
     DeleteFeedbackRequest,
     DeleteThreadRequest,
@@ -126,6 +139,15 @@ async def lifespan(app: FastAPI):
         await asyncio.sleep(1)
         webbrowser.open(url)
 
+    # Compress the UI's text files once, off the event loop
+    precompress_task = asyncio.create_task(
+        asyncio.to_thread(
+            static_files.precompress,
+            [os.path.join(build_dir, "assets"), copilot_build_dir, public_dir],
+        )
+    )
+    precompress_task.add_done_callback(log_precompressed)
+
     watch_task = None
     stop_event = asyncio.Event()
 
@@ -139,7 +161,18 @@ async def lifespan(app: FastAPI):
                     file_name = os.path.basename(file_path)
                     file_ext = os.path.splitext(file_name)[1]
 
-                    if file_ext.lower() in extensions or file_name.lower() in files:
+                    if (
+                        file_ext.lower() in extensions
+                        or file_name.lower() in files
+                        # translated welcome screens and translations
+                        or fnmatch.fnmatch(file_name.lower(), "chainlit_*.md")
+                        or (
+                            file_ext.lower() == ".json"
+                            and is_path_inside(
+                                Path(file_path), Path(config_translation_dir)
+                            )
+                        )
+                    ):
                         logger.info(
                             f"File {change_type.name}: {file_name}. Reloading app..."
                         )
@@ -150,6 +183,8 @@ async def lifespan(app: FastAPI):
                             logger.error(f"Error reloading config: {e}")
                             break
 
+                        clear_project_caches()
+
                         # Reload the module if the module name is specified in the config
                         if config.run.module_name:
                             try:
@@ -204,6 +239,8 @@ async def lifespan(app: FastAPI):
         except asyncio.exceptions.CancelledError:
             pass
 
+        static_files.close()
+
         if FILES_DIRECTORY.is_dir():
             shutil.rmtree(FILES_DIRECTORY)
 
@@ -211,6 +248,15 @@ async def lifespan(app: FastAPI):
         os._exit(0)
 
 
+def log_precompressed(task: "asyncio.Task[int]"):
+    if task.cancelled():
+        return
+    if error := task.exception():
+        logger.error(f"Error precompressing static files: {error}")
+    else:
+        logger.info(f"Precompressed {task.result()} static files")
+
+
 def get_build_dir(local_target: str, packaged_target: str) -> str:
     """
     Get the build directory based on the UI build strategy.
@@ -280,6 +326,7 @@ router = APIRouter(prefix=config.run.root_path)
 
 @router.get("/public/{filename:path}")
 async def serve_public_file(
+    request: Request,
     filename: str,
 ):
     """Serve a file from public dir."""
@@ -291,13 +338,14 @@ async def serve_public_file(
         raise HTTPException(status_code=400, detail="Invalid filename")
 
     if file_path.is_file():
-        return FileResponse(file_path)
+        return static_files.response(request, file_path)
     else:
         raise HTTPException(status_code=404, detail="File not found")
 
 
 @router.get("/assets/{filename:path}")
 async def serve_asset_file(
+    request: Request,
     filename: str,
 ):
     """Serve a file from assets dir."""
@@ -309,13 +357,15 @@ async def serve_asset_file(
         raise HTTPException(status_code=400, detail="Invalid filename")
 
     if file_path.is_file():
-        return FileResponse(file_path)
+        # Vite names the build's assets after their content
+        return static_files.response(request, file_path, immutable=is_hashed(file_path))
     else:
         raise HTTPException(status_code=404, detail="File not found")
 
 
 @router.get("/copilot/{filename:path}")
 async def serve_copilot_file(
+    request: Request,
     filename: str,
 ):
     """Serve a file from assets dir."""
@@ -327,7 +377,7 @@ async def serve_copilot_file(
         raise HTTPException(status_code=400, detail="Invalid filename")
 
     if file_path.is_file():
-        return FileResponse(file_path)
+        return static_files.response(request, file_path, immutable=is_hashed(file_path))
     else:
         raise HTTPException(status_code=404, detail="File not found")
 
@@ -380,10 +430,83 @@ def replace_between_tags(
     return re.sub(pattern, start_tag + replacement + end_tag, text, flags=re.DOTALL)
 
 
+# root_path -> (mtimes of the source files, rendered template, ETag)
+_html_templates: Dict[str, Tuple[Tuple[Optional[int], ...], str, str]] = {}
+
+
+def clear_html_templates():
+    """Drop the rendered templates, e.g. after the config was reloaded."""
+    _html_templates.clear()
+
+
+def _html_template_sources() -> Tuple[Optional[int], ...]:
+    """Modification times of the files the index view is rendered from."""
+    mtimes = []
+    for file_path in (
+        os.path.join(build_dir, "index.html"),
+        os.path.join(public_dir, "theme.json"),
+    ):
+        try:
+            mtimes.append(os.stat(file_path).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+def clear_project_caches():
+    """Drop everything rendered from the project's files and config: the
+    index view, the translations, the markdown and the profile settings."""
+    clear_html_templates()
+    clear_translations()
+    clear_markdown()
+    _translation_bodies.clear()
+    _profile_settings.clear()
+
+
+def etag_response(
+    request: Request,
+    body: bytes,
+    etag: Optional[str] = None,
+    cache_control: str = "no-cache",
+) -> Response:
+    """JSON ``body`` with an ETag, or a 304 if the client already has it."""
+    etag = etag or strong_etag(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def get_cached_html_template(root_path: str) -> Tuple[str, str]:
+    """
+    Get the HTML template for the index view and its ETag.
+
+    The template is rendered once per root path and rendered again when
+    index.html or theme.json change, or when the config is reloaded.
+    """
+    root_path = root_path.rstrip("/")
+    sources = _html_template_sources()
+    cached = _html_templates.get(root_path)
+    if cached is not None and cached[0] == sources:
+        return cached[1], cached[2]
+
+    content = render_html_template(root_path)
+    etag = strong_etag(content)
+    _html_templates[root_path] = (sources, content, etag)
+    return content, etag
+
+
 def get_html_template(root_path):
     """
     Get HTML template for the index view.
     """
+    return get_cached_html_template(root_path)[0]
+
+
+def render_html_template(root_path):
+    """
+    Render the HTML template for the index view.
+    """
     root_path = root_path.rstrip("/")  # Avoid duplicated / when joining with root path.
 
     custom_theme = None
@@ -847,8 +970,19 @@ async def set_session_cookie(request: Request, response: Response):
     return {"message": "Session cookie set"}
 
 
+# id of a translation -> (translation, rendered body, ETag). load_translation
+# hands out one dict per translation file, so there is one entry per file;
+# holding the dict keeps its id from being reused.
+_translation_bodies: Dict[int, Tuple[dict, bytes, str]] = {}
+
+# (profile, overrides) -> config_settings of the merged config, until the
+# file watcher reloads the config and clears it
+_profile_settings: Dict[Tuple[str, str], dict] = {}
+
+
 @router.get("/project/translations")
 async def project_translations(
+    request: Request,
     language: str = Query(
         default="en-US", description="Language code", pattern=_language_pattern
     ),
@@ -858,15 +992,47 @@ async def project_translations(
     # Load translation based on the provided language
     translation = config.load_translation(language)
 
-    return JSONResponse(
-        content={
-            "translation": translation,
-        }
-    )
+    # load_translation hands out the same dict until the watcher clears it
+    cached = _translation_bodies.get(id(translation))
+    if cached is None or cached[0] is not translation:
+        body = JSONResponse(content={"translation": translation}).body
+        cached = _translation_bodies[id(translation)] = (
+            translation,
+            body,
+            strong_etag(body),
+        )
+
+    return etag_response(request, cached[1], cached[2])
+
+
+def config_settings(cfg: ChainlitConfig) -> dict:
+    """The part of the project settings that comes from the config."""
+    return {
+        "ui": cfg.ui.model_dump(),
+        "features": cfg.features.model_dump(),
+        "userEnv": cfg.project.user_env,
+        "maskUserEnv": cfg.project.mask_user_env,
+        "allowThreadSharing": bool(
+            getattr(cfg.features, "allow_thread_sharing", False)
+        ),
+    }
+
+
+def get_profile_settings(profile: ChatProfile) -> dict:
+    """``config_settings`` of a profile's merged config, computed once per
+    profile and overrides."""
+    key = (profile.name, overrides_key(profile.config_overrides))
+    settings = _profile_settings.get(key)
+    if settings is None:
+        settings = _profile_settings[key] = config_settings(
+            config.with_overrides(profile.config_overrides)
+        )
+    return settings
 
 
 @router.get("/project/settings")
 async def project_settings(
+    request: Request,
     current_user: UserParam,
     language: str = Query(
         default="en-US", description="Language code", pattern=_language_pattern
@@ -901,25 +1067,27 @@ async def project_settings(
         await data_layer.build_debug_url() if data_layer and config.run.debug else None
     )
 
-    cfg = config
+    settings = None
     if chat_profile and chat_profiles:
         current_profile = next(
             (p for p in chat_profiles if p.name == chat_profile), None
         )
         if current_profile and getattr(current_profile, "config_overrides", None):
-            cfg = config.with_overrides(current_profile.config_overrides)
+            settings = get_profile_settings(current_profile)
+    if settings is None:
+        settings = config_settings(config)
 
-    return JSONResponse(
+    body = JSONResponse(
         content={
-            "ui": cfg.ui.model_dump(),
-            "features": cfg.features.model_dump(),
-            "userEnv": cfg.project.user_env,
-            "maskUserEnv": cfg.project.mask_user_env,
+            "ui": settings["ui"],
+            "features": settings["features"],
+            "userEnv": settings["userEnv"],
+            "maskUserEnv": settings["maskUserEnv"],
             "dataPersistence": data_layer is not None,
             "threadResumable": bool(config.code.on_chat_resume),
             # Expose whether shared threads feature is enabled (flag + app callback)
             "threadSharing": bool(
-                getattr(cfg.features, "allow_thread_sharing", False)
+                settings["allowThreadSharing"]
                 and getattr(config.code, "on_shared_thread_view", None)
             ),
             "markdown": markdown,
@@ -927,7 +1095,10 @@ async def project_settings(
             "starters": starters,
             "debugUrl": debug_url,
         }
-    )
+    ).body
+
+    # Profiles and starters depend on the user
+    return etag_response(request, body, cache_control="private, no-cache")
 
 
 @router.put("/feedback")
@@ -1784,7 +1955,18 @@ async def get_avatar(avatar_id: str):
 
 @router.head("/")
 def status_check():
-    """Check if the site is operational."""
+    """Check if the site is operational.
+
+    Answers 503 with ``X-Status: warming`` while the app is still loading its
+    resources in the background, so load balancers hold traffic until then.
+    """
+    pending = warming()
+    if pending:
+        return JSONResponse(
+            content={"message": "Site is warming up", "warming": pending},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"X-Status": "warming", "Retry-After": "1"},
+        )
     return {"message": "Site is operational"}
 
 
@@ -2209,12 +2391,20 @@ async def list_transactions(
 @router.get("/user/account")
 async def get_profile(
     current_user: UserParam,
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
 ):
     """
     Get user profile data including balance, payment history, and thread usage.
 
+    The usage comes from the usage ledger and its daily rollup (see
+    ``SQLAlchemyDataLayer.record_turn_usage``), not from the threads' steps.
+
     Args:
         current_user: The authenticated user making the request.
+        limit: Number of threads in ``threadUsage`` (up to the data layer's
+            ``user_thread_limit`` by default).
+        offset: Index of the first thread in ``threadUsage``.
     Returns:
         JSONResponse: A JSON response containing user profile data.
     """
@@ -2247,43 +2437,12 @@ async def get_profile(
         List[UserPaymentInfoDict]
     ] = await data_layer.list_payments_by_user(persisted_user.identifier)
 
-    # Get thread usage (threads have token metadata)
-    threads = await data_layer.get_all_user_threads(user_id=persisted_user.id)
-
-    # Format thread data for response
-    thread_usage = []
-    if threads:
-        for thread in threads:
-            metadata = json.loads(thread.get("metadata") or "{}")
-            steps = thread.get("steps") or []
-
-            # Get per-turn token data from assistant_message steps
-            turns = []
-            for step in steps:
-                if step.get("type") == "assistant_message":
-                    step_metadata = json.loads(step.get("metadata") or "{}")
-                    if step_metadata.get("total_tokens"):
-                        turns.append(
-                            {
-                                "id": step.get("id"),
-                                "createdAt": step.get("createdAt"),
-                                "input_tokens": step_metadata.get("input_tokens", 0),
-                                "output_tokens": step_metadata.get("output_tokens", 0),
-                                "total_tokens": step_metadata.get("total_tokens", 0),
-                            }
-                        )
-
-            thread_usage.append(
-                {
-                    "id": thread.get("id"),
-                    "name": thread.get("name"),
-                    "createdAt": thread.get("createdAt"),
-                    "input_tokens": metadata.get("input_tokens", 0),
-                    "output_tokens": metadata.get("output_tokens", 0),
-                    "total_tokens": metadata.get("total_tokens", 0),
-                    "turns": turns,
-                }
-            )
+    # Per-thread totals with their turns, the per-day rollup and the totals
+    thread_usage = await data_layer.list_thread_usage(
+        persisted_user.id, persisted_user.identifier, limit=limit, offset=offset
+    )
+    daily_usage = await data_layer.list_daily_usage(persisted_user.identifier)
+    usage_totals = await data_layer.get_usage_totals(persisted_user.identifier)
 
     profile_data = {
         "user": {
@@ -2293,11 +2452,77 @@ async def get_profile(
         },
         "payments": payments or [],
         "threadUsage": thread_usage,
+        "dailyUsage": daily_usage,
+        "usageTotals": usage_totals,
     }
 
     return JSONResponse(status_code=status.HTTP_200_OK, content=profile_data)
 
 
+@router.get("/user/account/threads/export")
+async def export_threads(
+    current_user: UserParam,
+    format: Literal["ndjson", "json"] = "ndjson",
+):
+    """
+    Export the authenticated user's threads, with their steps and elements.
+
+    The threads are streamed as they are read from the data layer, one JSON
+    object per line (``ndjson``) or as a JSON array (``json``), so the whole
+    history is never held in memory.
+
+    Args:
+        current_user: The authenticated user making the request.
+        format: ``ndjson`` (default) or ``json``.
+    Returns:
+        StreamingResponse: The threads, oldest first.
+    """
+    data_layer = get_data_layer()
+    if not data_layer:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Data persistence is not enabled",
+        )
+
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Unauthorized"
+        )
+
+    persisted_user = None
+    if isinstance(current_user, PersistedUser):
+        persisted_user = current_user
+    else:
+        persisted_user = await data_layer.get_user(identifier=current_user.identifier)
+
+    if not persisted_user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
+        )
+
+    async def body():
+        if format == "json":
+            yield "["
+        separator = ""
+        async for thread in data_layer.iter_user_threads(persisted_user.id):
+            if format == "json":
+                yield separator + json.dumps(thread, default=str)
+                separator = ","
+            else:
+                yield json.dumps(thread, default=str) + "\n"
+        if format == "json":
+            yield "]"
+
+    media_type = "application/json" if format == "json" else "application/x-ndjson"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="threads.{format}"',
+        },
+    )
+
+
 @router.delete("/user/account")
 async def delete_account(
     current_user: UserParam,
@@ -2337,6 +2562,7 @@ async def delete_account(
     # Delete user and associated data
     try:
         await data_layer.delete_user_data(persisted_user.id)
+        data_layer.user_cache.invalidate(persisted_user.identifier)
     except Exception as e:
         logger.error(f"Error deleting user account: {e}")
         raise HTTPException(
@@ -2418,8 +2644,12 @@ async def serve(request: Request):
     root_path = os.getenv("CHAINLIT_PARENT_ROOT_PATH", "") + os.getenv(
         "CHAINLIT_ROOT_PATH", ""
     )
-    html_template = get_html_template(root_path)
-    response = HTMLResponse(content=html_template, status_code=200)
+    html_template, etag = get_cached_html_template(root_path)
+    # Let browsers revalidate the page on every navigation
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response = HTMLResponse(content=html_template, status_code=200, headers=headers)
 
     return response
 
@@ -269,7 +269,8 @@ class WebsocketSession(BaseSession):
         )
         self.language = match.group(1) if match else "en-US"
 
-        self.config: ChainlitConfig = self.get_config()
+        # Set by resolve_config
+        self.config: Optional[ChainlitConfig] = None
 
         ws_sessions_id[self.id] = self
         ws_sessions_sid[socket_id] = self
@@ -277,33 +278,39 @@ class WebsocketSession(BaseSession):
     def get_config(self) -> "ChainlitConfig":
         """
         Return the config for this session: overridden if chat profile exists and has overrides, else global config.
+
+        The overrides are resolved by ``resolve_config``.
         """
         from chainlit.config import config as global_config
 
         # If no chat profile, always fallback to global config
-        if not self.chat_profile:
+        if not self.chat_profile or self.config is None:
             return global_config
-        # If already computed, use self.config
-        if hasattr(self, "config") and self.config:
-            return self.config
-        # Try to compute overrides
-        cfg = global_config
-        if global_config.code.set_chat_profiles:
-            import asyncio
+        return self.config
 
+    async def resolve_config(self) -> "ChainlitConfig":
+        """
+        Resolve the config of the session's chat profile, once the session
+        is created or its chat profile changed.
+        """
+        from chainlit.config import config as global_config
+
+        cfg = global_config
+        if self.chat_profile and global_config.code.set_chat_profiles:
             try:
-                profiles = asyncio.get_event_loop().run_until_complete(
-                    global_config.code.set_chat_profiles(self.user, self.language)
+                profiles = await global_config.code.set_chat_profiles(
+                    self.user, self.language
                 )
                 current_profile = next(
-                    (p for p in profiles if p.name == self.chat_profile), None
+                    (p for p in profiles or [] if p.name == self.chat_profile), None
                 )
                 if current_profile and getattr(
                     current_profile, "config_overrides", None
                 ):
+                    # Merged once per distinct overrides, see with_overrides
                     cfg = global_config.with_overrides(current_profile.config_overrides)
-            except Exception:
-                pass
+            except Exception as e:
+                logger.warning(f"Could not resolve the chat profile config: {e}")
         self.config = cfg
         return cfg
 
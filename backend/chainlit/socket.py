@@ -53,6 +53,12 @@ async def persist_user_session(thread_id: str, metadata: Dict):
         await data_layer.update_thread(thread_id=thread_id, metadata=metadata)
 
 
+async def flush_thread_writes(session: WebsocketSession):
+    """Write what the data layer buffered for the session's thread."""
+    if session.thread_id and (data_layer := get_data_layer()):
+        await data_layer.flush(session.thread_id)
+
+
 async def resume_thread(session: WebsocketSession):
     data_layer = get_data_layer()
     if not data_layer or not session.user or not session.thread_id_to_resume:
@@ -161,7 +167,7 @@ async def connect(sid: str, environ: WSGIEnvironment, auth: WebSocketSessionAuth
         unquote(url_encoded_chat_profile) if url_encoded_chat_profile else None
     )
 
-    WebsocketSession(
+    session = WebsocketSession(
         id=session_id,
         socket_id=sid,
         emit=emit_fn,
@@ -174,6 +180,7 @@ async def connect(sid: str, environ: WSGIEnvironment, auth: WebSocketSessionAuth
         thread_id=thread_id,
         environ=environ,
     )
+    await session.resolve_config()
 
     return True
 
@@ -195,6 +202,8 @@ async def connection_successful(sid):
     if context.session.thread_id_to_resume and config.code.on_chat_resume:
         thread = await resume_thread(context.session)
         if thread:
+            # The thread may bring back another chat profile
+            await context.session.resolve_config()
             context.session.has_first_interaction = True
             await context.emitter.emit(
                 "first_interaction",
@@ -237,6 +246,7 @@ async def disconnect(sid):
 
     if session.thread_id and session.has_first_interaction:
         await persist_user_session(session.thread_id, session.to_persistable())
+    await flush_thread_writes(session)
 
     async def clear(_sid):
         if session := WebsocketSession.get(_sid):
@@ -289,6 +299,7 @@ async def process_message(session: WebsocketSession, payload: MessagePayload):
         ).send()
     finally:
         await context.emitter.task_end()
+        await flush_thread_writes(session)
 
 
 @sio.on("edit_message")  # pyright: ignore [reportOptionalCall]
@@ -319,6 +330,7 @@ async def edit_message(sid, payload: MessagePayload):
             pass
         finally:
             await context.emitter.task_end()
+            await flush_thread_writes(session)
 
 
 @sio.on("client_message")  # pyright: ignore [reportOptionalCall]
@@ -401,6 +413,7 @@ async def audio_end(sid):
         ).send()
     finally:
         await context.emitter.task_end()
+        await flush_thread_writes(session)
 
 
 @sio.on("chat_settings_change")
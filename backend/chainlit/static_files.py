@@ -0,0 +1,241 @@
+"""Static files of the UI: /assets, /public and /copilot.
+
+- Vite names the files of the build's assets directory after a hash of
+  their content (``index-B2xNYz1c.js``): they are served with a one-year
+  ``Cache-Control: immutable``. Every other file is revalidated.
+- Every response has an ``ETag`` and a ``Last-Modified``, and conditional
+  requests are answered with a 304.
+- Text files are compressed once, at startup, by ``precompress``: with
+  gzip, and with brotli when the ``brotli`` package is installed. Variants
+  shipped by the build (``index.js.br``, ``index.js.gz``) are used as they
+  are. The variant sent is picked from ``Accept-Encoding`` and carries a
+  ``Content-Encoding``, so the GZip middleware leaves it alone.
+- Files are sent with ``FileResponse``, which hands the path to the server
+  (zero-copy ``http.response.pathsend``) when the server supports it.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from fastapi import Request, Response, status
+from fastapi.responses import FileResponse
+
+from chainlit.http_cache import is_not_modified
+from chainlit.logger import logger
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Same threshold as the GZip middleware: smaller files are sent as they are
+MIN_COMPRESS_SIZE = 500
+
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/wasm",
+    "application/xml",
+    "image/svg+xml",
+}
+
+# [name]-[hash].[ext], the names of Vite's build output
+_HASHED_NAME = re.compile(r"-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$")
+
+# encoding -> extension of the precompressed variants, preferred first
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+
+def is_hashed(file_path: Union[str, Path]) -> bool:
+    """Whether the name of a build asset contains a hash of its content."""
+    return _HASHED_NAME.search(os.path.basename(file_path)) is not None
+
+
+def is_compressible(file_path: Union[str, Path]) -> bool:
+    media_type = mimetypes.guess_type(str(file_path))[0] or ""
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Set[str]:
+    """Encodings accepted by the client, those with ``q=0`` left out."""
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding)
+    return accepted
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+class StaticFiles:
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir
+        self._own_cache_dir = False
+        # source path -> encoding -> (variant path, (source mtime_ns, size))
+        self._variants: Dict[str, Dict[str, Tuple[str, Tuple[int, int]]]] = {}
+
+    @property
+    def encodings(self) -> List[str]:
+        return [e for e in ENCODINGS if e != "br" or brotli is not None]
+
+    def precompress(self, directories: Iterable[Union[str, Path]]) -> int:
+        """Index the precompressed variants of the text files under
+        ``directories``, compressing those the build did not ship.
+
+        Returns the number of variants written.
+        """
+        written = 0
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    # the routes look files up by their resolved path
+                    file_path = os.path.realpath(os.path.join(root, name))
+                    if name.endswith(tuple(ENCODINGS.values())):
+                        continue
+                    if not is_compressible(file_path):
+                        continue
+                    try:
+                        written += self._precompress_file(file_path)
+                    except OSError as e:
+                        logger.warning(f"Could not precompress {file_path}: {e}")
+        return written
+
+    def _precompress_file(self, file_path: str) -> int:
+        stat_result = os.stat(file_path)
+        if stat_result.st_size < MIN_COMPRESS_SIZE:
+            return 0
+        source = (stat_result.st_mtime_ns, stat_result.st_size)
+        variants = self._variants.setdefault(file_path, {})
+        written = 0
+        data = None
+        for encoding in self.encodings:
+            shipped = file_path + ENCODINGS[encoding]
+            if os.path.isfile(shipped):
+                variants[encoding] = (shipped, source)
+                continue
+            if data is None:
+                with open(file_path, "rb") as f:
+                    data = f.read()
+            compressed = _compress(data, encoding)
+            if len(compressed) >= len(data):
+                continue
+            variant_path = os.path.join(
+                self._get_cache_dir(),
+                hashlib.sha256(file_path.encode()).hexdigest() + ENCODINGS[encoding],
+            )
+            tmp_path = f"{variant_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, variant_path)
+            variants[encoding] = (variant_path, source)
+            written += 1
+        return written
+
+    def _get_cache_dir(self) -> str:
+        if self.cache_dir is None:
+            self.cache_dir = tempfile.mkdtemp(prefix="chainlit-static-")
+            self._own_cache_dir = True
+        return self.cache_dir
+
+    def variant(
+        self, file_path: Union[str, Path], stat_result: os.stat_result, encoding: str
+    ) -> Optional[str]:
+        """Path of a precompressed variant of the current version of
+        ``file_path``."""
+        entry = self._variants.get(str(file_path), {}).get(encoding)
+        if entry is None:
+            return None
+        variant_path, source = entry
+        if source != (stat_result.st_mtime_ns, stat_result.st_size):
+            return None
+        return variant_path
+
+    def response(
+        self, request: Request, file_path: Path, immutable: bool = False
+    ) -> Response:
+        """Serve ``file_path``, precompressed if the client accepts it."""
+        stat_result = file_path.stat()
+        encoding, variant = None, None
+        accepted = accepted_encodings(request.headers.get("accept-encoding"))
+        for candidate in self.encodings:
+            if candidate not in accepted:
+                continue
+            variant_path = self.variant(file_path, stat_result, candidate)
+            if variant_path is None:
+                continue
+            try:
+                variant = (variant_path, os.stat(variant_path))
+            except OSError:
+                continue
+            encoding = candidate
+            break
+
+        etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}'
+        etag += f'-{encoding}"' if encoding else '"'
+        headers = {
+            "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+            "ETag": etag,
+            "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        }
+        if is_compressible(file_path):
+            headers["Vary"] = "Accept-Encoding"
+
+        if is_not_modified(
+            request.headers.get("if-none-match"),
+            request.headers.get("if-modified-since"),
+            etag,
+            stat_result.st_mtime,
+        ):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        media_type = mimetypes.guess_type(str(file_path))[0]
+        if encoding and variant:
+            headers["Content-Encoding"] = encoding
+            return FileResponse(
+                variant[0],
+                headers=headers,
+                media_type=media_type,
+                stat_result=variant[1],
+            )
+        return FileResponse(
+            file_path, headers=headers, media_type=media_type, stat_result=stat_result
+        )
+
+    def close(self):
+        """Remove the variants written by ``precompress``."""
+        self._variants.clear()
+        if self._own_cache_dir and self.cache_dir:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self.cache_dir = None
+            self._own_cache_dir = False
+
+
+static_files = StaticFiles()
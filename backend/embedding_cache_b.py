@@ -0,0 +1,357 @@
+"""
+Content-addressed cache for the dense and sparse query encoders.
+
+Every search encodes each rewritten query twice on CPU (embeddinggemma and
+bm25). ``CachedEmbeddings`` and ``CachedSparseEmbeddings`` wrap the encoders
+and key every vector on ``sha256(model name, prompt name, text)``:
+
+- a bounded in-memory LRU tier serves hot texts without any I/O
+- a disk tier keeps every vector ever computed in an append-only data file
+  read through ``mmap`` and indexed by key in SQLite, so a restart does not
+  start cold; workers sharing ``EMBEDDING_CACHE_DIR`` append under an
+  exclusive ``flock`` of the data file
+- texts missing from both tiers are encoded together in one batched call
+
+``load_warmup_texts`` and ``warm_embedding_caches`` pre-fill both tiers from a
+log of frequent questions or search queries at startup.
+"""
+
+import contextlib
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_qdrant import SparseEmbeddings, SparseVector
+
+try:
+    import fcntl
+except ImportError:  # Windows: the store is then safe for one process only
+    fcntl = None
+
+# SQLite's default limit on host parameters is 999
+_SQL_BATCH = 500
+
+
+def cache_key(model_name: str, prompt_name: Optional[str], text: str) -> str:
+    return hashlib.sha256(
+        f"{model_name}\x1f{prompt_name or ''}\x1f{text}".encode()
+    ).hexdigest()
+
+
+class MmapBlobStore:
+    """Append-only data file read through mmap, with a SQLite key index."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._data = open(path + ".bin", "a+b")
+        self._map: Optional[mmap.mmap] = None
+        self._index = sqlite3.connect(path + ".idx", check_same_thread=False)
+        self._index.execute("PRAGMA journal_mode=WAL")
+        self._index.execute(
+            """CREATE TABLE IF NOT EXISTS blobs (
+                key TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            )"""
+        )
+        self._index.commit()
+
+    def _view(self, end: int) -> mmap.mmap:
+        # the data file only grows: remap when a blob lies past the mapping
+        if self._map is None or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            for i in range(0, len(keys), _SQL_BATCH):
+                chunk = keys[i : i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._index.execute(
+                    f"SELECT key, offset, size FROM blobs WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, offset, size in rows:
+                    if size == 0:
+                        found[key] = b""
+                        continue
+                    found[key] = self._view(offset + size)[offset : offset + size]
+        return found
+
+    @contextlib.contextmanager
+    def _appending(self):
+        """Hold the data file against the other processes appending to it."""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._data.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._data.fileno(), fcntl.LOCK_UN)
+
+    def put_many(self, items: Dict[str, bytes]):
+        # The offsets are only right if nothing is appended between reading
+        # the end of the file and indexing the blobs: the flock covers the
+        # whole sequence, across processes
+        with self._lock, self._appending():
+            offset = os.fstat(self._data.fileno()).st_size
+            rows = []
+            for key, blob in items.items():
+                rows.append((key, offset, len(blob)))
+                offset += len(blob)
+            self._data.write(b"".join(items.values()))
+            self._data.flush()
+            self._index.executemany(
+                "INSERT OR IGNORE INTO blobs (key, offset, size) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._index.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._index.execute("SELECT COUNT(*) FROM blobs").fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._data.close()
+            self._index.close()
+
+
+class EmbeddingCache:
+    """Memory LRU in front of an optional ``MmapBlobStore``."""
+
+    def __init__(
+        self,
+        encode: Callable[[Any], bytes],
+        decode: Callable[[bytes], Any],
+        store: Optional[MmapBlobStore] = None,
+        max_memory_entries: int = 4096,
+    ):
+        self.encode = encode
+        self.decode = decode
+        self.store = store
+        self.max_memory_entries = max_memory_entries
+        self._memory: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, value: Any):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_or_compute(
+        self,
+        keys: List[str],
+        texts: List[str],
+        compute: Callable[[List[str]], List[Any]],
+    ) -> List[Any]:
+        """Return one value per key, computing all misses in one ``compute`` call."""
+        results: Dict[str, Any] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    results[key] = self._memory[key]
+                    self.memory_hits += 1
+
+        missing = [key for key in dict.fromkeys(keys) if key not in results]
+        if missing and self.store is not None:
+            from_disk = self.store.get_many(missing)
+            with self._lock:
+                for key, blob in from_disk.items():
+                    results[key] = self.decode(blob)
+                    self._remember(key, results[key])
+                    self.disk_hits += 1
+            missing = [key for key in missing if key not in results]
+
+        if missing:
+            text_by_key = dict(zip(keys, texts))
+            computed = compute([text_by_key[key] for key in missing])
+            with self._lock:
+                for key, value in zip(missing, computed):
+                    results[key] = value
+                    self._remember(key, value)
+                self.misses += len(missing)
+            if self.store is not None:
+                self.store.put_many({key: self.encode(results[key]) for key in missing})
+
+        return [results[key] for key in keys]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+
+def _encode_dense(vector: List[float]) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def _decode_dense(blob: bytes) -> List[float]:
+    return np.frombuffer(blob, dtype=np.float32).tolist()
+
+
+def _encode_sparse(vector: SparseVector) -> bytes:
+    return (
+        np.asarray(vector.indices, dtype=np.uint32).tobytes()
+        + np.asarray(vector.values, dtype=np.float32).tobytes()
+    )
+
+
+def _decode_sparse(blob: bytes) -> SparseVector:
+    half = len(blob) // 2
+    return SparseVector(
+        indices=np.frombuffer(blob[:half], dtype=np.uint32).tolist(),
+        values=np.frombuffer(blob[half:], dtype=np.float32).tolist(),
+    )
+
+
+def _store(cache_dir: Optional[str], model_name: str) -> Optional[MmapBlobStore]:
+    if cache_dir is None:
+        return None
+    name = hashlib.sha256(model_name.encode()).hexdigest()[:16]
+    return MmapBlobStore(os.path.join(cache_dir, name))
+
+
+class CachedEmbeddings(Embeddings):
+    """Caching wrapper around a dense ``Embeddings`` model.
+
+    ``query_prompt_name`` and ``document_prompt_name`` are part of the key:
+    embeddinggemma encodes queries and documents with different prompts.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        cache_dir: Optional[str] = None,
+        query_prompt_name: Optional[str] = None,
+        document_prompt_name: Optional[str] = None,
+        max_memory_entries: int = 4096,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.query_prompt_name = query_prompt_name
+        self.document_prompt_name = document_prompt_name
+        self.cache = EmbeddingCache(
+            _encode_dense,
+            _decode_dense,
+            store=_store(cache_dir, model_name),
+            max_memory_entries=max_memory_entries,
+        )
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        keys = [cache_key(self.model_name, self.query_prompt_name, t) for t in texts]
+        return self.cache.get_or_compute(
+            keys, texts, lambda misses: embed_queries(self.embeddings, misses)
+        )
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [cache_key(self.model_name, self.document_prompt_name, t) for t in texts]
+        return self.cache.get_or_compute(keys, texts, self.embeddings.embed_documents)
+
+
+class CachedSparseEmbeddings(SparseEmbeddings):
+    """Caching wrapper around a ``SparseEmbeddings`` model (e.g. FastEmbedSparse)."""
+
+    def __init__(
+        self,
+        sparse_embeddings: SparseEmbeddings,
+        model_name: str,
+        cache_dir: Optional[str] = None,
+        max_memory_entries: int = 4096,
+    ):
+        self.sparse_embeddings = sparse_embeddings
+        self.model_name = model_name
+        self.cache = EmbeddingCache(
+            _encode_sparse,
+            _decode_sparse,
+            store=_store(cache_dir, model_name),
+            max_memory_entries=max_memory_entries,
+        )
+
+    def embed_queries(self, texts: List[str]) -> List[SparseVector]:
+        keys = [cache_key(self.model_name, "query", t) for t in texts]
+        return self.cache.get_or_compute(
+            keys, texts, lambda misses: embed_queries(self.sparse_embeddings, misses)
+        )
+
+    def embed_query(self, text: str) -> SparseVector:
+        return self.embed_queries([text])[0]
+
+    def embed_documents(self, texts: List[str]) -> List[SparseVector]:
+        keys = [cache_key(self.model_name, "document", t) for t in texts]
+        return self.cache.get_or_compute(
+            keys, texts, self.sparse_embeddings.embed_documents
+        )
+
+
+def embed_queries(embeddings: Any, texts: List[str]) -> List[Any]:
+    """Encode several queries, in one batch when the encoder supports it."""
+    batch = getattr(embeddings, "embed_queries", None)
+    if batch is not None:
+        return batch(texts)
+    if hasattr(embeddings, "_embed") and hasattr(embeddings, "query_encode_kwargs"):
+        # HuggingFaceEmbeddings: a single encode() call with the query prompt
+        encode_kwargs = embeddings.query_encode_kwargs or embeddings.encode_kwargs
+        return embeddings._embed(texts, encode_kwargs)
+    model = getattr(embeddings, "_model", None)
+    if model is not None and hasattr(model, "query_embed"):
+        # FastEmbedSparse: a single query_embed() pass over all texts
+        return [
+            SparseVector(indices=result.indices.tolist(), values=result.values.tolist())
+            for result in model.query_embed(texts)
+        ]
+    return [embeddings.embed_query(text) for text in texts]
+
+
+def load_warmup_texts(path: str, limit: int = 1000) -> List[str]:
+    """Return the ``limit`` most frequent non-empty lines of a question log."""
+    with open(path, encoding="utf-8") as f:
+        counts = Counter(line.strip() for line in f if line.strip())
+    return [text for text, _count in counts.most_common(limit)]
+
+
+def warm_embedding_caches(
+    encoders: Iterable[Any], texts: List[str], batch_size: int = 64
+) -> int:
+    """Encode ``texts`` as queries with every encoder; return how many were new."""
+    new = 0
+    for encoder in encoders:
+        before = encoder.cache.misses
+        for i in range(0, len(texts), batch_size):
+            encoder.embed_queries(texts[i : i + batch_size])
+        new += encoder.cache.misses - before
+    return new
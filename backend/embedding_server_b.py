@@ -0,0 +1,315 @@
+"""
+Shared embedding server: one copy of the dense model for every worker.
+
+With several uvicorn workers each process would otherwise load its own
+embeddinggemma-300m and encode one short query at a time. ``EmbeddingServer``
+loads the model once, listens on a Unix socket and micro-batches the encodes
+that arrive within ``batch_window`` seconds (or until ``max_batch_size`` texts)
+into a single model call. ``RemoteEmbeddings`` is the drop-in ``Embeddings``
+the workers use instead of ``HuggingFaceEmbeddings``.
+
+Wire format: every message is a 4-byte big-endian length followed by the
+payload. A request is one JSON frame ``{"id", "kind", "texts"}`` with kind
+``"query"`` or ``"documents"``; the response is a JSON frame
+``{"id", "count", "dim"}`` (or ``{"id", "error"}``) followed by a frame with
+the float32 vectors.
+
+Run one per host (from the backend directory) and point the workers at it:
+    python embedding_server_b.py --socket /tmp/chainlit_embeddings.sock
+    EMBEDDING_SERVER_SOCKET=/tmp/chainlit_embeddings.sock chainlit run chainlit_b.py
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache_b import embed_queries
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = "google/embeddinggemma-300m"
+QUERY_PROMPT_NAME = "Retrieval-query"
+DOCUMENT_PROMPT_NAME = "Retrieval-document"
+
+_LENGTH = struct.Struct("!I")
+
+
+def load_dense_embeddings() -> Embeddings:
+    """The embeddinggemma model used for the Qdrant collection."""
+    from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        query_encode_kwargs={"prompt_name": QUERY_PROMPT_NAME},
+        encode_kwargs={"prompt_name": DOCUMENT_PROMPT_NAME},
+    )
+
+
+def _frame(payload: bytes) -> bytes:
+    return _LENGTH.pack(len(payload)) + payload
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    (size,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    return await reader.readexactly(size)
+
+
+def _recv_exactly(conn: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = conn.recv(size)
+        if not chunk:
+            raise ConnectionError("Embedding server closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_frame(conn: socket.socket) -> bytes:
+    (size,) = _LENGTH.unpack(_recv_exactly(conn, _LENGTH.size))
+    return _recv_exactly(conn, size)
+
+
+@dataclass
+class _Pending:
+    kind: str
+    texts: List[str]
+    future: asyncio.Future
+
+
+class EmbeddingServer:
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        socket_path: str,
+        batch_window: float = 0.003,
+        max_batch_size: int = 64,
+    ):
+        self.embeddings = embeddings
+        self.socket_path = socket_path
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.encoded_texts = 0
+
+    async def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._batch_forever())
+        self._server = await asyncio.start_unix_server(
+            self._handle, path=self.socket_path
+        )
+        os.chmod(self.socket_path, 0o600)
+
+    async def serve_forever(self):
+        await self.start()
+        assert self._server is not None
+        logger.info("Embedding server listening on %s", self.socket_path)
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def embed(self, kind: str, texts: List[str]) -> List[List[float]]:
+        if kind not in ("query", "documents"):
+            raise ValueError(f"Unknown embedding kind: {kind}")
+        assert self._queue is not None
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Pending(kind, texts, future))
+        return await future
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        try:
+            while True:
+                request = json.loads(await _read_frame(reader))
+                task = asyncio.create_task(self._respond(request, writer, write_lock))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(
+        self,
+        request: Dict[str, Any],
+        writer: asyncio.StreamWriter,
+        write_lock: asyncio.Lock,
+    ):
+        try:
+            vectors = np.asarray(
+                await self.embed(request["kind"], request["texts"]), dtype=np.float32
+            )
+            header = {"id": request["id"], "count": len(vectors)}
+            header["dim"] = int(vectors.shape[1]) if vectors.ndim == 2 else 0
+            body = vectors.tobytes()
+        except Exception as e:
+            header = {"id": request.get("id"), "error": str(e)}
+            body = b""
+        try:
+            async with write_lock:
+                writer.write(_frame(json.dumps(header).encode()) + _frame(body))
+                await writer.drain()
+        except (ConnectionError, BrokenPipeError):
+            # the client went away before its batch was done
+            logger.debug(
+                "Embedding client disconnected before request %s", header["id"]
+            )
+
+    async def _batch_forever(self):
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0].texts)
+            deadline = loop.time() + self.batch_window
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(pending)
+                size += len(pending.texts)
+            # The model runs one batch at a time; whatever arrives meanwhile
+            # forms the next batch.
+            await self._run(batch)
+
+    async def _run(self, batch: List[_Pending]):
+        for kind in ("query", "documents"):
+            pending = [p for p in batch if p.kind == kind]
+            if not pending:
+                continue
+            texts = [text for p in pending for text in p.texts]
+            try:
+                vectors = await asyncio.to_thread(self._encode, kind, texts)
+            except Exception as e:
+                for p in pending:
+                    if not p.future.done():
+                        p.future.set_exception(e)
+                continue
+            self.batches += 1
+            self.encoded_texts += len(texts)
+            offset = 0
+            for p in pending:
+                if not p.future.done():
+                    p.future.set_result(vectors[offset : offset + len(p.texts)])
+                offset += len(p.texts)
+
+    def _encode(self, kind: str, texts: List[str]) -> List[List[float]]:
+        if kind == "query":
+            return embed_queries(self.embeddings, texts)
+        return self.embeddings.embed_documents(texts)
+
+
+class RemoteEmbeddings(Embeddings):
+    """Drop-in ``Embeddings`` backed by an ``EmbeddingServer``.
+
+    Each calling thread keeps its own connection, so concurrent encodes from
+    the worker's thread pool reach the server together and share a batch.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._ids = itertools.count()
+
+    def _connection(self) -> socket.socket:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.settimeout(self.timeout)
+            conn.connect(self.socket_path)
+            self._local.conn = conn
+        return conn
+
+    def _request(self, kind: str, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        request_id = next(self._ids)
+        conn = self._connection()
+        try:
+            conn.sendall(
+                _frame(
+                    json.dumps(
+                        {"id": request_id, "kind": kind, "texts": texts}
+                    ).encode()
+                )
+            )
+            header = json.loads(_recv_frame(conn))
+            body = _recv_frame(conn)
+        except OSError:
+            # drop the broken connection; the next call reconnects
+            conn.close()
+            self._local.conn = None
+            raise
+        if "error" in header:
+            raise RuntimeError(f"Embedding server error: {header['error']}")
+        return (
+            np.frombuffer(body, dtype=np.float32)
+            .reshape(header["count"], header["dim"])
+            .tolist()
+        )
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._request("query", texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._request("documents", texts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--socket",
+        default=os.environ.get(
+            "EMBEDDING_SERVER_SOCKET", "/tmp/chainlit_embeddings.sock"
+        ),
+    )
+    parser.add_argument("--batch-window", type=float, default=0.003)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    server = EmbeddingServer(
+        load_dense_embeddings(),
+        args.socket,
+        batch_window=args.batch_window,
+        max_batch_size=args.max_batch_size,
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
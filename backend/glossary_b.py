@@ -0,0 +1,147 @@
+# ruff: noqa: RUF002
+"""
+Precompiled glossary matcher for the generate prompt.
+
+``get_relevant_glossary_terms`` used to run a substring check per keyword of
+``keyword_mappings`` and then scan the whole glossary for every matched
+term, on every turn. ``GlossaryMatcher`` is built once at startup:
+
+- an Aho-Corasick automaton over the keywords finds every keyword occurring
+  in the query in a single pass, however many keywords there are
+- keywords and query are folded the same way (casefolded and
+  stripped of accents), so "ατομικη" and "ΑΤΟΜΙΚΗ" match "ατομική"
+- short keywords and abbreviations ("ικε", "φπα", "ο.ε") only match whole
+  words: folded, "ικε" would otherwise match inside "ηλεκτρονικές"; longer
+  keywords are stems ("εκπιπτόμεν") and still match inside words
+- the formatted glossary entries are indexed by term name, and returned in
+  glossary order, so the injected block is the same as before
+"""
+
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+# Keywords of at most this many letters only match whole words
+SHORT_KEYWORD = 4
+
+
+def fold(text: str) -> str:
+    """Casefold and strip accents: "Ατομική" -> "ατομικη"."""
+    return "".join(
+        c
+        for c in unicodedata.normalize("NFD", text.casefold())
+        if not unicodedata.combining(c)
+    )
+
+
+def is_short_keyword(keyword: str) -> bool:
+    """Whether ``keyword`` is an abbreviation or too short to be a stem."""
+    letters = [c for c in keyword if c.isalnum()]
+    return "." in keyword or len(letters) <= SHORT_KEYWORD
+
+
+def _is_word_boundary(text: str, index: int) -> bool:
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # ids of the patterns ending at each state, including the ones
+        # inherited through the failure links
+        self._out: List[List[int]] = [[]]
+
+        for pattern in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append(len(self.patterns))
+            self.patterns.append(pattern)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] += self._out[self._fail[next_state]]
+
+    def find(self, text: str) -> Set[int]:
+        """Ids of the patterns occurring in ``text``."""
+        return {pattern_id for _, pattern_id in self.finditer(text)}
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int]]:
+        """``(start, pattern id)`` of every occurrence of a pattern."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in out[state]:
+                yield end + 1 - len(self.patterns[pattern_id]), pattern_id
+
+
+class GlossaryMatcher:
+    def __init__(self, keyword_mappings: Dict[str, List[str]], glossary: List[dict]):
+        terms_by_keyword: Dict[str, Set[str]] = {}
+        for keyword, terms in keyword_mappings.items():
+            terms_by_keyword.setdefault(fold(keyword), set()).update(terms)
+        self._automaton = AhoCorasick(terms_by_keyword)
+        self._terms = [terms_by_keyword[k] for k in self._automaton.patterns]
+        self._whole_word = [is_short_keyword(k) for k in self._automaton.patterns]
+
+        self._entries: List[str] = []
+        self._entries_by_term: Dict[str, List[int]] = {}
+        for item in glossary:
+            entry = f"**{item['term']}**: {item['definition']}"
+            if "distinction" in item:
+                entry += f" ΔΙΑΚΡΙΣΗ: {item['distinction']}"
+            self._entries_by_term.setdefault(item["term"], []).append(
+                len(self._entries)
+            )
+            self._entries.append(entry)
+
+    def match_terms(self, query: str) -> Set[str]:
+        matched: Set[str] = set()
+        text = fold(query)
+        for start, pattern_id in self._automaton.finditer(text):
+            if self._whole_word[pattern_id]:
+                end = start + len(self._automaton.patterns[pattern_id])
+                if not (
+                    _is_word_boundary(text, start - 1) and _is_word_boundary(text, end)
+                ):
+                    continue
+            matched.update(self._terms[pattern_id])
+        return matched
+
+    def glossary_context(self, query: str) -> str:
+        """Formatted definitions of the terms relevant to ``query``."""
+        positions = sorted(
+            position
+            for term in self.match_terms(query)
+            for position in self._entries_by_term.get(term, ())
+        )
+        if not positions:
+            return ""
+        return (
+            "\n\n### ΓΛΩΣΣΑΡΙΟ ΟΡΩΝ ###\n"
+            + "\n\n".join(self._entries[position] for position in positions)
+            + "\n### ΤΕΛΟΣ ΓΛΩΣΣΑΡΙΟΥ ###\n"
+        )
@@ -0,0 +1,139 @@
+"""
+Persistent cache of the multi-query rewrites produced by ``retrieval_chain``.
+
+Every question costs an LLM round trip to generate its search queries before
+retrieval can start. The rewrites only depend on the question and on the date
+injected into the prompt, so they are cached in a local SQLite file keyed by
+the normalized question and that month. Entries expire after ``ttl`` seconds
+and the least recently used ones are evicted beyond ``max_entries``; the file
+survives restarts.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from semantic_cache_b import normalize_question
+
+
+def current_month() -> str:
+    return datetime.now().strftime("%Y-%m")
+
+
+class QueryRewriteCache:
+    def __init__(
+        self,
+        path: str,
+        ttl: float = 7 * 24 * 3600,
+        max_entries: int = 10000,
+        period_fn: Callable[[], str] = current_month,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.period_fn = period_fn
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS query_rewrites (
+                key TEXT PRIMARY KEY,
+                queries TEXT NOT NULL,
+                latency REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_query_rewrites_last_used "
+            "ON query_rewrites(last_used_at)"
+        )
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+    def key(self, question: str) -> str:
+        return f"{self.period_fn()}\x1f{normalize_question(question)}"
+
+    def get(self, question: str, record: bool = True) -> Optional[List[str]]:
+        """Return the cached queries for the question, or None on a miss.
+
+        With ``record=False`` the lookup neither counts towards the stats nor
+        refreshes the entry's LRU position.
+        """
+        key = self.key(question)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT queries, latency FROM query_rewrites "
+                "WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if not record:
+                return json.loads(row[0]) if row else None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE query_rewrites SET last_used_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        self.hits += 1
+        self.latency_saved += row[1]
+        return json.loads(row[0])
+
+    def put(self, question: str, queries: List[str], latency: float = 0.0):
+        """Store the queries generated for the question and how long they took."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_rewrites "
+                "(key, queries, latency, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    self.key(question),
+                    json.dumps(queries, ensure_ascii=False),
+                    latency,
+                    now,
+                    now,
+                ),
+            )
+            self._conn.execute(
+                "DELETE FROM query_rewrites WHERE created_at <= ?", (now - self.ttl,)
+            )
+            self._conn.execute(
+                "DELETE FROM query_rewrites WHERE key IN ("
+                "SELECT key FROM query_rewrites ORDER BY last_used_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*) FROM query_rewrites").fetchone()
+        return row[0]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "latency_saved": round(self.latency_saved, 2),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,251 @@
+"""
+Batched multi-query retrieval against the hybrid Qdrant collection.
+
+Searching each rewritten query on its own (``MultiQueryRetriever``) means
+one blocking ``query_points`` round trip per query for a
+``QdrantVectorStore``. ``batch_hybrid_search`` embeds every query first and
+sends them to Qdrant as a single ``query_batch_points`` request with the
+same hybrid (dense + sparse, RRF) shape the vector store uses, and
+``dedupe_by_point_id`` dedupes the union before it reaches the reranker.
+
+``RetrievalPipeline`` is the whole retrieve step (query rewrite, batched
+hybrid search, rerank) as one long-lived retriever. Build it once at startup
+around pooled clients and pass ``k``, ``top_n`` or ``rerank_model`` per call.
+"""
+
+import asyncio
+import time
+from copy import deepcopy
+from typing import Any, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import Runnable
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import models
+
+from embedding_cache_b import embed_queries
+from query_cache_b import QueryRewriteCache
+
+# hits per rewritten query before the rerank: what the retrieve tool's
+# MultiQueryRetriever searched with (as_retriever's own default)
+DEFAULT_K = 4
+
+
+def build_hybrid_requests(
+    vectorstore: QdrantVectorStore,
+    queries: List[str],
+    k: int = DEFAULT_K,
+    filter: Optional[models.Filter] = None,
+    search_params: Optional[models.SearchParams] = None,
+) -> List[models.QueryRequest]:
+    """Embed the queries and build one hybrid RRF request per query."""
+    dense_embeddings = vectorstore.embeddings
+    if dense_embeddings is None:
+        raise ValueError("Hybrid retrieval requires dense embeddings")
+    dense_vectors = embed_queries(dense_embeddings, queries)
+    sparse_vectors = embed_queries(vectorstore.sparse_embeddings, queries)
+
+    requests = []
+    for dense, sparse in zip(dense_vectors, sparse_vectors):
+        requests.append(
+            models.QueryRequest(
+                prefetch=[
+                    models.Prefetch(
+                        using=vectorstore.vector_name,
+                        query=dense,
+                        filter=filter,
+                        limit=k,
+                        params=search_params,
+                    ),
+                    models.Prefetch(
+                        using=vectorstore.sparse_vector_name,
+                        query=models.SparseVector(
+                            indices=sparse.indices, values=sparse.values
+                        ),
+                        filter=filter,
+                        limit=k,
+                        params=search_params,
+                    ),
+                ],
+                query=models.FusionQuery(fusion=models.Fusion.RRF),
+                limit=k,
+                with_payload=True,
+                with_vector=False,
+            )
+        )
+    return requests
+
+
+def batch_hybrid_search(
+    vectorstore: QdrantVectorStore,
+    queries: List[str],
+    k: int = DEFAULT_K,
+    filter: Optional[models.Filter] = None,
+    search_params: Optional[models.SearchParams] = None,
+) -> List[Document]:
+    """Search all queries in one round trip, results concatenated in query order."""
+    if not queries:
+        return []
+    requests = build_hybrid_requests(vectorstore, queries, k, filter, search_params)
+    responses = vectorstore.client.query_batch_points(
+        collection_name=vectorstore.collection_name, requests=requests
+    )
+    return [
+        vectorstore._document_from_point(
+            point,
+            vectorstore.collection_name,
+            vectorstore.content_payload_key,
+            vectorstore.metadata_payload_key,
+        )
+        for response in responses
+        for point in response.points
+    ]
+
+
+def dedupe_by_point_id(documents: List[Document]) -> List[Document]:
+    """Keep the first occurrence of every Qdrant point, preserving order."""
+    seen = set()
+    unique = []
+    for doc in documents:
+        point_id = doc.metadata.get("_id")
+        if point_id is None:
+            unique.append(doc)
+            continue
+        if point_id in seen:
+            continue
+        seen.add(point_id)
+        unique.append(doc)
+    return unique
+
+
+class RetrievalPipeline(BaseRetriever):
+    """Multi-query rewrite, batched hybrid search and rerank in one retriever.
+
+    ``llm_chain`` maps ``{"question": ...}`` to a list of queries and
+    ``reranker`` is a ``CohereRerank`` (anything with its ``rerank`` method).
+    With a ``query_cache`` the generated queries are reused for repeated
+    questions instead of calling ``llm_chain`` again.
+    ``k`` is the number of hits per rewritten query, ``top_n`` the number
+    of documents kept by the rerank.
+    The defaults below can be overridden per call without rebuilding::
+
+        await pipeline.ainvoke(query, k=40, top_n=5, rerank_model="rerank-v3.5")
+    """
+
+    vectorstore: QdrantVectorStore
+    llm_chain: Runnable
+    reranker: Any
+    k: int = DEFAULT_K
+    top_n: int = 10
+    rerank_model: Optional[str] = None
+    include_original: bool = False
+    query_cache: Optional[QueryRewriteCache] = None
+
+    def _queries(self, query: str, queries: List[str]) -> List[str]:
+        if self.include_original:
+            return [*queries, query]
+        return queries
+
+    def _search_and_rerank(
+        self,
+        query: str,
+        queries: List[str],
+        k: Optional[int],
+        top_n: Optional[int],
+        rerank_model: Optional[str],
+        rewrite_latency: Optional[float] = None,
+    ) -> List[Document]:
+        # queries just generated by llm_chain are cached here, off the loop
+        if rewrite_latency is not None and self.query_cache is not None and queries:
+            self.query_cache.put(query, queries, rewrite_latency)
+        documents = dedupe_by_point_id(
+            batch_hybrid_search(
+                self.vectorstore, self._queries(query, queries), k=k or self.k
+            )
+        )
+        results = self.reranker.rerank(
+            documents,
+            query,
+            model=rerank_model or self.rerank_model,
+            top_n=top_n or self.top_n,
+        )
+        reranked = []
+        for res in results:
+            doc = documents[res["index"]]
+            doc_copy = Document(doc.page_content, metadata=deepcopy(doc.metadata))
+            doc_copy.metadata["relevance_score"] = res["relevance_score"]
+            reranked.append(doc_copy)
+        return reranked
+
+    def _search_cached(
+        self,
+        query: str,
+        k: Optional[int],
+        top_n: Optional[int],
+        rerank_model: Optional[str],
+    ) -> Optional[List[Document]]:
+        """Search and rerank with the cached queries of ``query``, None if
+        they are not cached."""
+        if self.query_cache is None:
+            return None
+        queries = self.query_cache.get(query)
+        if queries is None:
+            return None
+        return self._search_and_rerank(query, queries, k, top_n, rerank_model)
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        k: Optional[int] = None,
+        top_n: Optional[int] = None,
+        rerank_model: Optional[str] = None,
+    ) -> List[Document]:
+        documents = self._search_cached(query, k, top_n, rerank_model)
+        if documents is not None:
+            return documents
+        start = time.perf_counter()
+        queries = self.llm_chain.invoke(
+            {"question": query}, config={"callbacks": run_manager.get_child()}
+        )
+        return self._search_and_rerank(
+            query, queries, k, top_n, rerank_model, time.perf_counter() - start
+        )
+
+    async def _aget_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: AsyncCallbackManagerForRetrieverRun,
+        k: Optional[int] = None,
+        top_n: Optional[int] = None,
+        rerank_model: Optional[str] = None,
+    ) -> List[Document]:
+        # Embedding is CPU bound and the qdrant/cohere clients and the query
+        # cache (SQLite) are sync: all of it runs in worker threads, and a
+        # cached question goes through a single one.
+        if self.query_cache is not None:
+            documents = await asyncio.to_thread(
+                self._search_cached, query, k, top_n, rerank_model
+            )
+            if documents is not None:
+                return documents
+        start = time.perf_counter()
+        queries = await self.llm_chain.ainvoke(
+            {"question": query}, config={"callbacks": run_manager.get_child()}
+        )
+        return await asyncio.to_thread(
+            self._search_and_rerank,
+            query,
+            queries,
+            k,
+            top_n,
+            rerank_model,
+            time.perf_counter() - start,
+        )
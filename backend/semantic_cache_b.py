@@ -0,0 +1,196 @@
+"""
+Opt-in semantic answer cache in front of the LangGraph pipeline.
+
+Questions are normalized (case, accents, punctuation, whitespace), embedded
+with the same dense model as the vector store and compared by cosine
+similarity against a small in-process index of previous answers. A match
+above ``threshold`` returns the cached ``AnswerWithCitations`` together with
+the metadata of the documents it cited, skipping the query rewrite, the Qdrant
+searches, the rerank and the generation.
+
+Entries expire after ``ttl`` seconds and the whole cache is dropped when
+``version_fn`` (e.g. the Qdrant collection's point count) reports a new
+collection version.
+"""
+
+import asyncio
+import re
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils_b import AnswerWithCitations
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    """Casefold, strip accents and punctuation and collapse whitespace."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    stripped = _PUNCTUATION.sub(" ", stripped)
+    return _WHITESPACE.sub(" ", stripped).strip()
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: AnswerWithCitations
+    sources: List[Dict[str, Any]]
+    """Metadata of the retrieved documents, used to render the citation links."""
+    tokens: int = 0
+    """Tokens the original turn cost, i.e. saved by every hit."""
+    latency: float = 0.0
+    """Seconds the original turn took, i.e. saved by every hit."""
+    created_at: float = field(default_factory=time.time)
+    last_hit_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class CacheLookup:
+    """Outcome of one lookup, exported with the turn's metadata."""
+
+    question: str
+    vector: Optional[np.ndarray] = None
+    entry: Optional[CachedAnswer] = None
+    similarity: float = 0.0
+    lookup_latency: float = 0.0
+
+    @property
+    def hit(self) -> bool:
+        return self.entry is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "hit": self.hit,
+            "similarity": round(self.similarity, 4),
+            "lookup_latency": round(self.lookup_latency, 4),
+            "latency_saved": round(self.entry.latency, 4) if self.entry else 0.0,
+            "tokens_saved": self.entry.tokens if self.entry else 0,
+        }
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        threshold: float = 0.95,
+        ttl: float = 24 * 3600,
+        max_entries: int = 2000,
+        version_fn: Optional[Callable[[], Any]] = None,
+        version_check_interval: float = 300,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_fn = version_fn
+        self.version_check_interval = version_check_interval
+
+        self._entries: List[CachedAnswer] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._version: Any = None
+        self._version_checked_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+        self.tokens_saved = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "latency_saved": round(self.latency_saved, 2),
+            "tokens_saved": self.tokens_saved,
+        }
+
+    def clear(self):
+        self._entries = []
+        self._vectors = None
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(
+            self.embeddings.embed_query(normalize_question(question)), dtype=np.float32
+        )
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def _check_version(self):
+        if self.version_fn is None:
+            return
+        now = time.time()
+        if now - self._version_checked_at < self.version_check_interval:
+            return
+        self._version_checked_at = now
+        version = await asyncio.to_thread(self.version_fn)
+        if version != self._version:
+            self.clear()
+            self._version = version
+
+    def _evict_expired(self, now: float):
+        keep = [i for i, e in enumerate(self._entries) if now - e.created_at < self.ttl]
+        if len(keep) == len(self._entries):
+            return
+        self._entries = [self._entries[i] for i in keep]
+        self._vectors = self._vectors[keep] if keep else None
+
+    def search(self, vector: np.ndarray) -> CacheLookup:
+        """Return the closest live entry above the threshold, if any."""
+        lookup = CacheLookup(question="", vector=vector)
+        self._evict_expired(time.time())
+        if self._vectors is None or not self._entries:
+            return lookup
+        scores = self._vectors @ vector
+        best = int(np.argmax(scores))
+        lookup.similarity = float(scores[best])
+        if lookup.similarity >= self.threshold:
+            lookup.entry = self._entries[best]
+        return lookup
+
+    async def alookup(self, question: str) -> CacheLookup:
+        """Embed the question and look it up, updating the hit counters."""
+        start = time.perf_counter()
+        await self._check_version()
+        vector = await asyncio.to_thread(self._embed, question)
+        lookup = self.search(vector)
+        lookup.question = question
+        lookup.lookup_latency = time.perf_counter() - start
+        if lookup.entry is not None:
+            lookup.entry.last_hit_at = time.time()
+            self.hits += 1
+            self.latency_saved += lookup.entry.latency
+            self.tokens_saved += lookup.entry.tokens
+        else:
+            self.misses += 1
+        return lookup
+
+    async def astore(self, lookup: CacheLookup, entry: CachedAnswer):
+        """Cache the answer of a missed lookup, reusing its embedding."""
+        vector = lookup.vector
+        if vector is None:
+            vector = await asyncio.to_thread(self._embed, entry.question)
+        if len(self._entries) >= self.max_entries:
+            # least recently hit entry goes first
+            oldest = min(
+                range(len(self._entries)), key=lambda i: self._entries[i].last_hit_at
+            )
+            del self._entries[oldest]
+            self._vectors = np.delete(self._vectors, oldest, axis=0)
+        self._entries.append(entry)
+        row = vector[np.newaxis, :]
+        self._vectors = (
+            row if self._vectors is None else np.vstack([self._vectors, row])
+        )
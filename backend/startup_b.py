@@ -0,0 +1,172 @@
+"""
+Lazy, concurrent startup of the heavy resources used by chainlit_b.py.
+
+Loading embeddinggemma and bm25, creating the Gemini client and the GCS
+client and validating the Qdrant collection used to happen one after the
+other at import time, before uvicorn could bind its socket. Each of them is
+now a ``Resource``: a factory that runs on first use, or ahead of time when
+``Startup.start`` builds every registered resource concurrently in worker
+threads from a background task. The init time of each resource is logged
+and ``chainlit.readiness`` reports "warming" until all of them are loaded.
+
+``LazyEmbeddings``, ``LazySparseEmbeddings`` and ``LazyStorageClient`` stand
+in for the real objects wherever they have to be handed over at import
+time (the vector store, the data layer).
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar, Union
+
+from langchain_core.embeddings import Embeddings
+from langchain_qdrant import SparseEmbeddings, SparseVector
+
+from chainlit.data.storage_clients.base import BaseStorageClient
+from chainlit.logger import logger
+from chainlit.readiness import mark_ready, mark_warming
+from embedding_cache_b import embed_queries
+
+T = TypeVar("T")
+
+
+class Resource(Generic[T]):
+    """A value built once, on first ``get()`` or by ``Startup.start``."""
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self.factory = factory
+        self.init_time: Optional[float] = None
+        self._value: Optional[T] = None
+        self._built = False
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._built
+
+    def get(self) -> T:
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    start = time.perf_counter()
+                    self._value = self.factory()
+                    self.init_time = time.perf_counter() - start
+                    self._built = True
+                    logger.info("Startup: %s ready in %.2fs", self.name, self.init_time)
+        return self._value  # type: ignore[return-value]
+
+    async def aget(self) -> T:
+        if self._built:
+            return self._value  # type: ignore[return-value]
+        return await asyncio.to_thread(self.get)
+
+
+class Startup:
+    """Registry of the app's resources."""
+
+    def __init__(self):
+        self.resources: Dict[str, Resource] = {}
+
+    def add(self, name: str, factory: Callable[[], T]) -> Resource[T]:
+        resource = Resource(name, factory)
+        self.resources[name] = resource
+        return resource
+
+    def start(self) -> "asyncio.Task[None]":
+        """Mark the resources as warming and build them in a background task."""
+        pending = [r for r in self.resources.values() if not r.ready]
+        for resource in pending:
+            mark_warming(resource.name)
+        return asyncio.create_task(self._warm_up(pending))
+
+    async def _warm_up(self, pending: List[Resource]):
+        # A resource that fails is logged and left to be retried on first
+        # use; it does not keep the app in the warming state.
+        async def build(resource: Resource):
+            try:
+                await resource.aget()
+            except Exception as e:
+                logger.error("Startup: %s failed to load: %s", resource.name, e)
+            finally:
+                mark_ready(resource.name)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(build(resource) for resource in pending))
+        logger.info(
+            "Startup: %d resources warmed up in %.2fs",
+            len(pending),
+            time.perf_counter() - start,
+        )
+
+    def init_times(self) -> Dict[str, Optional[float]]:
+        return {name: r.init_time for name, r in self.resources.items()}
+
+
+class LazyEmbeddings(Embeddings):
+    """``Embeddings`` whose model is loaded on first use."""
+
+    def __init__(self, resource: Resource[Embeddings]):
+        self.resource = resource
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return embed_queries(self.resource.get(), texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.resource.get().embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.resource.get().embed_documents(texts)
+
+
+class LazySparseEmbeddings(SparseEmbeddings):
+    """``SparseEmbeddings`` whose model is loaded on first use."""
+
+    def __init__(self, resource: Resource[SparseEmbeddings]):
+        self.resource = resource
+
+    def embed_queries(self, texts: List[str]) -> List[SparseVector]:
+        return embed_queries(self.resource.get(), texts)
+
+    def embed_query(self, text: str) -> SparseVector:
+        return self.resource.get().embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[SparseVector]:
+        return self.resource.get().embed_documents(texts)
+
+
+class LazyStorageClient(BaseStorageClient):
+    """Storage client created on first use."""
+
+    def __init__(self, resource: Resource[BaseStorageClient]):
+        self.resource = resource
+
+    async def upload_file(
+        self,
+        object_key: str,
+        data: Union[bytes, str],
+        mime: str = "application/octet-stream",
+        overwrite: bool = True,
+        content_disposition: str | None = None,
+    ) -> Dict[str, Any]:
+        client = await self.resource.aget()
+        return await client.upload_file(
+            object_key, data, mime, overwrite, content_disposition
+        )
+
+    async def delete_file(self, object_key: str) -> bool:
+        client = await self.resource.aget()
+        return await client.delete_file(object_key)
+
+    async def get_read_url(self, object_key: str) -> str:
+        client = await self.resource.aget()
+        return await client.get_read_url(object_key)
+
+    async def get_read_urls(self, object_keys: List[str]) -> Dict[str, str]:
+        # the signed-URL cache lives in the real client
+        client = await self.resource.aget()
+        return await client.get_read_urls(object_keys)
+
+    async def close(self) -> None:
+        if self.resource.ready:
+            await self.resource.get().close()
@@ -11,6 +11,7 @@ from chainlit import config
 from chainlit.callbacks import data_layer
 from chainlit.context import ChainlitContext, context_var
 from chainlit.data.base import BaseDataLayer
+from chainlit.server import clear_project_caches
 from chainlit.session import HTTPSession, WebsocketSession
 from chainlit.user import PersistedUser
 from chainlit.user_session import UserSession
@@ -19,19 +20,25 @@ from chainlit.user_session import UserSession
 @pytest.fixture(scope="session", autouse=True)
 def cleanup_test_db_files():
     """Cleanup any leftover test database files before running tests."""
-    test_db_path = Path(__file__).parent / "test_payment_db.sqlite"
-    if test_db_path.exists():
-        try:
-            test_db_path.unlink()
-        except Exception:
-            pass  # File may be locked, but we tried
+    # the data layer runs SQLite in WAL mode: remove the -wal and -shm files too
+    test_db_paths = [
+        Path(__file__).parent / f"test_payment_db.sqlite{suffix}"
+        for suffix in ("", "-wal", "-shm")
+    ]
+    for test_db_path in test_db_paths:
+        if test_db_path.exists():
+            try:
+                test_db_path.unlink()
+            except Exception:
+                pass  # File may be locked, but we tried
     yield
     # Cleanup after all tests
-    if test_db_path.exists():
-        try:
-            test_db_path.unlink()
-        except Exception:
-            pass
+    for test_db_path in test_db_paths:
+        if test_db_path.exists():
+            try:
+                test_db_path.unlink()
+            except Exception:
+                pass
 
 
 @pytest.fixture
@@ -143,5 +150,7 @@ def test_config(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
     monkeypatch.setattr("chainlit.callbacks.config", test_config)
     monkeypatch.setattr("chainlit.server.config", test_config)
     monkeypatch.setattr("chainlit.config.config", test_config)
+    # what the file watcher does when the config changes
+    clear_project_caches()
 
     return test_config
@@ -0,0 +1,93 @@
+import asyncio
+from typing import Any, Dict, List, Union
+
+import pytest
+
+from chainlit.data.storage_clients.base import BaseStorageClient, SignedUrlCache
+
+
+class FakeStorageClient(BaseStorageClient):
+    def __init__(self):
+        self.signed: List[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def upload_file(
+        self,
+        object_key: str,
+        data: Union[bytes, str],
+        mime: str = "application/octet-stream",
+        overwrite: bool = True,
+        content_disposition: str | None = None,
+    ) -> Dict[str, Any]:
+        return {}
+
+    async def delete_file(self, object_key: str) -> bool:
+        return True
+
+    async def get_read_url(self, object_key: str) -> str:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if object_key == "broken":
+            raise Exception("signing failed")
+        if object_key == "unsigned":
+            # the fallback of S3StorageClient.get_read_url
+            return object_key
+        self.signed.append(object_key)
+        return f"https://signed/{object_key}"
+
+    async def close(self) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_get_read_urls_signs_concurrently_and_caches():
+    client = FakeStorageClient()
+    keys = [f"key_{i}" for i in range(20)]
+
+    urls = await client.get_read_urls([*keys, "key_0"])
+
+    assert urls == {key: f"https://signed/{key}" for key in keys}
+    assert client.max_in_flight == 20
+    assert sorted(client.signed) == sorted(keys)
+
+    client.signed.clear()
+    urls = await client.get_read_urls(["key_1", "key_new"])
+    assert urls == {
+        "key_1": "https://signed/key_1",
+        "key_new": "https://signed/key_new",
+    }
+    assert client.signed == ["key_new"]
+
+
+@pytest.mark.asyncio
+async def test_get_read_urls_leaves_out_failed_keys():
+    client = FakeStorageClient()
+
+    urls = await client.get_read_urls(["ok", "broken", "unsigned"])
+
+    assert urls == {"ok": "https://signed/ok"}
+    assert client.read_url_cache.get("broken") is None
+    assert client.read_url_cache.get("unsigned") is None
+
+
+def test_signed_url_cache_expiry_and_size(monkeypatch: pytest.MonkeyPatch):
+    now = 1000.0
+    monkeypatch.setattr(
+        "chainlit.data.storage_clients.base.time.monotonic", lambda: now
+    )
+    cache = SignedUrlCache(ttl=60, max_size=2)
+
+    cache.set("a", "url_a")
+    cache.set("b", "url_b")
+    assert cache.get("a") == "url_a"
+    # "b" is the least recently used
+    cache.set("c", "url_c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "url_a"
+
+    now += 60
+    assert cache.get("a") is None
+    assert cache.get("c") is None
@@ -2,6 +2,7 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
+from chainlit import make_async
 from chainlit.data.storage_clients.base import storage_expiry_time
 from chainlit.data.storage_clients.gcs import GCSStorageClient
 
@@ -335,3 +336,60 @@ class TestGCSStorageClient:
         mock_gcs_client["bucket"].blob.assert_called_once_with("test/path/file.txt")
         mock_gcs_client["blob"].delete.assert_called_once()
         assert result is True
+
+    @pytest.mark.asyncio
+    async def test_get_read_urls(self, mock_gcs_client):
+        """Test signing several URLs in one batch, then from the cache."""
+        mock_gcs_client[
+            "blob"
+        ].generate_signed_url.return_value = "https://signed-url.example.com"
+
+        client = GCSStorageClient(
+            bucket_name="test-bucket",
+            project_id="test-project",
+            client_email="test@example.com",
+            private_key="test-key",
+        )
+        mock_gcs_client["bucket"].reset_mock()
+        mock_gcs_client["blob"].reset_mock()
+
+        urls = await client.get_read_urls(["a.txt", "b.txt", "a.txt"])
+
+        assert urls == {
+            "a.txt": "https://signed-url.example.com",
+            "b.txt": "https://signed-url.example.com",
+        }
+        assert mock_gcs_client["blob"].generate_signed_url.call_count == 2
+
+        await client.get_read_urls(["a.txt", "b.txt"])
+        assert mock_gcs_client["blob"].generate_signed_url.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_get_read_urls_signs_the_batch_in_one_worker_call(
+        self, mock_gcs_client
+    ):
+        """Test that one worker call signs the batch and failures are left out."""
+
+        def generate_signed_url(**kwargs):
+            if mock_gcs_client["bucket"].blob.call_args.args[0] == "broken.txt":
+                raise Exception("signing failed")
+            return "https://signed-url.example.com"
+
+        mock_gcs_client["blob"].generate_signed_url.side_effect = generate_signed_url
+        client = GCSStorageClient(
+            bucket_name="test-bucket",
+            project_id="test-project",
+            client_email="test@example.com",
+            private_key="test-key",
+        )
+
+        with patch(
+            "chainlit.data.storage_clients.gcs.make_async", wraps=make_async
+        ) as mock_make_async:
+            urls = await client.get_read_urls(["a.txt", "broken.txt", "b.txt"])
+
+        assert urls == {
+            "a.txt": "https://signed-url.example.com",
+            "b.txt": "https://signed-url.example.com",
+        }
+        mock_make_async.assert_called_once_with(client.sync_get_read_urls)
@@ -45,3 +45,36 @@ async def test_upload_file(s3_mock):
     # Verify that the file exists in the mock S3
     response = s3_mock.get_object(Bucket="my-test-bucket", Key="test.txt")
     assert response["Body"].read().decode() == "This is a test file"
+
+
+@pytest.mark.asyncio
+async def test_get_read_urls(s3_mock):
+    client = S3StorageClient(bucket="my-test-bucket")
+
+    urls = await client.get_read_urls(["a.txt", "b.txt"])
+
+    assert set(urls) == {"a.txt", "b.txt"}
+    assert "my-test-bucket" in urls["a.txt"]
+    assert "/a.txt?" in urls["a.txt"]
+    # served from the signed-URL cache
+    assert await client.get_read_urls(["a.txt"]) == {"a.txt": urls["a.txt"]}
+
+
+@pytest.mark.asyncio
+async def test_get_read_urls_leaves_out_keys_that_could_not_be_signed(s3_mock):
+    client = S3StorageClient(bucket="my-test-bucket")
+    presign = client.client.generate_presigned_url
+
+    def generate_presigned_url(method, Params, ExpiresIn):
+        if Params["Key"] == "broken.txt":
+            raise Exception("signing failed")
+        return presign(method, Params=Params, ExpiresIn=ExpiresIn)
+
+    client.client.generate_presigned_url = generate_presigned_url
+
+    urls = await client.get_read_urls(["a.txt", "broken.txt"])
+
+    assert list(urls) == ["a.txt"]
+    assert client.read_url_cache.get("broken.txt") is None
+    # a single read URL still falls back to the key
+    assert await client.get_read_url("broken.txt") == "broken.txt"
@@ -360,6 +360,13 @@ async def test_get_thread_author(
     assert author == "test_user_identifier"
     mock_literal_client.api.get_thread.assert_awaited_once_with(id=test_thread.id)
 
+    # the author is only fetched once, until the thread changes user
+    assert await literal_data_layer.get_thread_author(test_thread.id) == author
+    mock_literal_client.api.get_thread.assert_awaited_once()
+    await literal_data_layer.update_thread(test_thread.id, user_id="other_user_id")
+    await literal_data_layer.get_thread_author(test_thread.id)
+    assert mock_literal_client.api.get_thread.await_count == 2
+
 
 async def test_get_thread(
     literal_data_layer: LiteralDataLayer,
@@ -1,14 +1,21 @@
+# ruff: noqa: RUF001
+import asyncio
+import json
 import uuid
 from pathlib import Path
+from typing import Optional, cast
+from unittest.mock import AsyncMock
 
 import pytest
-from sqlalchemy import text
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import create_async_engine
 
 from chainlit import User
 from chainlit.data.sql_alchemy import SQLAlchemyDataLayer
 from chainlit.data.storage_clients.base import BaseStorageClient
 from chainlit.element import Text
+from chainlit.types import Pagination, ThreadFilter
+from chainlit.user import PersistedUser
 
 
 @pytest.fixture
@@ -225,3 +232,711 @@ async def test_delete_thread(test_user: User, data_layer: SQLAlchemyDataLayer):
     await data_layer.delete_thread("test_thread")
     thread = await data_layer.get_thread("test_thread")
     assert thread is None
+
+
+async def _add_step(
+    data_layer: SQLAlchemyDataLayer,
+    thread_id: str,
+    created_at: str,
+    output: str = "",
+    feedback: Optional[int] = None,
+):
+    step_id = str(uuid.uuid4())
+    await data_layer.execute_sql(
+        """INSERT INTO steps ("id", "name", "type", "threadId", "disableFeedback",
+            "streaming", "output", "createdAt")
+        VALUES (:id, 'step', 'assistant_message', :thread_id, false, false,
+            :output, :created_at)""",
+        {
+            "id": step_id,
+            "thread_id": thread_id,
+            "output": output,
+            "created_at": created_at,
+        },
+    )
+    if feedback is not None:
+        await data_layer.execute_sql(
+            """INSERT INTO feedbacks ("id", "forId", "threadId", "value")
+            VALUES (:id, :for_id, :thread_id, :value)""",
+            {
+                "id": str(uuid.uuid4()),
+                "for_id": step_id,
+                "thread_id": thread_id,
+                "value": feedback,
+            },
+        )
+
+
+@pytest.fixture
+async def user_threads(test_user: User, data_layer: SQLAlchemyDataLayer):
+    persisted_user = await data_layer.create_user(test_user)
+    assert persisted_user
+    # thread_0 has the most recent activity
+    for i in range(5):
+        await data_layer.update_thread(f"thread_{i}", user_id=persisted_user.id)
+        await _add_step(
+            data_layer,
+            f"thread_{i}",
+            f"2025-01-0{9 - i}T10:00:00Z",
+            output="Ο ΦΠΑ είναι 24%" if i % 2 == 0 else "μπλοκάκι 100_%",
+            feedback=1 if i == 3 else None,
+        )
+    await _add_step(data_layer, "thread_4", "2025-01-01T00:00:00Z", output="ΕΝΦΙΑ")
+    return persisted_user
+
+
+async def test_list_threads_keyset_pagination(
+    user_threads: PersistedUser, data_layer: SQLAlchemyDataLayer
+):
+    filters = ThreadFilter(userId=user_threads.id)
+    seen = []
+    cursor = None
+    while True:
+        page = await data_layer.list_threads(
+            Pagination(first=2, cursor=cursor), filters
+        )
+        seen.extend(thread["id"] for thread in page.data)
+        assert all(thread["steps"] == [] for thread in page.data)
+        if not page.pageInfo.hasNextPage:
+            break
+        cursor = page.pageInfo.endCursor
+
+    assert seen == [f"thread_{i}" for i in range(5)]
+
+
+async def test_thread_updated_at_follows_step_writes(
+    mock_chainlit_context,
+    mock_storage_client: BaseStorageClient,
+    user_threads: PersistedUser,
+    data_layer: SQLAlchemyDataLayer,
+):
+    async def ids(layer: SQLAlchemyDataLayer):
+        page = await layer.list_threads(
+            Pagination(first=10), ThreadFilter(userId=user_threads.id)
+        )
+        return [thread["id"] for thread in page.data]
+
+    def step(step_id: str, thread_id: str):
+        return {
+            "id": step_id,
+            "name": "assistant",
+            "type": "assistant_message",
+            "threadId": thread_id,
+            "disableFeedback": False,
+            "streaming": False,
+            "output": "",
+            "createdAt": "2025-02-01T00:00:00Z",
+        }
+
+    # the column is added and filled from the steps on first use
+    assert await ids(data_layer) == [f"thread_{i}" for i in range(5)]
+    rows = await data_layer.execute_sql(
+        """SELECT "updatedAt" FROM threads WHERE "id" = 'thread_4'""", {}
+    )
+    assert rows == [{"updatedAt": "2025-01-05T10:00:00Z"}]
+
+    async with mock_chainlit_context:
+        await data_layer.create_step(step("step_new", "thread_4"))
+        assert (await ids(data_layer))[0] == "thread_4"
+        # an older step does not move the thread back
+        await data_layer.update_step(
+            {**step("step_old", "thread_4"), "createdAt": "2024-01-01T00:00:00Z"}
+        )
+        assert (await ids(data_layer))[0] == "thread_4"
+        await data_layer.delete_step("step_new")
+        assert await ids(data_layer) == [f"thread_{i}" for i in range(5)]
+
+        buffered = SQLAlchemyDataLayer(
+            data_layer._conninfo,
+            storage_provider=mock_storage_client,
+            write_behind=True,
+            write_behind_interval=60,
+        )
+        await buffered.create_step(step("step_buffered", "thread_3"))
+        assert (await ids(buffered))[0] == "thread_3"
+        await buffered.close()
+
+
+async def test_list_threads_search_and_feedback_filters(
+    user_threads: PersistedUser, data_layer: SQLAlchemyDataLayer
+):
+    async def ids(**filters):
+        page = await data_layer.list_threads(
+            Pagination(first=10), ThreadFilter(userId=user_threads.id, **filters)
+        )
+        return [thread["id"] for thread in page.data]
+
+    # other users' threads are left out
+    other = await data_layer.create_user(User(identifier="other_user", metadata={}))
+    assert other
+    await data_layer.update_thread("thread_other", user_id=other.id)
+    await _add_step(data_layer, "thread_other", "2025-02-01T00:00:00Z", "ΦΠΑ ΦΠΑ")
+
+    # case and accent insensitive in Greek
+    assert await ids(search="φπα") == ["thread_0", "thread_2", "thread_4"]
+    assert await ids(search="ενφια") == ["thread_4"]
+    assert await ids(search="ΜΠΛΟΚΑΚΙ") == ["thread_1", "thread_3"]
+    # words are matched by prefix, punctuation is ignored
+    assert await ids(search="μπλοκ 100%") == ["thread_1", "thread_3"]
+    assert await ids(search="λοκακι") == []
+    assert await ids(feedback=1) == ["thread_3"]
+    assert await ids(search="φπα", feedback=1) == []
+
+
+async def test_get_all_user_threads_binds_thread_ids_in_batches(
+    monkeypatch: pytest.MonkeyPatch,
+    user_threads: PersistedUser,
+    data_layer: SQLAlchemyDataLayer,
+):
+    monkeypatch.setattr("chainlit.data.sql_alchemy.THREAD_BATCH_SIZE", 2)
+    await data_layer.execute_sql('ALTER TABLE elements ADD COLUMN "props" JSONB', {})
+    await data_layer.execute_sql(
+        """INSERT INTO elements
+            ("id", "threadId", "type", "url", "objectKey", "name", "display")
+        VALUES
+            ('element_1', 'thread_4', 'text', 'http://a', NULL, 'a', 'inline'),
+            ('element_2', 'thread_4', 'text', 'http://b', 'key_b', 'b', 'inline'),
+            ('element_3', 'thread_0', 'text', 'http://c', 'key_c', 'c', 'inline')""",
+        {},
+    )
+    storage_provider = cast(AsyncMock, data_layer.storage_provider)
+    # key_c could not be signed
+    storage_provider.get_read_urls.return_value = {"key_b": "https://signed/b"}
+
+    threads = await data_layer.get_all_user_threads(user_id=user_threads.id)
+
+    assert threads is not None
+    by_id = {thread["id"]: thread for thread in threads}
+    assert sorted(by_id) == [f"thread_{i}" for i in range(5)]
+    assert [step["output"] for step in by_id["thread_4"]["steps"]] == [
+        "ΕΝΦΙΑ",
+        "Ο ΦΠΑ είναι 24%",
+    ]
+    feedback = by_id["thread_3"]["steps"][0]["feedback"]
+    assert feedback is not None
+    assert feedback["value"] == 1
+    assert [
+        (element["id"], element["url"]) for element in by_id["thread_4"]["elements"]
+    ] == [("element_1", "http://a"), ("element_2", "https://signed/b")]
+    assert by_id["thread_0"]["elements"][0]["url"] == "http://c"
+    # one signing batch for all the threads
+    storage_provider.get_read_urls.assert_awaited_once()
+    assert sorted(storage_provider.get_read_urls.await_args.args[0]) == [
+        "key_b",
+        "key_c",
+    ]
+    # the primary key path returns the same thread
+    assert await data_layer.get_thread("thread_4") == by_id["thread_4"]
+
+
+async def test_list_threads_search_ranks_best_match_first(
+    mock_chainlit_context, user_threads: PersistedUser, data_layer: SQLAlchemyDataLayer
+):
+    async with mock_chainlit_context:
+        await data_layer.update_thread("thread_5", user_id=user_threads.id)
+        for step_id, output in [
+            ("step_a", "Φόρος εισοδήματος και φόρος ακινήτων: ο φόρος"),
+            ("step_b", "Ποιος φόρος ισχύει για τα μπλοκάκια;"),
+        ]:
+            await data_layer.create_step(
+                {
+                    "id": step_id,
+                    "name": "assistant",
+                    "type": "assistant_message",
+                    "threadId": "thread_5" if step_id == "step_a" else "thread_1",
+                    "disableFeedback": False,
+                    "streaming": False,
+                    "output": output,
+                    "createdAt": "2025-01-01T00:00:00Z",
+                }
+            )
+
+        async def ids(search: str, first: int = 10):
+            seen, cursor = [], None
+            while True:
+                page = await data_layer.list_threads(
+                    Pagination(first=first, cursor=cursor),
+                    ThreadFilter(userId=user_threads.id, search=search),
+                )
+                seen.extend(thread["id"] for thread in page.data)
+                if not page.pageInfo.hasNextPage:
+                    return seen
+                cursor = page.pageInfo.endCursor
+
+        # thread_5 is older but mentions "φόρος" more often
+        assert await ids("φορος") == ["thread_5", "thread_1"]
+        assert await ids("φπα", first=1) == ["thread_0", "thread_2", "thread_4"]
+
+        # the index follows the updates and deletions of the steps
+        await data_layer.update_step(
+            {
+                "id": "step_a",
+                "name": "assistant",
+                "type": "assistant_message",
+                "threadId": "thread_5",
+                "disableFeedback": False,
+                "streaming": False,
+                "output": "Ο ΕΝΦΙΑ",
+            }
+        )
+        assert await ids("φορος") == ["thread_1"]
+        assert await ids("ενφια") == ["thread_4", "thread_5"]
+        await data_layer.delete_step("step_a")
+        assert await ids("ενφια") == ["thread_4"]
+
+
+async def test_write_behind_batches_step_writes(
+    mock_chainlit_context,
+    mock_storage_client: BaseStorageClient,
+    test_user: User,
+    data_layer: SQLAlchemyDataLayer,
+):
+    buffered = SQLAlchemyDataLayer(
+        data_layer._conninfo,
+        storage_provider=mock_storage_client,
+        write_behind=True,
+        write_behind_interval=60,
+    )
+    persisted_user = await buffered.create_user(test_user)
+    assert persisted_user
+    await buffered.update_thread("thread_wb", user_id=persisted_user.id)
+    commits = []
+    event.listen(buffered.engine.sync_engine, "commit", commits.append)
+
+    async with mock_chainlit_context:
+        for output in ["", "Ο ΦΠΑ", "Ο ΦΠΑ είναι 24%"]:
+            await buffered.update_step(
+                {
+                    "id": "step_wb",
+                    "name": "assistant",
+                    "type": "assistant_message",
+                    "threadId": "thread_wb",
+                    "disableFeedback": False,
+                    "streaming": False,
+                    "output": output,
+                    "createdAt": "2025-01-01T00:00:00Z",
+                }
+            )
+        assert commits == []
+        # element rows are buffered too, once their file is uploaded
+        element = Text(
+            id=str(uuid.uuid4()),
+            name="test.txt",
+            mime="text/plain",
+            content="test content",
+            for_id="step_wb",
+        )
+        await buffered.create_element(element)
+    assert buffered.write_behind
+    assert buffered.write_behind.pending == 3
+
+    # reads see the buffered writes
+    thread = await buffered.get_thread("thread_wb")
+    assert thread
+    assert [step["output"] for step in thread["steps"]] == ["Ο ΦΠΑ είναι 24%"]
+    page = await buffered.list_threads(
+        Pagination(first=10), ThreadFilter(userId=persisted_user.id, search="φπα")
+    )
+    assert [t["id"] for t in page.data] == ["thread_wb"]
+    # the upserts of the step and its thread went in one transaction; the
+    # others are the reads and the creation of the search index
+    assert buffered.write_behind.batches == 1
+
+    # the element row waited for a flush of its own thread
+    assert buffered.write_behind.pending == 1
+    retrieved = await buffered.get_element(element.thread_id, element.id)
+    assert retrieved
+    assert retrieved["forId"] == "step_wb"
+    assert buffered.write_behind.batches == 2
+    await buffered.close()
+
+
+async def test_reads_flush_only_the_users_threads(
+    mock_chainlit_context,
+    mock_storage_client: BaseStorageClient,
+    test_user: User,
+    data_layer: SQLAlchemyDataLayer,
+):
+    buffered = SQLAlchemyDataLayer(
+        data_layer._conninfo,
+        storage_provider=mock_storage_client,
+        write_behind=True,
+        write_behind_interval=60,
+    )
+    user = await buffered.create_user(test_user)
+    other = await buffered.create_user(User(identifier="other_user", metadata={}))
+    assert user
+    assert other
+    await buffered.update_thread("thread_user", user_id=user.id)
+    await buffered.update_thread("thread_other", user_id=other.id)
+
+    async with mock_chainlit_context:
+        for thread_id in ("thread_user", "thread_other"):
+            await buffered.create_step(
+                {
+                    "id": f"step_{thread_id}",
+                    "name": "assistant",
+                    "type": "assistant_message",
+                    "threadId": thread_id,
+                    "disableFeedback": False,
+                    "streaming": False,
+                    "output": "Ο ΦΠΑ",
+                    "createdAt": "2025-01-01T00:00:00Z",
+                }
+            )
+    assert buffered.write_behind
+    assert sorted(buffered.write_behind.thread_ids) == ["thread_other", "thread_user"]
+
+    page = await buffered.list_threads(
+        Pagination(first=10), ThreadFilter(userId=user.id)
+    )
+    assert [t["id"] for t in page.data] == ["thread_user"]
+    threads = await buffered.get_all_user_threads(user_id=user.id)
+    assert threads
+    assert [step["id"] for step in threads[0]["steps"]] == ["step_thread_user"]
+    # the other user's step is still buffered
+    assert buffered.write_behind.thread_ids == ["thread_other"]
+    assert buffered.write_behind.batches == 1
+
+    threads = await buffered.get_all_user_threads(user_id=other.id)
+    assert threads
+    assert [step["id"] for step in threads[0]["steps"]] == ["step_thread_other"]
+    assert buffered.write_behind.pending == 0
+    await buffered.close()
+
+
+async def test_record_turn_usage(test_user: User, data_layer: SQLAlchemyDataLayer):
+    await data_layer.execute_sql(
+        "ALTER TABLE users ADD COLUMN balance REAL DEFAULT 1.0", {}
+    )
+    persisted_user = await data_layer.create_user(test_user)
+    assert persisted_user
+    await data_layer.update_thread(
+        "thread_usage", user_id=persisted_user.id, metadata={"name": "usage"}
+    )
+    tokens = {"input_tokens": 100, "output_tokens": 10, "total_tokens": 110}
+
+    # concurrent turns (e.g. two tabs) don't lose each other's updates
+    balances = await asyncio.gather(
+        *(
+            data_layer.record_turn_usage(
+                "thread_usage", test_user.identifier, tokens, charge=0.01
+            )
+            for _ in range(10)
+        )
+    )
+
+    assert min(balances) == pytest.approx(0.9)  # type: ignore[type-var]
+    thread = await data_layer.get_thread("thread_usage")
+    assert thread
+    assert json.loads(thread["metadata"]) == {
+        "name": "usage",
+        "input_tokens": 1000,
+        "output_tokens": 100,
+        "total_tokens": 1100,
+    }
+
+    # nothing is written for an unknown user
+    assert (
+        await data_layer.record_turn_usage("thread_usage", "nobody", tokens, 0.01)
+        is None
+    )
+    thread = await data_layer.get_thread("thread_usage")
+    assert thread
+    assert json.loads(thread["metadata"])["total_tokens"] == 1100
+    assert (
+        await data_layer.record_turn_usage("no_thread", test_user.identifier, tokens, 1)
+        is None
+    )
+    user = await data_layer.get_user(test_user.identifier)
+    assert user
+    assert user.balance == pytest.approx(0.9)
+
+
+async def test_sqlite_pragmas_and_single_writer(
+    test_user: User, data_layer: SQLAlchemyDataLayer
+):
+    # every pooled connection is tuned, not only the first one
+    async with (
+        data_layer.engine.connect() as first,
+        data_layer.engine.connect() as second,
+    ):
+        for connection in (first, second):
+            pragmas = {
+                name: (await connection.exec_driver_sql(f"PRAGMA {name}")).scalar()
+                for name in (
+                    "journal_mode",
+                    "synchronous",
+                    "busy_timeout",
+                    "temp_store",
+                )
+            }
+            # synchronous NORMAL = 1, temp_store MEMORY = 2
+            assert pragmas == {
+                "journal_mode": "wal",
+                "synchronous": 1,
+                "busy_timeout": 5000,
+                "temp_store": 2,
+            }
+
+    # concurrent writers queue on the lock, none of them fails
+    persisted_user = await data_layer.create_user(test_user)
+    assert persisted_user
+    await asyncio.gather(
+        *(
+            data_layer.update_thread(f"thread_{i}", user_id=persisted_user.id)
+            for i in range(50)
+        )
+    )
+    count = await data_layer.execute_sql("SELECT COUNT(*) AS n FROM threads", {})
+    assert count == [{"n": 50}]
+
+    # the first write once the maintenance interval has passed checkpoints
+    # the WAL in the background
+    assert data_layer._maintenance_task is None
+    data_layer._next_maintenance = 0
+    await data_layer.update_thread("thread_0", name="renamed")
+    assert data_layer._maintenance_task is not None
+    await data_layer._maintenance_task
+    assert data_layer._next_maintenance > 0
+
+
+async def test_get_user_is_cached_until_the_balance_changes(
+    test_user: User, data_layer: SQLAlchemyDataLayer
+):
+    await data_layer.execute_sql(
+        "ALTER TABLE users ADD COLUMN balance REAL DEFAULT 1.0", {}
+    )
+    persisted_user = await data_layer.create_user(test_user)
+    assert persisted_user
+    statements = []
+    event.listen(
+        data_layer.engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    for _ in range(3):
+        user = await data_layer.get_user(test_user.identifier)
+        assert user
+        assert user.balance == 1.0
+    assert not statements
+
+    await data_layer.update_user_balance(test_user.identifier, 0.25)
+    user = await data_layer.get_user(test_user.identifier)
+    assert user
+    assert user.balance == 0.75
+    await data_layer.update_thread("thread_cache", user_id=persisted_user.id)
+    await data_layer.record_turn_usage(
+        "thread_cache", test_user.identifier, {"total_tokens": 1}, charge=0.5
+    )
+    user = await data_layer.get_user(test_user.identifier)
+    assert user
+    assert user.balance == 0.25
+    assert data_layer.user_cache.hits >= 3
+
+
+async def test_thread_author_is_queried_once(
+    test_user: User, data_layer: SQLAlchemyDataLayer
+):
+    persisted_user = await data_layer.create_user(test_user)
+    assert persisted_user
+    await data_layer.update_thread("thread_author", user_id=persisted_user.id)
+    await data_layer.update_thread("thread_read", user_id=persisted_user.id)
+    # an author learned from a read
+    data_layer.thread_authors.discard("thread_read")
+    await data_layer.list_threads(
+        Pagination(first=10), ThreadFilter(userId=persisted_user.id)
+    )
+    statements = []
+    event.listen(
+        data_layer.engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    for thread_id in ("thread_author", "thread_read"):
+        assert await data_layer.get_thread_author(thread_id) == test_user.identifier
+    assert not statements
+
+    await data_layer.delete_thread("thread_author")
+    statements.clear()
+    assert await data_layer.get_thread_author("thread_author") == test_user.identifier
+    assert len(statements) == 1
+
+
+async def test_iter_user_threads_hydrates_in_batches(
+    test_user: User, data_layer: SQLAlchemyDataLayer
+):
+    persisted_user = await data_layer.create_user(test_user)
+    assert persisted_user
+    for i in range(5):
+        thread_id = f"thread_{i}"
+        await data_layer.update_thread(thread_id, user_id=persisted_user.id)
+        await data_layer.execute_sql(
+            'UPDATE threads SET "createdAt" = :createdAt WHERE "id" = :id',
+            # thread_3 and thread_4 were created at the same time
+            {"id": thread_id, "createdAt": f"2024-01-0{min(i, 3) + 1}T00:00:00Z"},
+        )
+        await data_layer.execute_sql(
+            """INSERT INTO steps ("id", "name", "type", "threadId", "output",
+                "disableFeedback", "streaming")
+            VALUES (:id, 'assistant', 'assistant_message', :threadId, :output,
+                false, false)""",
+            {"id": f"step_{i}", "threadId": thread_id, "output": f"answer {i}"},
+        )
+    hydrated = []
+    hydrate = data_layer._hydrate_threads
+
+    async def counting_hydrate(headers):
+        hydrated.append(len(headers))
+        return await hydrate(headers)
+
+    data_layer._hydrate_threads = counting_hydrate  # type: ignore[method-assign]
+
+    threads = []
+    async for thread in data_layer.iter_user_threads(persisted_user.id, batch_size=2):
+        # no connection is held while the caller has the thread
+        assert data_layer.engine.pool.checkedout() == 0
+        threads.append(thread)
+
+    assert [thread["id"] for thread in threads] == [f"thread_{i}" for i in range(5)]
+    assert [[step["output"] for step in thread["steps"]] for thread in threads] == [
+        [f"answer {i}"] for i in range(5)
+    ]
+    assert hydrated == [2, 2, 1]
+
+
+async def test_usage_ledger_and_daily_rollup(
+    test_user: User, data_layer: SQLAlchemyDataLayer
+):
+    await data_layer.execute_sql(
+        "ALTER TABLE users ADD COLUMN balance REAL DEFAULT 10.0", {}
+    )
+    persisted_user = await data_layer.create_user(test_user)
+    assert persisted_user
+    for thread_id in ("thread_old", "thread_new", "thread_idle"):
+        await data_layer.update_thread(thread_id, user_id=persisted_user.id)
+    # a turn billed before the ledger existed, known from its step metadata
+    await data_layer.execute_sql(
+        """INSERT INTO steps ("id", "name", "type", "threadId", "metadata",
+            "createdAt", "disableFeedback", "streaming")
+        VALUES ('step_old', 'assistant', 'assistant_message', 'thread_old',
+            :metadata, '2024-01-01T10:00:00Z', false, false)""",
+        {
+            "metadata": json.dumps(
+                {"input_tokens": 30, "output_tokens": 3, "total_tokens": 33}
+            )
+        },
+    )
+
+    tokens = {"input_tokens": 100, "output_tokens": 10, "total_tokens": 110}
+    for i in range(3):
+        balance = await data_layer.record_turn_usage(
+            "thread_new", test_user.identifier, tokens, 0.5, step_id=f"step_{i}"
+        )
+    assert balance == pytest.approx(8.5)
+
+    threads = await data_layer.list_thread_usage(
+        persisted_user.id, test_user.identifier
+    )
+    assert [thread["id"] for thread in threads] == [
+        "thread_new",
+        "thread_idle",
+        "thread_old",
+    ]
+    assert threads[0]["total_tokens"] == 330
+    assert [turn["id"] for turn in threads[0]["turns"]] == [
+        "step_0",
+        "step_1",
+        "step_2",
+    ]
+    assert threads[1]["total_tokens"] == 0
+    assert threads[1]["turns"] == []
+    assert threads[2]["turns"] == [
+        {
+            "id": "step_old",
+            "createdAt": "2024-01-01T10:00:00Z",
+            "input_tokens": 30,
+            "output_tokens": 3,
+            "total_tokens": 33,
+        }
+    ]
+    page = await data_layer.list_thread_usage(
+        persisted_user.id, test_user.identifier, limit=1, offset=1
+    )
+    assert [thread["id"] for thread in page] == ["thread_idle"]
+
+    days = await data_layer.list_daily_usage(test_user.identifier)
+    assert [(day["turns"], day["total_tokens"]) for day in days] == [(3, 330), (1, 33)]
+    assert days[0]["charge"] == pytest.approx(1.5)
+    totals = await data_layer.get_usage_totals(test_user.identifier)
+    assert totals["turns"] == 4
+    assert totals["total_tokens"] == 363
+
+
+async def test_usage_ledger_created_by_two_workers_at_once(
+    test_user: User, data_layer: SQLAlchemyDataLayer
+):
+    persisted_user = await data_layer.create_user(test_user)
+    assert persisted_user
+    await data_layer.update_thread("thread_old", user_id=persisted_user.id)
+    await data_layer.execute_sql(
+        """INSERT INTO steps ("id", "name", "type", "threadId", "metadata",
+            "createdAt", "disableFeedback", "streaming")
+        VALUES ('step_old', 'assistant', 'assistant_message', 'thread_old',
+            :metadata, '2024-01-01T10:00:00Z', false, false)""",
+        {"metadata": json.dumps({"total_tokens": 33})},
+    )
+    # Both workers find no ledger, then both create and backfill it
+    other = SQLAlchemyDataLayer(
+        str(data_layer.engine.url), storage_provider=data_layer.storage_provider
+    )
+    for layer in (data_layer, other):
+        layer._usage_ledger_exists = AsyncMock(side_effect=[False, True])
+
+    assert await asyncio.gather(
+        data_layer._has_usage_ledger(), other._has_usage_ledger()
+    ) == [True, True]
+    # neither creation failed and fell back to finding the other's ledger
+    for layer in (data_layer, other):
+        assert layer._usage_ledger_exists.await_count == 1
+
+    totals = await data_layer.get_usage_totals(test_user.identifier)
+    assert totals["turns"] == 1
+    assert totals["total_tokens"] == 33
+    days = await other.list_daily_usage(test_user.identifier)
+    assert [(day["turns"], day["total_tokens"]) for day in days] == [(1, 33)]
+
+
+async def test_first_turn_is_not_billed_twice_by_the_backfill(
+    test_user: User, data_layer: SQLAlchemyDataLayer
+):
+    await data_layer.execute_sql(
+        "ALTER TABLE users ADD COLUMN balance REAL DEFAULT 10.0", {}
+    )
+    persisted_user = await data_layer.create_user(test_user)
+    assert persisted_user
+    await data_layer.update_thread("thread_new", user_id=persisted_user.id)
+    # the turn's assistant step, flushed by record_turn_usage before the
+    # ledger is created and backfilled
+    tokens = {"input_tokens": 100, "output_tokens": 10, "total_tokens": 110}
+    await data_layer.execute_sql(
+        """INSERT INTO steps ("id", "name", "type", "threadId", "metadata",
+            "createdAt", "disableFeedback", "streaming")
+        VALUES ('step_new', 'assistant', 'assistant_message', 'thread_new',
+            :metadata, '2025-01-01T10:00:00Z', false, false)""",
+        {"metadata": json.dumps(tokens)},
+    )
+
+    await data_layer.record_turn_usage(
+        "thread_new", test_user.identifier, tokens, 0.5, step_id="step_new"
+    )
+
+    totals = await data_layer.get_usage_totals(test_user.identifier)
+    assert totals["turns"] == 1
+    assert totals["total_tokens"] == 110
+    rows = await data_layer.execute_sql('SELECT "id", "stepId" FROM usage_ledger', {})
+    assert isinstance(rows, list)
+    assert [row["stepId"] for row in rows] == ["step_new"]
+    assert uuid.UUID(rows[0]["id"])
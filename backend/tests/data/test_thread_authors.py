@@ -0,0 +1,18 @@
+from chainlit.data.thread_authors import ThreadAuthorCache
+
+
+def test_thread_author_cache():
+    cache = ThreadAuthorCache(max_size=2)
+    cache.set("t1", "alice")
+    cache.set("t2", None)
+    assert cache.get("t1") == "alice"
+    assert cache.get("t2") is None
+
+    cache.set("t2", "bob")
+    cache.set("t3", "carol")
+    # t1 was the least recently used
+    assert cache.get("t1") is None
+    cache.discard("t3")
+    assert cache.get("t3") is None
+    assert cache.get("t2") == "bob"
+    assert cache.stats() == {"hits": 2, "misses": 3, "hit_ratio": 0.4, "entries": 1}
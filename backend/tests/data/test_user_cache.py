@@ -0,0 +1,109 @@
+import asyncio
+from typing import Optional
+
+from chainlit.data.user_cache import UserCache
+from chainlit.data.utils import cached_user
+from chainlit.user import PersistedUser
+
+
+def persisted_user(identifier: str = "user", balance: float = 1.0) -> PersistedUser:
+    return PersistedUser(
+        id=f"id-{identifier}",
+        identifier=identifier,
+        createdAt="2024-01-01",
+        balance=balance,
+    )
+
+
+class FakeDataLayer:
+    def __init__(self):
+        self.user_cache = UserCache(ttl=60)
+        self.balance = 1.0
+        self.lookups = 0
+        self.gate: Optional[asyncio.Event] = None
+
+    @cached_user()
+    async def get_user(self, identifier: str) -> Optional[PersistedUser]:
+        self.lookups += 1
+        balance = self.balance
+        if self.gate is not None:
+            await self.gate.wait()
+        if identifier == "nobody":
+            return None
+        return persisted_user(identifier, balance)
+
+    async def update_user_balance(self, identifier: str, balance: float):
+        self.balance = balance
+        self.user_cache.invalidate(identifier)
+
+
+async def test_get_user_reads_through_the_cache():
+    data_layer = FakeDataLayer()
+
+    for _ in range(4):
+        user = await data_layer.get_user("user")
+        assert user
+        assert user.balance == 1.0
+    await data_layer.get_user(identifier="user")
+
+    assert data_layer.lookups == 1
+    assert data_layer.user_cache.stats() == {
+        "hits": 4,
+        "misses": 1,
+        "hit_ratio": 0.8,
+        "entries": 1,
+    }
+
+    # unknown users are not cached
+    assert await data_layer.get_user("nobody") is None
+    assert await data_layer.get_user("nobody") is None
+    assert data_layer.lookups == 3
+
+
+async def test_invalidation_and_copies():
+    data_layer = FakeDataLayer()
+    user = await data_layer.get_user("user")
+    assert user
+    # changing the returned user does not change the cached one
+    user.display_name = "changed"
+    cached = await data_layer.get_user("user")
+    assert cached
+    assert cached.display_name is None
+
+    await data_layer.update_user_balance("user", 5.0)
+    user = await data_layer.get_user("user")
+    assert user
+    assert user.balance == 5.0
+    assert data_layer.lookups == 2
+
+
+async def test_lookup_racing_an_update_is_not_cached():
+    data_layer = FakeDataLayer()
+    data_layer.gate = asyncio.Event()
+
+    # the lookup reads the old balance, then the update commits
+    lookup = asyncio.create_task(data_layer.get_user("user"))
+    await asyncio.sleep(0)
+    await data_layer.update_user_balance("user", 5.0)
+    data_layer.gate.set()
+    stale = await lookup
+    assert stale
+    assert stale.balance == 1.0
+
+    user = await data_layer.get_user("user")
+    assert user
+    assert user.balance == 5.0
+
+
+def test_entries_expire_and_are_bounded(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("chainlit.data.user_cache.time.monotonic", lambda: now)
+    cache = UserCache(ttl=10, max_size=2)
+    for identifier in ("a", "b", "c"):
+        cache.set(identifier, persisted_user(identifier))
+
+    assert cache.get("a") is None
+    assert cache.get("b")
+    now += 11
+    assert cache.get("b") is None
+    assert cache.hit_ratio == 1 / 3
@@ -0,0 +1,112 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from chainlit.data.write_behind import WriteBatch, WriteBehind
+
+
+class Recorder:
+    def __init__(self, failures: int = 0):
+        self.batches: List[WriteBatch] = []
+        self.failures = failures
+
+    async def __call__(self, batch: WriteBatch):
+        if self.failures:
+            self.failures -= 1
+            raise Exception("database is locked")
+        self.batches.append(batch)
+
+
+async def test_upserts_are_merged_per_row():
+    write = Recorder()
+    buffer = WriteBehind(write, interval=60)
+
+    buffer.upsert("t1", "threads", {"id": "t1", "createdAt": "1"})
+    buffer.upsert("t1", "steps", {"id": "s1", "name": "a", "output": ""})
+    buffer.upsert("t1", "threads", {"id": "t1", "createdAt": "2"})
+    buffer.upsert("t1", "steps", {"id": "s1", "output": "hello"})
+    assert buffer.pending == 2
+
+    await buffer.flush()
+
+    assert write.batches == [
+        {
+            "threads": [{"id": "t1", "createdAt": "2"}],
+            "steps": [{"id": "s1", "name": "a", "output": "hello"}],
+        }
+    ]
+    assert buffer.upserts == 4
+    assert buffer.batches == 1
+    assert buffer.pending == 0
+    await buffer.close()
+
+
+async def test_flush_one_thread():
+    write = Recorder()
+    buffer = WriteBehind(write, interval=60)
+    buffer.upsert("t1", "steps", {"id": "s1"})
+    buffer.upsert("t2", "steps", {"id": "s2"})
+
+    await buffer.flush("t1")
+    await buffer.flush("unknown")
+
+    assert write.batches == [{"steps": [{"id": "s1"}]}]
+    assert buffer.pending == 1
+    await buffer.close()
+    assert write.batches[-1] == {"steps": [{"id": "s2"}]}
+
+
+async def test_flush_some_threads():
+    write = Recorder()
+    buffer = WriteBehind(write, interval=60)
+    for thread_id in ("t1", "t2", "t3"):
+        buffer.upsert(thread_id, "steps", {"id": f"s_{thread_id}"})
+
+    await buffer.flush_threads(["t1", "t3", "unknown"])
+    await buffer.flush_threads([])
+
+    assert write.batches == [{"steps": [{"id": "s_t1"}, {"id": "s_t3"}]}]
+    assert buffer.thread_ids == ["t2"]
+    await buffer.close()
+
+
+async def test_flushes_on_timer_and_when_full():
+    write = Recorder()
+    buffer = WriteBehind(write, interval=0.01, max_rows=3)
+
+    buffer.upsert("t1", "steps", {"id": "s1"})
+    await asyncio.sleep(0.05)
+    assert write.batches == [{"steps": [{"id": "s1"}]}]
+
+    for i in range(3):
+        buffer.upsert("t1", "steps", {"id": f"s{i + 2}"})
+    await asyncio.sleep(0)
+    assert len(write.batches) == 2
+    assert len(write.batches[1]["steps"]) == 3
+    await buffer.close()
+
+
+async def test_failed_flush_is_retried_without_losing_newer_upserts():
+    write = Recorder(failures=1)
+    buffer = WriteBehind(write, interval=60)
+    buffer.upsert("t1", "steps", {"id": "s1", "name": "a", "output": "old"})
+
+    await buffer.flush()
+    assert write.batches == []
+    buffer.upsert("t1", "steps", {"id": "s1", "output": "new"})
+
+    await buffer.close()
+    assert write.batches == [{"steps": [{"id": "s1", "name": "a", "output": "new"}]}]
+
+
+@pytest.mark.parametrize("interval", [0.01, 60])
+async def test_close_writes_everything(interval: float):
+    write = Recorder()
+    buffer = WriteBehind(write, interval=interval)
+    buffer.upsert("t1", "steps", {"id": "s1"})
+
+    await buffer.close()
+    await asyncio.sleep(0.02)
+
+    assert write.batches == [{"steps": [{"id": "s1"}]}]
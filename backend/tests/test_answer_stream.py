@@ -0,0 +1,65 @@
+# ruff: noqa: RUF001
+import json
+
+from langchain_core.messages import AIMessageChunk
+
+from answer_stream_b import AnswerStreamParser, chunk_fragments
+
+ANSWER = {
+    "answer": 'Ο ΦΠΑ είναι 24%.\nΒλ. "ΠΟΛ 1234"',
+    "citations": [
+        {
+            "full_path_name": "assets/pol_1234.pdf",
+            "page_number": 2,
+            "article_title": None,
+            "paragraph_title": None,
+        }
+    ],
+}
+
+
+def split(text: str, size: int):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_answer_is_streamed_in_order_from_any_split():
+    payload = json.dumps(ANSWER, ensure_ascii=False)
+    escaped = json.dumps(ANSWER)  # \uXXXX escapes cut across fragments
+
+    for text in (payload, escaped):
+        for size in (1, 3, 7, 50):
+            parser = AnswerStreamParser()
+            streamed = "".join(parser.feed(fragment) for fragment in split(text, size))
+
+            assert streamed == ANSWER["answer"]
+            assert json.loads(parser.buffer) == ANSWER
+
+
+def test_answer_starts_before_the_citations_arrive():
+    parser = AnswerStreamParser()
+
+    assert parser.feed('{"answer": "Ο Φ') == "Ο Φ"
+    assert parser.feed('ΠΑ", "citations": [') == "ΠΑ"
+    assert parser.emitted == "Ο ΦΠΑ"
+
+
+def test_tool_call_argument_deltas_are_parsed():
+    chunks = [
+        AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                {"name": "AnswerWithCitations", "args": args, "id": None, "index": 0}
+            ],
+        )
+        for args in ('{"answer": "Ε', 'ΝΦΙΑ"', ', "citations": []}')
+    ]
+    parser = AnswerStreamParser()
+
+    assert [parser.feed_chunk(chunk) for chunk in chunks] == ["Ε", "ΝΦΙΑ", ""]
+    assert json.loads(parser.buffer) == {"answer": "ΕΝΦΙΑ", "citations": []}
+
+
+def test_text_parts_of_list_content():
+    chunk = AIMessageChunk(content=[{"type": "text", "text": '{"answer": "a'}])
+
+    assert chunk_fragments(chunk) == '{"answer": "a'
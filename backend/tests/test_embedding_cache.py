@@ -0,0 +1,198 @@
+# ruff: noqa: RUF001
+import multiprocessing
+from typing import List
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_qdrant import SparseEmbeddings, SparseVector
+
+from embedding_cache_b import (
+    CachedEmbeddings,
+    CachedSparseEmbeddings,
+    MmapBlobStore,
+    embed_queries,
+    load_warmup_texts,
+    warm_embedding_caches,
+)
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Records the batches it is asked to encode."""
+
+    calls: List[List[str]] = []
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls.append([text])
+        return super().embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(list(texts))
+        return super().embed_documents(texts)
+
+
+class CountingSparseEmbeddings(SparseEmbeddings):
+    def __init__(self):
+        self.calls: List[List[str]] = []
+
+    def _embed(self, text: str) -> SparseVector:
+        indices = sorted({hash(token) % 1000 for token in text.split()})
+        return SparseVector(indices=indices, values=[0.5] * len(indices))
+
+    def embed_documents(self, texts: List[str]) -> List[SparseVector]:
+        self.calls.append(list(texts))
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> SparseVector:
+        self.calls.append([text])
+        return self._embed(text)
+
+
+@pytest.fixture
+def dense(tmp_path):
+    cached = CachedEmbeddings(
+        CountingEmbeddings(size=8, calls=[]),
+        model_name="fake-dense",
+        cache_dir=str(tmp_path),
+        query_prompt_name="Retrieval-query",
+        document_prompt_name="Retrieval-document",
+    )
+    yield cached
+    cached.cache.close()
+
+
+def test_query_hits_memory_after_first_call(dense):
+    first = dense.embed_query("δήλωση ΦΠΑ")
+    second = dense.embed_query("δήλωση ΦΠΑ")
+
+    assert first == pytest.approx(second)
+    assert dense.embeddings.calls == [["δήλωση ΦΠΑ"]]
+    assert dense.cache.stats()["memory_hits"] == 1
+
+
+def test_query_and_document_prompts_are_cached_separately(dense):
+    dense.embed_query("δήλωση ΦΠΑ")
+    dense.embed_documents(["δήλωση ΦΠΑ"])
+
+    assert dense.cache.misses == 2
+
+
+def test_misses_are_encoded_in_one_batch(dense):
+    dense.embed_documents(["α"])
+
+    dense.embed_documents(["α", "β", "γ", "β"])
+
+    assert dense.embeddings.calls == [["α"], ["β", "γ"]]
+
+
+def test_vectors_survive_a_restart_through_the_disk_store(dense, tmp_path):
+    vector = dense.embed_documents(["μπλοκάκι"])[0]
+    dense.cache.close()
+
+    reopened = CachedEmbeddings(
+        CountingEmbeddings(size=8, calls=[]),
+        model_name="fake-dense",
+        cache_dir=str(tmp_path),
+        document_prompt_name="Retrieval-document",
+    )
+    try:
+        assert reopened.embed_documents(["μπλοκάκι"])[0] == pytest.approx(vector)
+        assert reopened.embeddings.calls == []
+        assert reopened.cache.stats()["disk_hits"] == 1
+    finally:
+        reopened.cache.close()
+
+
+def test_memory_tier_is_bounded(tmp_path):
+    cached = CachedEmbeddings(
+        CountingEmbeddings(size=8, calls=[]),
+        model_name="fake-dense",
+        cache_dir=str(tmp_path),
+        max_memory_entries=2,
+    )
+    cached.embed_documents(["α", "β", "γ"])
+
+    cached.embed_documents(["α"])
+
+    assert cached.cache.stats()["memory_entries"] == 2
+    assert cached.cache.stats()["disk_hits"] == 1
+    cached.cache.close()
+
+
+def test_sparse_vectors_round_trip(tmp_path):
+    cached = CachedSparseEmbeddings(
+        CountingSparseEmbeddings(), model_name="fake-bm25", cache_dir=str(tmp_path)
+    )
+    computed = cached.embed_queries(["ΦΠΑ ΚΑΔ", "ΕΝΦΙΑ"])
+    cached.cache.close()
+
+    reopened = CachedSparseEmbeddings(
+        CountingSparseEmbeddings(), model_name="fake-bm25", cache_dir=str(tmp_path)
+    )
+    try:
+        assert embed_queries(reopened, ["ΦΠΑ ΚΑΔ", "ΕΝΦΙΑ"]) == computed
+        assert reopened.sparse_embeddings.calls == []
+    finally:
+        reopened.cache.close()
+
+
+def test_blob_store_grows_past_the_mapping(tmp_path):
+    store = MmapBlobStore(str(tmp_path / "blobs"))
+    store.put_many({"a": b"1234"})
+    assert store.get_many(["a"]) == {"a": b"1234"}
+
+    store.put_many({"b": b"5678" * 1000, "empty": b""})
+
+    assert store.get_many(["a", "b", "empty", "missing"]) == {
+        "a": b"1234",
+        "b": b"5678" * 1000,
+        "empty": b"",
+    }
+    assert len(store) == 3
+    store.close()
+
+
+def _put_blobs(path: str, worker: int, rounds: int):
+    store = MmapBlobStore(path)
+    for i in range(rounds):
+        store.put_many(
+            {
+                f"{worker}-{i}-{j}": f"{worker}-{i}-{j};".encode() * (j + 1)
+                for j in range(3)
+            }
+        )
+    store.close()
+
+
+def test_blob_store_shared_by_several_processes(tmp_path):
+    path = str(tmp_path / "blobs")
+    rounds = 500
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_put_blobs, args=(path, worker, rounds))
+        for worker in range(4)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(60)
+        assert process.exitcode == 0
+
+    store = MmapBlobStore(path)
+    keys = [f"{w}-{i}-{j}" for w in range(4) for i in range(rounds) for j in range(3)]
+    blobs = store.get_many(keys)
+    assert {key: blobs.get(key) for key in keys} == {
+        key: f"{key};".encode() * (int(key[-1]) + 1) for key in keys
+    }
+    store.close()
+
+
+def test_warmup_from_question_log(dense, tmp_path):
+    log = tmp_path / "questions.log"
+    log.write_text("ΦΠΑ\nμπλοκάκι\nΦΠΑ\n\nΕΝΦΙΑ\nΦΠΑ\nμπλοκάκι\n", encoding="utf-8")
+
+    texts = load_warmup_texts(str(log), limit=2)
+    assert texts == ["ΦΠΑ", "μπλοκάκι"]
+
+    assert warm_embedding_caches([dense], texts) == 2
+    dense.embed_query("ΦΠΑ")
+    assert dense.cache.stats()["memory_hits"] == 1
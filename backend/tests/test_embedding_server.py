@@ -0,0 +1,93 @@
+import asyncio
+import json
+import os
+import tempfile
+from typing import List
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from embedding_server_b import EmbeddingServer, RemoteEmbeddings, _frame
+
+
+class RecordingEmbeddings(Embeddings):
+    def __init__(self):
+        self.query_batches: List[List[str]] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        self.query_batches.append(list(texts))
+        if "boom" in texts:
+            raise ValueError("encoder failed")
+        return [[float(len(t)), 0.0] for t in texts]
+
+
+@pytest.fixture
+async def server():
+    # AF_UNIX paths are limited to ~100 characters, keep it short
+    socket_path = os.path.join(tempfile.mkdtemp(), "emb.sock")
+    server = EmbeddingServer(
+        RecordingEmbeddings(), socket_path, batch_window=0.05, max_batch_size=8
+    )
+    await server.start()
+    yield server
+    await server.close()
+
+
+async def test_remote_embeddings_round_trip(server):
+    remote = RemoteEmbeddings(server.socket_path)
+
+    assert await asyncio.to_thread(remote.embed_query, "ΦΠΑ") == [3.0, 0.0]
+    assert await asyncio.to_thread(remote.embed_documents, ["a", "bb"]) == [
+        [1.0, 1.0],
+        [2.0, 1.0],
+    ]
+    assert remote.embed_documents([]) == []
+
+
+async def test_concurrent_queries_share_a_batch(server):
+    remotes = [RemoteEmbeddings(server.socket_path) for _ in range(4)]
+
+    results = await asyncio.gather(
+        *(
+            asyncio.to_thread(remote.embed_query, "x" * (i + 1))
+            for i, remote in enumerate(remotes)
+        )
+    )
+
+    assert results == [[1.0, 0.0], [2.0, 0.0], [3.0, 0.0], [4.0, 0.0]]
+    assert len(server.embeddings.query_batches) == 1
+    assert sorted(server.embeddings.query_batches[0]) == ["x", "xx", "xxx", "xxxx"]
+
+
+async def test_encoder_errors_are_returned_to_the_caller(server):
+    remote = RemoteEmbeddings(server.socket_path)
+
+    with pytest.raises(RuntimeError, match="encoder failed"):
+        await asyncio.to_thread(remote.embed_query, "boom")
+    # the connection is still usable
+    assert await asyncio.to_thread(remote.embed_query, "ok") == [2.0, 0.0]
+
+
+async def test_client_disconnecting_before_its_batch_is_done(server):
+    _, writer = await asyncio.open_unix_connection(server.socket_path)
+    writer.write(
+        _frame(json.dumps({"id": 1, "kind": "query", "texts": ["x"]}).encode())
+    )
+    await writer.drain()
+    # the request is waiting for the batch window
+    while not server._tasks:
+        await asyncio.sleep(0.001)
+    tasks = list(server._tasks)
+    writer.close()
+    await writer.wait_closed()
+
+    assert await asyncio.gather(*tasks) == [None]
+    # the server still answers the other clients
+    remote = RemoteEmbeddings(server.socket_path)
+    assert await asyncio.to_thread(remote.embed_query, "ok") == [2.0, 0.0]
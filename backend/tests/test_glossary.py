@@ -0,0 +1,97 @@
+# ruff: noqa: RUF001
+import json
+from pathlib import Path
+
+import pytest
+
+from glossary_b import AhoCorasick, GlossaryMatcher, fold
+from keyword_mapping import keyword_mappings
+
+GLOSSARY = json.loads(
+    (Path(__file__).resolve().parent.parent / "glossary.json").read_text("utf-8")
+)
+
+
+def naive_glossary_context(query: str) -> str:
+    """The previous implementation: a substring check per keyword."""
+    query_lower = query.lower()
+    matched_terms = set()
+    for keyword, terms in keyword_mappings.items():
+        if keyword in query_lower:
+            matched_terms.update(terms)
+    relevant_terms = []
+    for item in GLOSSARY:
+        if item["term"] in matched_terms:
+            entry = f"**{item['term']}**: {item['definition']}"
+            if "distinction" in item:
+                entry += f" ΔΙΑΚΡΙΣΗ: {item['distinction']}"
+            relevant_terms.append(entry)
+    if relevant_terms:
+        return (
+            "\n\n### ΓΛΩΣΣΑΡΙΟ ΟΡΩΝ ###\n"
+            + "\n\n".join(relevant_terms)
+            + "\n### ΤΕΛΟΣ ΓΛΩΣΣΑΡΙΟΥ ###\n"
+        )
+    return ""
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return GlossaryMatcher(keyword_mappings, GLOSSARY)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "Πώς φορολογείται μια ατομική επιχείρηση;",
+        "Ποια η διαφορά Ο.Ε. και Ι.Κ.Ε. στον ΦΠΑ;",
+        "Τι ισχύει για την ανώνυμη εταιρεία και τα μερίσματα;",
+        "καιρός αύριο",
+        "",
+    ],
+)
+def test_same_block_as_the_substring_scan(matcher, query):
+    assert matcher.glossary_context(query) == naive_glossary_context(query)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "Πώς κάνω ηλεκτρονικές συναλλαγές;",
+        "Ποιες είναι οι ασφαλιστικές εισφορές;",
+        "ΗΛΕΚΤΡΟΝΙΚΕΣ ΑΣΦΑΛΙΣΤΙΚΕΣ ΑΝΤΙΚΕΙΜΕΝΙΚΕΣ",
+    ],
+)
+def test_short_keywords_do_not_match_inside_words(matcher, query):
+    assert "Κεφαλαιουχική Εταιρεία" not in matcher.match_terms(query)
+
+
+@pytest.mark.parametrize("query", ["Τι είναι η ΙΚΕ;", "ίδρυση ικε", "Ι.Κ.Ε. ή Ο.Ε."])
+def test_short_keywords_match_whole_words(matcher, query):
+    assert "Κεφαλαιουχική Εταιρεία" in matcher.match_terms(query)
+
+
+def test_long_keywords_still_match_as_stems(matcher):
+    # "εκπιπτόμεν" is a stem of "εκπιπτόμενες"
+    assert "Δαπάνες Εκπιπτόμενες" in matcher.match_terms("εκπιπτομενες δαπανες")
+
+
+def test_matching_ignores_accents_and_case(matcher):
+    accented = matcher.glossary_context("ατομική επιχείρηση")
+
+    assert accented
+    assert matcher.glossary_context("ΑΤΟΜΙΚΗ ΕΠΙΧΕΙΡΗΣΗ") == accented
+    assert matcher.glossary_context("ατομικη επιχειρηση") == accented
+
+
+def test_fold_maps_final_sigma():
+    assert fold("Φόρος") == fold("φοροσ") == "φοροσ"
+
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = AhoCorasick(["he", "she", "his", "hers", ""])
+
+    found = automaton.find("ushers")
+
+    assert {automaton.patterns[i] for i in found} == {"he", "she", "hers"}
+    assert automaton.find("xyz") == set()
@@ -4,7 +4,12 @@ from unittest.mock import patch
 
 import pytest
 
-from chainlit.markdown import DEFAULT_MARKDOWN_STR, get_markdown_str, init_markdown
+from chainlit.markdown import (
+    DEFAULT_MARKDOWN_STR,
+    clear_markdown,
+    get_markdown_str,
+    init_markdown,
+)
 
 
 class TestInitMarkdown:
@@ -196,6 +201,22 @@ class TestGetMarkdownStr:
             assert result == large_content
             assert len(result) > 10000
 
+    def test_get_markdown_str_is_cached_until_cleared(self):
+        """Test get_markdown_str reads a file once, until clear_markdown."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            chainlit_md_path = os.path.join(tmpdir, "chainlit.md")
+            with open(chainlit_md_path, "w", encoding="utf-8") as f:
+                f.write("# Before")
+
+            assert get_markdown_str(tmpdir, "en") == "# Before"
+
+            with open(chainlit_md_path, "w", encoding="utf-8") as f:
+                f.write("# After")
+
+            assert get_markdown_str(tmpdir, "en") == "# Before"
+            clear_markdown()
+            assert get_markdown_str(tmpdir, "en") == "# After"
+
 
 class TestDefaultMarkdownStr:
     """Test suite for DEFAULT_MARKDOWN_STR constant."""
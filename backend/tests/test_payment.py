@@ -106,6 +106,9 @@ async def data_layer():
     # Create SQLAlchemyDataLayer instance
     data_layer_instance = SQLAlchemyDataLayer(conninfo)
     data_layer_instance.engine = engine
+    # the webhook app below gets a new data layer per request, as another
+    # worker would: don't let this one serve users it cached before a payment
+    data_layer_instance.user_cache.ttl = 0
     return data_layer_instance
 
 
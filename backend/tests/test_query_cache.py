@@ -0,0 +1,76 @@
+# ruff: noqa: RUF001
+import time
+
+import pytest
+
+from query_cache_b import QueryRewriteCache
+
+QUERIES = ["προθεσμία δήλωσης ΦΠΑ", "υποβολή περιοδικής δήλωσης ΦΠΑ"]
+
+
+@pytest.fixture
+def period():
+    return {"value": "October,2026"}
+
+
+@pytest.fixture
+def cache(tmp_path, period):
+    cache = QueryRewriteCache(
+        str(tmp_path / "rewrites.sqlite"), period_fn=lambda: period["value"]
+    )
+    yield cache
+    cache.close()
+
+
+def test_miss_then_hit_on_normalized_question(cache):
+    assert cache.get("Πότε λήγει η δήλωση ΦΠΑ;") is None
+    cache.put("Πότε λήγει η δήλωση ΦΠΑ;", QUERIES, latency=1.5)
+
+    assert cache.get("  πότε ΛΗΓΕΙ η δήλωση φπα ") == QUERIES
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "hit_rate": 0.5,
+        "latency_saved": 1.5,
+    }
+
+
+def test_key_includes_the_prompt_month(cache, period):
+    cache.put("Πότε λήγει η δήλωση ΦΠΑ;", QUERIES)
+
+    period["value"] = "November,2026"
+
+    assert cache.get("Πότε λήγει η δήλωση ΦΠΑ;") is None
+
+
+def test_persists_across_instances(tmp_path, period, cache):
+    cache.put("Τι είναι το μπλοκάκι;", QUERIES)
+
+    reopened = QueryRewriteCache(cache.path, period_fn=lambda: period["value"])
+    try:
+        assert reopened.get("Τι είναι το μπλοκάκι;") == QUERIES
+    finally:
+        reopened.close()
+
+
+def test_expired_entries_are_ignored(cache):
+    cache.put("Τι είναι το μπλοκάκι;", QUERIES)
+    cache.ttl = 0.01
+    time.sleep(0.02)
+
+    assert cache.get("Τι είναι το μπλοκάκι;") is None
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.max_entries = 2
+    cache.put("ερώτηση ένα", QUERIES)
+    time.sleep(0.01)
+    cache.put("ερώτηση δύο", QUERIES)
+    time.sleep(0.01)
+    assert cache.get("ερώτηση ένα") == QUERIES
+
+    cache.put("ερώτηση τρία", QUERIES)
+
+    assert len(cache) == 2
+    assert cache.get("ερώτηση δύο") is None
+    assert cache.get("ερώτηση ένα") == QUERIES
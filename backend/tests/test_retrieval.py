@@ -0,0 +1,186 @@
+# ruff: noqa: RUF001
+import threading
+from typing import List
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.runnables import RunnableLambda
+from langchain_qdrant import (
+    QdrantVectorStore,
+    RetrievalMode,
+    SparseEmbeddings,
+    SparseVector,
+)
+from qdrant_client import QdrantClient, models
+
+from query_cache_b import QueryRewriteCache
+from retrieval_b import (
+    RetrievalPipeline,
+    batch_hybrid_search,
+    dedupe_by_point_id,
+)
+
+COLLECTION = "test_docs"
+TEXTS = [f"έγγραφο {i} για ΦΠΑ και ΚΑΔ {i % 7}" for i in range(60)]
+
+
+class FakeSparseEmbeddings(SparseEmbeddings):
+    def _embed(self, text: str) -> SparseVector:
+        indices = sorted({hash(token) % 1000 for token in text.split()})
+        return SparseVector(indices=indices, values=[1.0] * len(indices))
+
+    def embed_documents(self, texts: List[str]) -> List[SparseVector]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> SparseVector:
+        return self._embed(text)
+
+
+@pytest.fixture
+def vectorstore():
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        COLLECTION,
+        vectors_config={
+            "dense": models.VectorParams(size=16, distance=models.Distance.DOT)
+        },
+        sparse_vectors_config={"sparse": models.SparseVectorParams()},
+    )
+    store = QdrantVectorStore(
+        client=client,
+        collection_name=COLLECTION,
+        embedding=DeterministicFakeEmbedding(size=16),
+        sparse_embedding=FakeSparseEmbeddings(),
+        retrieval_mode=RetrievalMode.HYBRID,
+        distance=models.Distance.DOT,
+        vector_name="dense",
+        sparse_vector_name="sparse",
+    )
+    store.add_texts(TEXTS, metadatas=[{"n": i} for i in range(len(TEXTS))])
+    return store
+
+
+QUERIES = ["ΦΠΑ ΚΑΔ 3", "έγγραφο 12", "ΚΑΔ 3 ΦΠΑ"]
+
+
+def test_batch_matches_per_query_search(vectorstore):
+    batched = batch_hybrid_search(vectorstore, QUERIES, k=5)
+
+    sequential = [
+        doc for query in QUERIES for doc in vectorstore.similarity_search(query, k=5)
+    ]
+    assert [d.metadata["_id"] for d in batched] == [
+        d.metadata["_id"] for d in sequential
+    ]
+
+
+def test_batch_with_no_queries(vectorstore):
+    assert batch_hybrid_search(vectorstore, [], k=5) == []
+
+
+def test_dedupe_by_point_id_keeps_first_occurrence():
+    docs = [
+        Document(page_content="a", metadata={"_id": "1"}),
+        Document(page_content="b", metadata={"_id": "2"}),
+        Document(page_content="a again", metadata={"_id": "1"}),
+        Document(page_content="no id"),
+    ]
+    assert [d.page_content for d in dedupe_by_point_id(docs)] == [
+        "a",
+        "b",
+        "no id",
+    ]
+
+
+class FakeReranker:
+    """Mimics CohereRerank.rerank: reverses the order and keeps top_n."""
+
+    def __init__(self):
+        self.calls = []
+
+    def rerank(self, documents, query, *, model=None, top_n=None):
+        self.calls.append({"count": len(documents), "model": model, "top_n": top_n})
+        indices = list(reversed(range(len(documents))))[:top_n]
+        return [
+            {"index": i, "relevance_score": 1.0 / (n + 1)}
+            for n, i in enumerate(indices)
+        ]
+
+
+@pytest.fixture
+def pipeline(vectorstore):
+    return RetrievalPipeline(
+        vectorstore=vectorstore,
+        llm_chain=RunnableLambda(lambda _: QUERIES),
+        reranker=FakeReranker(),
+        k=8,
+        top_n=3,
+        rerank_model="rerank-v3.5",
+    )
+
+
+async def test_pipeline_reranks_deduped_union(pipeline, vectorstore):
+    docs = await pipeline.ainvoke("ΦΠΑ")
+
+    unique = dedupe_by_point_id(batch_hybrid_search(vectorstore, QUERIES, k=8))
+    assert pipeline.reranker.calls == [
+        {"count": len(unique), "model": "rerank-v3.5", "top_n": 3}
+    ]
+    assert [d.metadata["_id"] for d in docs] == [
+        d.metadata["_id"] for d in reversed(unique[-3:])
+    ]
+    assert docs[0].metadata["relevance_score"] == 1.0
+    assert "relevance_score" not in unique[-1].metadata
+
+
+async def test_pipeline_overrides_per_call(pipeline, vectorstore):
+    docs = await pipeline.ainvoke("ΦΠΑ", k=2, top_n=5, rerank_model="other")
+
+    unique = dedupe_by_point_id(batch_hybrid_search(vectorstore, QUERIES, k=2))
+    assert pipeline.reranker.calls[-1] == {
+        "count": len(unique),
+        "model": "other",
+        "top_n": 5,
+    }
+    assert len(docs) == min(5, len(unique))
+    # defaults are untouched for the next call
+    assert (pipeline.k, pipeline.top_n) == (8, 3)
+    assert pipeline.invoke("ΦΠΑ") == await pipeline.ainvoke("ΦΠΑ")
+
+
+async def test_pipeline_reuses_cached_rewrites(vectorstore, tmp_path, monkeypatch):
+    calls = []
+
+    def rewrite(inputs):
+        calls.append(inputs["question"])
+        return QUERIES
+
+    query_cache = QueryRewriteCache(str(tmp_path / "rewrites.sqlite"))
+    pipeline = RetrievalPipeline(
+        vectorstore=vectorstore,
+        llm_chain=RunnableLambda(rewrite),
+        reranker=FakeReranker(),
+        query_cache=query_cache,
+    )
+
+    # the SQLite reads and writes of the cache stay off the event loop
+    cache_threads = []
+    for name in ("get", "put"):
+        method = getattr(query_cache, name)
+
+        def record(*args, _method=method, **kwargs):
+            cache_threads.append(threading.get_ident())
+            return _method(*args, **kwargs)
+
+        monkeypatch.setattr(query_cache, name, record)
+
+    first = await pipeline.ainvoke("Πότε λήγει ο ΦΠΑ;")
+    second = await pipeline.ainvoke("πότε λήγει ο φπα")
+
+    assert calls == ["Πότε λήγει ο ΦΠΑ;"]
+    assert first == second
+    assert query_cache.stats()["hits"] == 1
+    assert len(cache_threads) == 3
+    assert threading.get_ident() not in cache_threads
+    query_cache.close()
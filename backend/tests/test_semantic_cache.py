@@ -0,0 +1,106 @@
+# ruff: noqa: RUF001
+import time
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from semantic_cache_b import CachedAnswer, SemanticAnswerCache, normalize_question
+from utils_b import AnswerWithCitations
+
+QUESTION = "Πότε λήγει η δήλωση ΦΠΑ;"
+
+
+def make_entry(question: str = QUESTION, tokens: int = 1200, latency: float = 4.0):
+    return CachedAnswer(
+        question=question,
+        answer=AnswerWithCitations(
+            answer="Στις 30 του επόμενου μήνα.",
+            citations=[
+                {
+                    "full_path_name": "docs/fpa.pdf",
+                    "page_number": 3,
+                    "article_title": None,
+                    "paragraph_title": None,
+                }
+            ],
+        ),
+        sources=[{"source": "docs/fpa.pdf", "page_label": "3"}],
+        tokens=tokens,
+        latency=latency,
+    )
+
+
+@pytest.fixture
+def cache():
+    return SemanticAnswerCache(DeterministicFakeEmbedding(size=32), threshold=0.95)
+
+
+def test_normalize_question():
+    assert normalize_question("  Πότε ΛΉΓΕΙ   η δήλωση ΦΠΑ;; ") == (
+        "ποτε ληγει η δηλωση φπα"
+    )
+
+
+async def test_miss_then_hit_on_near_duplicate(cache):
+    lookup = await cache.alookup(QUESTION)
+    assert not lookup.hit
+    await cache.astore(lookup, make_entry())
+
+    lookup = await cache.alookup("πότε λήγει η δήλωση φπα")
+
+    assert lookup.hit
+    assert lookup.entry.answer.answer == "Στις 30 του επόμενου μήνα."
+    assert lookup.to_dict()["tokens_saved"] == 1200
+    assert lookup.to_dict()["latency_saved"] == 4.0
+    assert cache.stats() == {
+        "entries": 1,
+        "hits": 1,
+        "misses": 1,
+        "hit_rate": 0.5,
+        "latency_saved": 4.0,
+        "tokens_saved": 1200,
+    }
+
+
+async def test_different_question_misses(cache):
+    await cache.astore(await cache.alookup(QUESTION), make_entry())
+
+    lookup = await cache.alookup("Τι είναι το μπλοκάκι;")
+
+    assert not lookup.hit
+    assert lookup.similarity < cache.threshold
+
+
+async def test_entries_expire_after_ttl(cache):
+    await cache.astore(await cache.alookup(QUESTION), make_entry())
+    cache._entries[0].created_at = time.time() - cache.ttl - 1
+
+    assert not (await cache.alookup(QUESTION)).hit
+    assert cache.stats()["entries"] == 0
+
+
+async def test_collection_version_change_clears_cache():
+    version = {"value": 1}
+    cache = SemanticAnswerCache(
+        DeterministicFakeEmbedding(size=32),
+        version_fn=lambda: version["value"],
+        version_check_interval=0,
+    )
+    await cache.astore(await cache.alookup(QUESTION), make_entry())
+    assert (await cache.alookup(QUESTION)).hit
+
+    version["value"] = 2
+
+    assert not (await cache.alookup(QUESTION)).hit
+
+
+async def test_least_recently_hit_entry_is_evicted():
+    cache = SemanticAnswerCache(DeterministicFakeEmbedding(size=32), max_entries=2)
+    for question in ("ερώτηση ένα", "ερώτηση δύο"):
+        await cache.astore(await cache.alookup(question), make_entry(question))
+    assert (await cache.alookup("ερώτηση ένα")).hit
+
+    await cache.astore(await cache.alookup("ερώτηση τρία"), make_entry("ερώτηση τρία"))
+
+    assert (await cache.alookup("ερώτηση ένα")).hit
+    assert not (await cache.alookup("ερώτηση δύο")).hit
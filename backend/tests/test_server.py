@@ -14,6 +14,7 @@ from chainlit.config import (
     ChainlitConfig,
     SpontaneousFileUploadFeature,
 )
+from chainlit.readiness import mark_ready, mark_warming
 from chainlit.server import app
 from chainlit.types import AskFileSpec
 from chainlit.user import PersistedUser
@@ -32,6 +33,23 @@ def mock_load_translation(test_config: ChainlitConfig, monkeypatch: pytest.Monke
     return mock_method
 
 
+def test_status_check(test_client: TestClient):
+    response = test_client.head("/")
+    assert response.status_code == 200
+
+
+def test_status_check_while_warming(test_client: TestClient):
+    mark_warming("embeddings")
+    try:
+        response = test_client.head("/")
+    finally:
+        mark_ready("embeddings")
+
+    assert response.status_code == 503
+    assert response.headers["X-Status"] == "warming"
+    assert test_client.head("/").status_code == 200
+
+
 def test_project_translations_default_language(
     test_client: TestClient, mock_load_translation: Mock
 ):
@@ -116,6 +134,119 @@ async def test_project_settings(test_client: TestClient, mock_get_current_user:
     assert data["starters"] == []
 
 
+def test_project_translations_etag(
+    test_client: TestClient,
+    test_config: ChainlitConfig,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+):
+    """Translations are read once and revalidated with their ETag."""
+    from chainlit import config as config_module
+    from chainlit.server import clear_project_caches
+
+    (tmp_path / "en-US.json").write_text('{"greeting": "Hello"}')
+    monkeypatch.setattr(config_module, "config_translation_dir", str(tmp_path))
+    clear_project_caches()
+
+    response = test_client.get("/project/translations")
+    assert response.status_code == 200
+    assert response.json() == {"translation": {"greeting": "Hello"}}
+    etag = response.headers["etag"]
+
+    revalidated = test_client.get(
+        "/project/translations", headers={"If-None-Match": etag}
+    )
+    assert revalidated.status_code == 304
+    assert not revalidated.content
+
+    # Served from the cache until the file watcher clears it
+    (tmp_path / "en-US.json").write_text('{"greeting": "Hi"}')
+    assert test_client.get("/project/translations").headers["etag"] == etag
+    clear_project_caches()
+    response = test_client.get("/project/translations", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == {"translation": {"greeting": "Hi"}}
+    clear_project_caches()
+
+
+def test_project_translations_cache_one_entry_per_file(
+    test_client: TestClient,
+    test_config: ChainlitConfig,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+):
+    """Unknown languages share the cache entry of the file they fall back to."""
+    from chainlit import config as config_module
+    from chainlit import markdown as markdown_module
+    from chainlit import server as server_module
+
+    (tmp_path / "en-US.json").write_text('{"greeting": "Hello"}')
+    (tmp_path / "fr.json").write_text('{"greeting": "Bonjour"}')
+    monkeypatch.setattr(config_module, "config_translation_dir", str(tmp_path))
+    server_module.clear_project_caches()
+
+    for language in ("en-US", "de-DE", "xx-yyyy", "fr-FR", "fr-CA", "zz"):
+        response = test_client.get(
+            "/project/translations", params={"language": language}
+        )
+        assert response.status_code == 200
+        test_client.get("/project/settings", params={"language": language})
+
+    assert len(config_module._translations) == 2
+    assert len(server_module._translation_bodies) == 2
+    assert len(markdown_module._markdown) == 1
+    server_module.clear_project_caches()
+
+
+def test_project_settings_etag_and_profile_cache(
+    test_client: TestClient,
+    mock_get_current_user: Mock,
+    test_config: ChainlitConfig,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Profile configs are merged once; settings are revalidated with an ETag."""
+    from chainlit.config import ChainlitConfigOverrides, UISettings
+    from chainlit.types import ChatProfile
+
+    profile = ChatProfile(
+        name="custom",
+        markdown_description="Custom profile",
+        config_overrides=ChainlitConfigOverrides(ui=UISettings(name="Custom App")),
+    )
+
+    async def set_chat_profiles(user, language):
+        return [profile]
+
+    test_config.code.set_chat_profiles = set_chat_profiles
+    merges = []
+    with_overrides = ChainlitConfig.with_overrides
+
+    def counting_with_overrides(self, overrides):
+        merges.append(overrides)
+        return with_overrides(self, overrides)
+
+    monkeypatch.setattr(ChainlitConfig, "with_overrides", counting_with_overrides)
+
+    params = {"chat_profile": "custom"}
+    first = test_client.get("/project/settings", params=params)
+    second = test_client.get("/project/settings", params=params)
+    assert first.json()["ui"]["name"] == second.json()["ui"]["name"] == "Custom App"
+    assert len(merges) == 1
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    revalidated = test_client.get(
+        "/project/settings",
+        params=params,
+        headers={"If-None-Match": first.headers["etag"]},
+    )
+    assert revalidated.status_code == 304
+
+    default = test_client.get("/project/settings")
+    assert default.json()["ui"]["name"] == test_config.ui.name
+    assert default.headers["etag"] != first.headers["etag"]
+
+
 def test_project_settings_path_traversal(
     test_client: TestClient,
     mock_get_current_user: Mock,
@@ -1103,3 +1234,88 @@ def test_share_thread_endpoint_sets_flags(
     del _app.dependency_overrides[_get_current_user]
     data_mod._data_layer = None
     data_mod._data_layer_initialized = False
+
+
+@pytest.mark.parametrize(
+    ("export_format", "media_type"),
+    [("ndjson", "application/x-ndjson"), ("json", "application/json")],
+)
+def test_export_threads_streams_each_thread(
+    test_client: TestClient, export_format: str, media_type: str
+):
+    import json
+
+    import chainlit.data as data_mod
+
+    user = PersistedUser(
+        id="u1", createdAt=datetime.datetime.now().isoformat(), identifier="author"
+    )
+    app.dependency_overrides[get_current_user] = lambda: user
+
+    threads = [{"id": f"t{i}", "name": f"Thread {i}", "steps": []} for i in range(3)]
+
+    async def iter_user_threads(user_id):
+        assert user_id == "u1"
+        for thread in threads:
+            yield thread
+
+    dl = AsyncMock()
+    dl.iter_user_threads = iter_user_threads
+    data_mod._data_layer = dl
+    data_mod._data_layer_initialized = True
+    try:
+        r = test_client.get(
+            "/user/account/threads/export", params={"format": export_format}
+        )
+    finally:
+        del app.dependency_overrides[get_current_user]
+        data_mod._data_layer = None
+        data_mod._data_layer_initialized = False
+
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith(media_type)
+    assert "attachment" in r.headers["content-disposition"]
+    if export_format == "ndjson":
+        assert [json.loads(line) for line in r.text.splitlines()] == threads
+    else:
+        assert r.json() == threads
+
+
+def test_index_is_rendered_once_and_revalidated(
+    test_client: TestClient, monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path
+):
+    from chainlit import server
+
+    monkeypatch.setattr(server, "public_dir", str(tmp_path))
+    render = Mock(wraps=server.render_html_template)
+    monkeypatch.setattr(server, "render_html_template", render)
+    server.clear_html_templates()
+
+    first = test_client.get("/some/page")
+    second = test_client.get("/other/page")
+    assert first.status_code == second.status_code == 200
+    assert first.text == second.text
+    etag = first.headers["etag"]
+    assert etag.startswith('"')
+    assert second.headers["etag"] == etag
+    assert render.call_count == 1
+
+    not_modified = test_client.get("/", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert not not_modified.content
+    assert test_client.get("/", headers={"If-None-Match": '"x"'}).status_code == 200
+    assert render.call_count == 1
+
+    # A new theme.json is picked up without a reload
+    (tmp_path / "theme.json").write_text('{"variables": {"--radius": "1rem"}}')
+    themed = test_client.get("/", headers={"If-None-Match": etag})
+    assert themed.status_code == 200
+    assert "--radius" in themed.text
+    assert themed.headers["etag"] != etag
+    assert render.call_count == 2
+
+    server.clear_html_templates()
+    test_client.get("/")
+    assert render.call_count == 3
+    server.clear_html_templates()
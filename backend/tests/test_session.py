@@ -535,6 +535,49 @@ class TestWebsocketSession:
         assert mock_method.call_count == 2
         assert len(session.thread_queues["test_method"]) == 0
 
+    @pytest.mark.asyncio
+    async def test_websocket_session_resolve_config(self, test_config):
+        """Test the chat profile's config is resolved in the running loop and
+        merged once per distinct overrides."""
+        from chainlit.config import ChainlitConfigOverrides, UISettings
+        from chainlit.types import ChatProfile
+
+        async def set_chat_profiles(user, language):
+            # new objects on every call, as an app would build them
+            return [
+                ChatProfile(
+                    name="custom",
+                    markdown_description="Custom profile",
+                    config_overrides=ChainlitConfigOverrides(
+                        ui=UISettings(name="Custom App")
+                    ),
+                )
+            ]
+
+        test_config.code.set_chat_profiles = set_chat_profiles
+
+        sessions = [
+            WebsocketSession(
+                id=f"ws_{i}",
+                socket_id=f"socket_{i}",
+                emit=Mock(),
+                emit_call=Mock(),
+                user_env={},
+                client_type="webapp",
+                chat_profile="custom",
+            )
+            for i in range(2)
+        ]
+        assert sessions[0].get_config() is test_config
+
+        configs = [await session.resolve_config() for session in sessions]
+        assert configs[0].ui.name == "Custom App"
+        assert configs[0] is configs[1] is sessions[1].get_config()
+        assert test_config.ui.name != "Custom App"
+
+        sessions[0].chat_profile = "unknown"
+        assert await sessions[0].resolve_config() is test_config
+
 
 class TestSessionEdgeCases:
     """Test suite for session edge cases."""
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from typing import List
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from chainlit.readiness import is_ready, warming
+from startup_b import LazyEmbeddings, Startup
+
+
+async def test_resources_are_built_concurrently_and_reported_warming():
+    startup = Startup()
+    release = threading.Event()
+    started: List[str] = []
+
+    def slow(name):
+        def factory():
+            started.append(name)
+            release.wait(5)
+            return name
+
+        return factory
+
+    a = startup.add("model_a", slow("model_a"))
+    b = startup.add("model_b", slow("model_b"))
+
+    task = startup.start()
+    assert warming() == ["model_a", "model_b"]
+    while len(started) < 2:
+        await asyncio.sleep(0.01)
+    release.set()
+    await task
+
+    assert is_ready()
+    assert a.get() == "model_a"
+    assert b.get() == "model_b"
+    assert all(t is not None for t in startup.init_times().values())
+
+
+async def test_failed_resource_does_not_block_readiness_and_retries_on_use():
+    startup = Startup()
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("no network")
+        return "client"
+
+    resource = startup.add("gcs", flaky)
+    await startup.start()
+
+    assert is_ready()
+    assert not resource.ready
+    assert await resource.aget() == "client"
+
+
+def test_lazy_embeddings_load_on_first_use():
+    startup = Startup()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return DeterministicFakeEmbedding(size=4)
+
+    embeddings = LazyEmbeddings(startup.add("dense", load))
+    assert loads == []
+
+    assert embeddings.embed_queries(["a", "b"]) == [
+        embeddings.embed_query("a"),
+        embeddings.embed_query("b"),
+    ]
+    assert len(embeddings.embed_documents(["a"])[0]) == 4
+    assert loads == [1]
+
+
+@pytest.fixture(autouse=True)
+def _no_pending_resources():
+    yield
+    assert is_ready()
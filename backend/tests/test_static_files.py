@@ -0,0 +1,114 @@
+import os
+import pathlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from chainlit import server
+from chainlit.server import app
+from chainlit.static_files import (
+    IMMUTABLE,
+    REVALIDATE,
+    StaticFiles,
+    accepted_encodings,
+    is_hashed,
+)
+
+SCRIPT = "console.log('hello');\n" * 200
+
+
+@pytest.fixture
+def public(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    public_dir = tmp_path / "public"
+    public_dir.mkdir()
+    (public_dir / "app.js").write_text(SCRIPT)
+    (public_dir / "logo.png").write_bytes(b"\x89PNG" + b"\0" * 1000)
+
+    files = StaticFiles(cache_dir=str(tmp_path / "cache"))
+    os.mkdir(files.cache_dir)
+    monkeypatch.setattr(server, "public_dir", str(public_dir))
+    monkeypatch.setattr(server, "static_files", files)
+    return public_dir, files
+
+
+def test_is_hashed():
+    assert is_hashed("index-B2xNYz1c.js")
+    assert is_hashed("/dist/assets/KaTeX_Main-Regular-B22Nviop.woff2")
+    assert not is_hashed("index.js")
+    assert not is_hashed("logo.png")
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("br;q=0, gzip;q=0.5") == {"gzip"}
+    assert accepted_encodings(None) == set()
+
+
+def test_precompressed_variant_is_picked_by_accept_encoding(public):
+    public_dir, files = public
+    assert files.precompress([public_dir]) == len(files.encodings)
+    client = TestClient(app)
+
+    response = client.get("/public/app.js", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.headers["cache-control"] == REVALIDATE
+    assert int(response.headers["content-length"]) < len(SCRIPT)
+    assert response.text == SCRIPT
+
+    plain = client.get("/public/app.js", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.text == SCRIPT
+    assert plain.headers["etag"] != response.headers["etag"]
+
+    # The variant of a file changed since it was compressed is not used
+    (public_dir / "app.js").write_text(SCRIPT + "// changed\n")
+    changed = client.get("/public/app.js", headers={"Accept-Encoding": "gzip"})
+    assert changed.text == SCRIPT + "// changed\n"
+    assert changed.headers["etag"] not in (
+        plain.headers["etag"],
+        response.headers["etag"],
+    )
+
+
+def test_conditional_requests_get_a_304(public):
+    client = TestClient(app)
+    response = client.get("/public/logo.png")
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+    revalidated = client.get("/public/logo.png", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert not revalidated.content
+    assert (
+        client.get(
+            "/public/logo.png", headers={"If-Modified-Since": last_modified}
+        ).status_code
+        == 304
+    )
+    assert (
+        client.get("/public/logo.png", headers={"If-None-Match": '"other"'}).status_code
+        == 200
+    )
+
+
+def test_hashed_assets_are_immutable(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+):
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    (assets / "index-B2xNYz1c.js").write_text(SCRIPT)
+    (assets / "manifest.json").write_text("{}")
+    monkeypatch.setattr(server, "build_dir", str(tmp_path))
+    monkeypatch.setattr(server, "static_files", StaticFiles())
+    client = TestClient(app)
+
+    hashed = client.get("/assets/index-B2xNYz1c.js")
+    assert hashed.status_code == 200
+    assert hashed.headers["cache-control"] == IMMUTABLE
+    assert client.get("/assets/manifest.json").headers["cache-control"] == REVALIDATE
+    assert client.get("/assets/../assets/missing.js").status_code == 404
@@ -177,6 +177,11 @@ class db_object:
                     CREATE INDEX IF NOT EXISTS step_threadId
                                ON steps(threadId);
                     """)
+                # last activity per thread, for the thread list ordering
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS step_threadId_createdAt
+                               ON steps(threadId, createdAt);
+                    """)
                 cursor.execute("""
                     CREATE INDEX IF NOT EXISTS step_type
                                ON steps(type);